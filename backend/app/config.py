@@ -20,6 +20,93 @@ class Settings(BaseSettings):
     
     # App Settings
     starting_balance: int = 10000  # Starting coins (100 coins = $1)
+    referral_bonus: int = 10000  # Coins credited to the referrer of a new user
+    
+    # Read replicas (comma-separated URLs). Read-only endpoints use them while their
+    # replication lag stays within replica_max_lag_seconds; writes always go to the primary
+    database_replica_urls: str = ""
+    replica_max_lag_seconds: float = 5.0
+    replica_check_seconds: int = 5
+    
+    # Apply pending migrations when a worker starts. Disable when migrations run as a
+    # separate step (`python -m app.manage migrate`, which Gunicorn runs before forking)
+    auto_migrate: bool = True
+    
+    # Shared state for rate limits, cache versions and cross-worker broadcasts:
+    # "memory://" for a single worker, "redis://host:6379/0" for several workers or nodes
+    shared_state_url: str = "memory://"
+    
+    # Order history storage
+    orders_partitioned: bool = False  # Migration 0001 creates `orders` partitioned by month (PostgreSQL only)
+    order_partition_months_ahead: int = 3
+    order_archive_interval_seconds: int = 3600  # 0 disables the archival job
+    order_archive_batch_size: int = 1000
+    order_idempotency_ttl_hours: int = 24  # How long an Idempotency-Key is remembered
+    
+    # Order journal: orders sent with an Idempotency-Key are synced to a local write-ahead
+    # journal before they execute, and replayed at startup if the process died first. Orders
+    # without a key are neither journaled nor recovered. The directory must be on persistent
+    # storage belonging to this instance, or nothing survives to replay; "" disables it
+    order_journal_dir: str = str(BACKEND_DIR / "journal")
+    order_journal_segment_bytes: int = 4 * 1024 * 1024
+    order_journal_replay_seconds: int = 60  # Older unfinished orders are dropped, not replayed
+    
+    # Order admission control (per worker): token buckets per user and per market,
+    # then a bounded queue per market served round-robin across users
+    order_user_rate: float = 5.0  # Orders per second per user
+    order_user_burst: int = 10
+    order_market_rate: float = 100.0  # Orders per second per market
+    order_market_burst: int = 200
+    order_market_concurrency: int = 1  # Orders executing at once per market (they serialize on its row lock)
+    order_queue_size: int = 64  # Orders waiting per market
+    order_queue_per_user: int = 4  # Orders one user may have waiting per market
+    order_queue_timeout_seconds: float = 5.0
+    
+    # Rows deleted per transaction when purging a deleted market; one worker purges
+    # a market at a time, under a lease renewed every batch
+    market_purge_batch_size: int = 1000
+    market_purge_lease_seconds: int = 60
+    market_purge_progress_ttl_seconds: int = 86400  # How long a purge's progress stays readable
+    
+    # Trending: trades are counted in buckets of this many seconds; every roll interval,
+    # markets whose oldest bucket left the 24h window get their sort keys recomputed
+    market_activity_bucket_seconds: int = 3600
+    market_trending_roll_seconds: int = 300  # 0 disables the roll job
+    
+    # Auto-close: markets are closed when their resolution date passes; the schedule
+    # is reloaded (and overdue markets swept) every refresh interval
+    market_close_refresh_seconds: int = 60  # 0 disables auto-close
+    market_close_batch_size: int = 500
+    
+    # Market listings: the first rows of each sort/category/status, cached per worker
+    market_list_cache_size: int = 100
+    
+    # HTTP caching: seconds a shared cache (CDN/proxy) may serve market reads
+    market_cache_max_age: int = 5
+    
+    # Recent trades feed: trades kept per market, feeds kept per worker (least
+    # recently read dropped), and feeds of the busiest open markets loaded at startup
+    trade_feed_size: int = 50
+    trade_feed_markets: int = 5000
+    trade_feed_warm_markets: int = 200
+    
+    # Leaderboard
+    leaderboard_reconcile_seconds: int = 60
+    
+    # Admin user directory: users who trade are revalued (equity sort key) within
+    # user_equity_flush_seconds; everyone is, every user_equity_refresh_seconds, for price moves
+    user_equity_flush_seconds: int = 10
+    user_equity_refresh_seconds: int = 600
+    user_equity_batch_size: int = 1000
+    
+    # Risk report: positions per chunk when streaming them from the database
+    risk_report_chunk_size: int = 100000
+    
+    # Ledger snapshots: accounts with this many new entries are snapshotted each interval
+    ledger_snapshot_interval_seconds: int = 3600  # 0 disables the snapshot job
+    ledger_snapshot_min_entries: int = 100
+    ledger_snapshot_settle_seconds: int = 300  # Only entries at least this old are snapshotted
+    ledger_batch_size: int = 500  # Users per transaction when snapshotting or checking
     
     class Config:
         env_file = str(BACKEND_DIR / ".env")
@@ -34,6 +121,3 @@ def get_settings() -> Settings:
 
 settings = get_settings()
 
-# Debug: Print secret key length on startup (not the actual key for security)
-print(f"[Config] Loaded secret key (length: {len(settings.secret_key)})")
-
@@ -1,7 +1,9 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from .config import settings
+from contextlib import contextmanager
+from typing import Optional
+from .config import settings, BACKEND_DIR
 
 # Create database engine
 engine = create_engine(
@@ -25,7 +27,78 @@ def get_db():
         db.close()
 
 
-def init_db():
-    """Initialize database tables."""
-    from .models import user, market, order, position  # noqa: F401
-    Base.metadata.create_all(bind=engine)
+# Arbitrary key for the PostgreSQL advisory lock held while migrating
+MIGRATION_LOCK_KEY = 7243019
+
+
+def _alembic_config():
+    from alembic.config import Config
+    return Config(str(BACKEND_DIR / "alembic.ini"))
+
+
+def get_schema_version() -> Optional[str]:
+    """The migration revision the database is at, or None if it was never migrated."""
+    from alembic.runtime.migration import MigrationContext
+
+    with engine.connect() as connection:
+        heads = MigrationContext.configure(connection).get_current_heads()
+    return heads[0] if heads else None
+
+
+def schema_is_current() -> bool:
+    """Whether the database is at the latest migration; one query plus reading the scripts."""
+    from alembic.script import ScriptDirectory
+
+    return get_schema_version() == ScriptDirectory.from_config(_alembic_config()).get_current_head()
+
+
+@contextmanager
+def _migration_lock():
+    """Serialize migrations across processes (PostgreSQL; SQLite locks the file itself)."""
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    with engine.connect() as connection:
+        connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        try:
+            yield
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+
+def run_migrations(revision: str = "head") -> None:
+    """
+    Upgrade the database with the Alembic migrations in backend/migrations.
+    A database created by create_all before migrations existed runs the
+    baseline in adopt mode, which only adds what the database lacks.
+    """
+    from alembic import command
+
+    config = _alembic_config()
+    config.attributes["adopt"] = get_schema_version() is None and inspect(engine).has_table("users")
+    with engine.connect() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
+        connection.commit()
+
+
+def init_db() -> bool:
+    """
+    Bring the database schema up to date.
+    Costs one query when it is already at the latest migration, so only the
+    first process after a schema change does any work.
+    Returns whether migrations were run.
+    """
+    if schema_is_current():
+        return False
+
+    with _migration_lock():
+        # Another process may have finished while we waited for the lock
+        if schema_is_current():
+            return False
+        run_migrations()
+
+    from .services.order_history import init_order_storage
+    init_order_storage(engine)
+    return True
+
@@ -1,16 +1,37 @@
+from .utils.startup_timing import startup_timer
+startup_timer.install_import_hook()
+
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
+from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from pathlib import Path
-from .database import init_db
-from .routers import auth_router, markets_router, orders_router, portfolio_router, users_router
-
-# Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address)
+from datetime import datetime
+import asyncio
+from .config import settings
+from .database import init_db, SessionLocal
+from .models.user import User
+from .models.market import Market
+from .models.ledger import LedgerKind
+from .utils.security import get_password_hash
+from .services.order_history import order_maintenance_loop
+from .services.order_journal import order_journal, replay_order_journals
+from .services.leaderboard import leaderboard_loop
+from .services.user_directory import user_equity_loop
+from .services.trade_feed import warm_trade_feeds
+from .services.trending import trending_roll_loop
+from .services.market_schedule import market_close_loop
+from .services.market_cache import market_versions
+from .services.market_purge import resume_pending_purges
+from .services.order_book import recover_order_books
+from .services import ledger
+from .services.ledger import ledger_snapshot_loop
+from .services.replicas import replicas, replica_monitor_loop
+from .utils.static_assets import StaticAssetPipeline
+from .utils.rate_limit import limiter
+from .shared_state import shared_state
+from .routers import auth_router, markets_router, orders_router, portfolio_router, users_router, bulk_router, leaderboard_router, proposals_router, risk_router
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -38,34 +59,88 @@ app.include_router(markets_router, prefix="/api")
 app.include_router(orders_router, prefix="/api")
 app.include_router(portfolio_router, prefix="/api")
 app.include_router(users_router, prefix="/api")
-
-from .routers.proposals import router as proposals_router
+app.include_router(bulk_router, prefix="/api")
+app.include_router(leaderboard_router, prefix="/api")
+app.include_router(risk_router, prefix="/api")
 app.include_router(proposals_router, prefix="/api")
 
-# Mount static files for frontend
+# Static files for frontend: fingerprinted, precompressed assets built at startup,
+# with plain StaticFiles as the fallback for anything else in the directory
 frontend_path = Path(__file__).parent.parent.parent / "frontend"
+static_pipeline = StaticAssetPipeline(frontend_path)
 if frontend_path.exists():
-    app.mount("/static", StaticFiles(directory=str(frontend_path)), name="static")
+    static_files = StaticFiles(directory=str(frontend_path))
+    
+    @app.get("/static/{path:path}", include_in_schema=False)
+    async def serve_static(path: str, request: Request):
+        """Serve a frontend asset."""
+        asset = static_pipeline.get(path)
+        if asset:
+            return asset.response(request)
+        return await static_files.get_response(path, request.scope)
+
+startup_timer.mark("imports")
+startup_timer.remove_import_hook()
 
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on startup."""
-    init_db()
+    """Initialize database, static assets and background jobs on startup."""
+    # With AUTO_MIGRATE off, migrations ran as a separate step (e.g. in the Gunicorn master)
+    if settings.auto_migrate:
+        with startup_timer.phase("migrations"):
+            init_db()
+    with startup_timer.phase("shared_state"):
+        shared_state.start_listener()
+    # Assets are built off the startup path; until then they are served from disk
+    if frontend_path.exists():
+        app.state.static_build_task = asyncio.create_task(asyncio.to_thread(static_pipeline.build))
+    if settings.order_journal_dir:
+        order_journal.open()
+        # Orders that a process which has since died accepted but never finished
+        app.state.journal_replay_task = asyncio.create_task(asyncio.to_thread(replay_order_journals))
+    if settings.order_archive_interval_seconds > 0:
+        app.state.order_maintenance_task = asyncio.create_task(order_maintenance_loop())
+    app.state.leaderboard_task = asyncio.create_task(leaderboard_loop())
+    app.state.user_equity_task = asyncio.create_task(user_equity_loop())
+    if settings.market_trending_roll_seconds > 0:
+        app.state.trending_roll_task = asyncio.create_task(trending_roll_loop())
+    if settings.market_close_refresh_seconds > 0:
+        app.state.market_close_task = asyncio.create_task(market_close_loop())
+    if settings.ledger_snapshot_interval_seconds > 0:
+        app.state.ledger_snapshot_task = asyncio.create_task(ledger_snapshot_loop())
+    app.state.purge_task = asyncio.create_task(asyncio.to_thread(resume_pending_purges))
+    # Books also load on first use, so trading needn't wait for this
+    app.state.order_book_task = asyncio.create_task(asyncio.to_thread(recover_order_books))
+    # Feeds also load on first read
+    app.state.trade_feed_task = asyncio.create_task(asyncio.to_thread(warm_trade_feeds))
+    if replicas.replicas:
+        app.state.replica_monitor_task = asyncio.create_task(replica_monitor_loop())
+    app.state.startup_report = startup_timer.report()
+    startup_timer.print_report()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    order_journal.close()
 
 
 @app.get("/")
-async def serve_frontend():
+async def serve_frontend(request: Request):
     """Serve the frontend."""
-    index_path = frontend_path / "index.html"
-    if index_path.exists():
-        return FileResponse(index_path)
+    index = static_pipeline.get("index.html")
+    if index:
+        return index.response(request)
+    if frontend_path.exists():
+        return await static_files.get_response("index.html", request.scope)
     return {"message": "Welcome to PolyIITB API", "docs": "/docs"}
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
+    if replicas.replicas:
+        return {"status": "healthy", "replicas": replicas.status()}
     return {"status": "healthy"}
 
 
@@ -73,12 +148,6 @@ async def health_check():
 @app.post("/api/seed")
 async def seed_database():
     """Seed the database with sample data (development only)."""
-    from .database import SessionLocal
-    from .models.user import User
-    from .models.market import Market
-    from .utils.security import get_password_hash
-    from datetime import datetime, timedelta
-    
     db = SessionLocal()
     
     try:
@@ -94,6 +163,8 @@ async def seed_database():
                 referral_code="ADMIN001"
             )
             db.add(admin)
+            db.flush()
+            ledger.record(db, admin.id, LedgerKind.OPENING, coins=admin.balance)
         
         # Create sample markets
         sample_markets = [
@@ -146,6 +217,7 @@ async def seed_database():
                 db.add(market)
         
         db.commit()
+        market_versions.bump()
         return {"message": "Database seeded successfully"}
     except Exception as e:
         db.rollback()
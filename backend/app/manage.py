@@ -0,0 +1,133 @@
+"""
+One-shot management commands, run from the backend directory:
+
+    python -m app.manage migrate        Apply pending migrations (under a migration lock)
+    python -m app.manage check          Exit with status 1 if migrations are pending
+    python -m app.manage ledger-check   Verify balances and positions against the ledger
+    python -m app.manage ledger-snapshot
+                                        Snapshot every account with new ledger entries
+    python -m app.manage ledger-replay USER_ID
+                                        Print an account as rebuilt from the ledger
+    python -m app.manage engine-state   Load open markets and positions into memory; report the size
+
+New migrations are written with Alembic: `alembic revision --autogenerate -m "..."`.
+"""
+import argparse
+import json
+import sys
+import time
+
+
+def migrate() -> int:
+    from .database import init_db
+
+    start = time.perf_counter()
+    applied = init_db()
+    elapsed = (time.perf_counter() - start) * 1000
+    if applied:
+        print(f"[Migrate] Migrated in {elapsed:.0f}ms")
+    else:
+        print(f"[Migrate] Schema already current ({elapsed:.0f}ms)")
+    return 0
+
+
+def check() -> int:
+    from .database import schema_is_current
+
+    if schema_is_current():
+        print("[Migrate] Schema is current")
+        return 0
+    print("[Migrate] Migrations are pending; run `python -m app.manage migrate`")
+    return 1
+
+
+def ledger_check() -> int:
+    from .database import SessionLocal
+    from .services.ledger import check_consistency
+
+    db = SessionLocal()
+    try:
+        mismatches = 0
+        for mismatch in check_consistency(db):
+            mismatches += 1
+            print(f"[Ledger] Mismatch: {json.dumps(mismatch)}")
+    finally:
+        db.close()
+    if mismatches:
+        print(f"[Ledger] {mismatches} balances or positions disagree with the ledger")
+        return 1
+    print("[Ledger] All balances and positions match the ledger")
+    return 0
+
+
+def ledger_snapshot() -> int:
+    from .database import SessionLocal
+    from .services.ledger import snapshot_users
+
+    db = SessionLocal()
+    try:
+        print(f"[Ledger] Snapshotted {snapshot_users(db)} accounts")
+    finally:
+        db.close()
+    return 0
+
+
+def ledger_replay(user_id: int) -> int:
+    from .database import SessionLocal
+    from .services.ledger import replay
+
+    db = SessionLocal()
+    try:
+        print(json.dumps(replay(db, user_id).to_dict(), indent=2))
+    finally:
+        db.close()
+    return 0
+
+
+def engine_state() -> int:
+    from .database import SessionLocal
+    from .services.engine_state import EngineState
+
+    state = EngineState()
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        state.load(db)
+        elapsed = (time.perf_counter() - start) * 1000
+    finally:
+        db.close()
+    usage = state.memory_usage()
+    print(
+        f"[Engine] Loaded {usage['markets']} open markets ({usage['market_bytes'] / 2**20:.1f} MB) "
+        f"and {usage['positions']} positions ({usage['position_bytes'] / 2**20:.1f} MB) in {elapsed:.0f}ms"
+    )
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.manage")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("migrate", help="apply pending migrations")
+    commands.add_parser("check", help="check whether the schema is current")
+    commands.add_parser("ledger-check", help="verify balances and positions against the ledger")
+    commands.add_parser("ledger-snapshot", help="snapshot every account with new ledger entries")
+    replay_parser = commands.add_parser("ledger-replay", help="rebuild an account from the ledger")
+    replay_parser.add_argument("user_id", type=int)
+    commands.add_parser("engine-state", help="load the in-memory trading state and report its size")
+
+    args = parser.parse_args(argv)
+    if args.command == "migrate":
+        return migrate()
+    if args.command == "ledger-check":
+        return ledger_check()
+    if args.command == "ledger-snapshot":
+        return ledger_snapshot()
+    if args.command == "ledger-replay":
+        return ledger_replay(args.user_id)
+    if args.command == "engine-state":
+        return engine_state()
+    return check()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,8 @@
-from .user import User
-from .market import Market
-from .order import Order
+from .user import User, UserSignupDay, UserTotals
+from .market import Market, MarketActivity
+from .order import Order, ArchivedOrder, OrderIdempotencyKey
 from .position import Position
 from .proposal import MarketProposal
+from .ledger import LedgerEntry, LedgerSnapshot, LedgerSnapshotPosition
 
-__all__ = ["User", "Market", "Order", "Position", "MarketProposal"]
+__all__ = ["User", "UserSignupDay", "UserTotals", "Market", "MarketActivity", "Order", "ArchivedOrder", "OrderIdempotencyKey", "Position", "MarketProposal", "LedgerEntry", "LedgerSnapshot", "LedgerSnapshotPosition"]
@@ -0,0 +1,72 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+import enum
+from ..database import Base
+
+# 64-bit IDs on PostgreSQL; SQLite only auto-increments INTEGER PRIMARY KEY
+LedgerId = BigInteger().with_variant(Integer(), "sqlite")
+
+
+class LedgerKind(str, enum.Enum):
+    """Why coins or shares moved."""
+    OPENING = "opening"  # Holdings from before the ledger, or granted at account creation
+    SIGNUP_BONUS = "signup_bonus"
+    REFERRAL_BONUS = "referral_bonus"
+    TRADE = "trade"
+    ESCROW = "escrow"  # Reserved by a resting limit order
+    ESCROW_RELEASE = "escrow_release"  # Returned from a limit order (unused, amended or cancelled)
+    PAYOUT = "payout"
+    FORFEIT = "forfeit"  # Shares of a deleted market
+    ADJUSTMENT = "adjustment"
+
+
+class LedgerEntry(Base):
+    """
+    Append-only record of one movement of a user's coins and/or shares.
+    A user's balance is the sum of their entries' coins, and their position
+    in a market the sum of their entries' shares for it. Entries are never
+    updated or deleted, and deliberately have no foreign keys to markets or
+    orders, which may be archived or purged.
+    """
+    
+    __tablename__ = "ledger_entries"
+    
+    id = Column(LedgerId, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    kind = Column(String(20), nullable=False)
+    coins = Column(Integer, nullable=False, default=0)
+    market_id = Column(Integer, nullable=True)  # Market the movement belongs to, if any
+    yes_shares = Column(Integer, nullable=False, default=0)
+    no_shares = Column(Integer, nullable=False, default=0)
+    order_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        # A user's entries after a snapshot (replay and consistency checks)
+        Index('idx_ledger_user_id', 'user_id', 'id'),
+    )
+    
+    def __repr__(self):
+        return f"<LedgerEntry {self.kind} User:{self.user_id} coins:{self.coins:+d}>"
+
+
+class LedgerSnapshot(Base):
+    """A user's balance as of a ledger entry; replay starts from the entry after it."""
+    
+    __tablename__ = "ledger_snapshots"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    last_entry_id = Column(LedgerId, nullable=False)
+    balance = Column(Integer, nullable=False)
+    taken_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class LedgerSnapshotPosition(Base):
+    """A user's shares in one market, as of their LedgerSnapshot."""
+    
+    __tablename__ = "ledger_snapshot_positions"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    market_id = Column(Integer, primary_key=True)
+    yes_shares = Column(Integer, nullable=False)
+    no_shares = Column(Integer, nullable=False)
@@ -4,6 +4,9 @@ from sqlalchemy.sql import func
 from ..database import Base
 import enum
 
+# Prices are in dollars per share (0.0 - 1.0); balances and amounts are in coins
+COINS_PER_DOLLAR = 100
+
 
 class MarketStatus(str, enum.Enum):
     """Market status enum."""
@@ -39,6 +42,11 @@ class Market(Base):
     no_price = Column(Float, default=0.5)   # Price of NO shares (0.0 - 1.0)
     total_volume = Column(Float, default=0.0)  # Total trading volume
     liquidity = Column(Float, default=1000.0)  # AMM liquidity pool
+    book_version = Column(Integer, nullable=False, default=0, server_default="0")  # Bumped with every order book change
+    
+    # Trending sort keys over the last 24h, maintained from MarketActivity buckets
+    volume_24h = Column(Float, nullable=False, default=0.0, server_default="0")
+    price_change_24h = Column(Float, nullable=False, default=0.0, server_default="0")  # Change in yes_price
     
     # Status and resolution
     status = Column(String(20), default=MarketStatus.OPEN.value, index=True)
@@ -48,6 +56,7 @@ class Market(Base):
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    deleted_at = Column(DateTime(timezone=True), nullable=True)  # Soft delete; rows are purged in the background
     
     # Relationships
     orders = relationship("Order", back_populates="market")
@@ -56,7 +65,37 @@ class Market(Base):
     # Composite indexes for common queries
     __table_args__ = (
         Index('idx_market_status_category', 'status', 'category'),
+        # Listing sorts, overall and within a category, so a top-N page is an index scan
+        Index('idx_market_created_at', 'created_at'),
+        Index('idx_market_category_created_at', 'category', 'created_at'),
+        Index('idx_market_total_volume', 'total_volume'),
+        Index('idx_market_category_total_volume', 'category', 'total_volume'),
+        Index('idx_market_volume_24h', 'volume_24h'),
+        Index('idx_market_category_volume_24h', 'category', 'volume_24h'),
+        Index('idx_market_price_change_24h', 'price_change_24h'),
+        Index('idx_market_category_price_change_24h', 'category', 'price_change_24h'),
+        Index('idx_market_status_resolution_date', 'status', 'resolution_date'),  # Closing soon: open markets
     )
     
     def __repr__(self):
         return f"<Market {self.title[:30]}...>"
+
+
+class MarketActivity(Base):
+    """
+    Trading volume of a market per time bucket, and its YES price before the
+    bucket's first trade. The buckets inside the trailing 24h give a market's
+    volume_24h and price_change_24h; older ones are dropped as the window rolls.
+    No foreign key, so purging a market never waits on its buckets.
+    """
+    
+    __tablename__ = "market_activity"
+    
+    market_id = Column(Integer, primary_key=True)
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    volume = Column(Float, nullable=False, default=0.0)
+    open_price = Column(Float, nullable=False)
+    
+    __table_args__ = (
+        Index('idx_market_activity_bucket_start', 'bucket_start'),
+    )
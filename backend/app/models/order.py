@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Index
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -37,8 +37,9 @@ class Order(Base):
     side = Column(String(10), nullable=False)  # yes or no
     order_type = Column(String(10), nullable=False)  # buy or sell
     quantity = Column(Integer, nullable=False)  # Number of shares
-    price = Column(Float, nullable=False)  # Price per share at execution
+    price = Column(Float, nullable=False)  # Price per share at execution (average over fills)
     total_cost = Column(Float, nullable=False)  # Total cost of order
+    limit_price = Column(Float, nullable=True)  # Limit orders only; unfilled remainder rests on the book
     
     status = Column(String(20), default=OrderStatus.PENDING.value)
     filled_quantity = Column(Integer, default=0)
@@ -54,7 +55,67 @@ class Order(Base):
     __table_args__ = (
         Index('idx_order_user_market', 'user_id', 'market_id'),
         Index('idx_order_user_created', 'user_id', 'created_at'),
+        # A market's latest orders, for its recent trades feed
+        Index('idx_order_market_created', 'market_id', 'created_at'),
+        # Resting limit orders, for rebuilding order books
+        Index(
+            'idx_order_resting', 'market_id', 'id',
+            postgresql_where=text("status IN ('pending', 'partially_filled')"),
+            sqlite_where=text("status IN ('pending', 'partially_filled')")
+        ),
     )
     
     def __repr__(self):
         return f"<Order {self.order_type} {self.quantity}x {self.side} @ {self.price}>"
+
+
+class ArchivedOrder(Base):
+    """Cold storage for orders of resolved markets, moved out of the hot table."""
+    
+    __tablename__ = "orders_archive"
+    
+    id = Column(Integer, primary_key=True)  # Same ID as the original order
+    user_id = Column(Integer, nullable=False)
+    market_id = Column(Integer, nullable=False, index=True)
+    
+    side = Column(String(10), nullable=False)
+    order_type = Column(String(10), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    price = Column(Float, nullable=False)
+    total_cost = Column(Float, nullable=False)
+    limit_price = Column(Float, nullable=True)
+    
+    status = Column(String(20))
+    filled_quantity = Column(Integer, default=0)
+    
+    created_at = Column(DateTime(timezone=True))
+    executed_at = Column(DateTime(timezone=True), nullable=True)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index('idx_order_archive_user_created', 'user_id', 'created_at'),
+    )
+    
+    def __repr__(self):
+        return f"<ArchivedOrder {self.order_type} {self.quantity}x {self.side} @ {self.price}>"
+
+
+class OrderIdempotencyKey(Base):
+    """
+    A client-supplied Idempotency-Key for an order placement, committed in
+    the order's transaction: a retry with the same key returns the order
+    placed the first time instead of placing another. Keys are purged after
+    order_idempotency_ttl_hours.
+    """
+    
+    __tablename__ = "order_idempotency_keys"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    key = Column(String(64), primary_key=True)
+    order_id = Column(Integer, nullable=False)  # No foreign key: orders move to the archive
+    request_hash = Column(String(64), nullable=False)  # A reused key must come with the same order
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    __table_args__ = (
+        Index('idx_order_idempotency_created_at', 'created_at'),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, UniqueConstraint, Index
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, UniqueConstraint, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -28,6 +28,12 @@ class Position(Base):
     # Unique constraint - one position per user per market
     __table_args__ = (
         UniqueConstraint('user_id', 'market_id', name='unique_user_market_position'),
+        # Open positions only: what the portfolio reads, without the closed-out rows
+        Index(
+            'idx_position_user_open', 'user_id',
+            postgresql_where=text('yes_shares > 0 OR no_shares > 0'),
+            sqlite_where=text('yes_shares > 0 OR no_shares > 0')
+        ),
     )
     
     def __repr__(self):
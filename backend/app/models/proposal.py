@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -38,5 +38,10 @@ class MarketProposal(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     reviewed_at = Column(DateTime(timezone=True), nullable=True)
     
+    # Keyset pagination of the review queue (status = 'pending' ORDER BY id)
+    __table_args__ = (
+        Index('idx_proposal_status_id', 'status', 'id'),
+    )
+    
     def __repr__(self):
         return f"<MarketProposal {self.id}: {self.title[:30]}>"
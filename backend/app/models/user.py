@@ -1,15 +1,33 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Boolean, Date, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
-import secrets
 import string
 from ..database import Base
 
+REFERRAL_ALPHABET = string.ascii_uppercase + string.digits
+REFERRAL_CODE_LENGTH = 7
+REFERRAL_CODE_SPACE = len(REFERRAL_ALPHABET) ** REFERRAL_CODE_LENGTH
+# Coprime with 36, so multiplying by it permutes the code space
+REFERRAL_MULTIPLIER = 25214903917
+REFERRAL_OFFSET = 19349663
 
-def generate_referral_code():
-    """Generate a unique 8-character referral code."""
-    chars = string.ascii_uppercase + string.digits
-    return ''.join(secrets.choice(chars) for _ in range(8))
+
+def referral_code_for(user_id: int) -> str:
+    """
+    A user's referral code: their ID under an affine permutation of the
+    code space, in base 36. Distinct IDs get distinct codes, so no lookup
+    is needed, and consecutive IDs get unrelated-looking ones. Seven
+    characters, so they never collide with the random 8-character codes
+    of earlier accounts.
+    """
+    if not 0 < user_id < REFERRAL_CODE_SPACE:
+        raise ValueError("User ID outside the referral code space")
+    number = (user_id * REFERRAL_MULTIPLIER + REFERRAL_OFFSET) % REFERRAL_CODE_SPACE
+    chars = []
+    for _ in range(REFERRAL_CODE_LENGTH):
+        number, digit = divmod(number, len(REFERRAL_ALPHABET))
+        chars.append(REFERRAL_ALPHABET[digit])
+    return "".join(reversed(chars))
 
 
 class User(Base):
@@ -30,10 +48,46 @@ class User(Base):
     referral_code = Column(String(8), unique=True, index=True, nullable=True)
     referred_by = Column(Integer, ForeignKey("users.id"), nullable=True)
     
+    # Admin directory sort keys. equity is revalued after the user trades and
+    # periodically (services/user_directory.py); trade_count counts orders that traded
+    equity = Column(Integer, nullable=False, default=0, server_default="0")
+    trade_count = Column(Integer, nullable=False, default=0, server_default="0")
+    
     # Relationships
     orders = relationship("Order", back_populates="user")
     positions = relationship("Position", back_populates="user")
     referrer = relationship("User", remote_side=[id], foreign_keys=[referred_by])
     
+    # Directory sorts, so a keyset page is an index scan. The username/email
+    # prefix indexes are expressions that differ by dialect (migration 0008)
+    __table_args__ = (
+        Index('idx_user_balance', 'balance', 'id'),
+        Index('idx_user_equity', 'equity', 'id'),
+        Index('idx_user_trade_count', 'trade_count', 'id'),
+    )
+    
     def __repr__(self):
         return f"<User {self.username}>"
+
+
+class UserSignupDay(Base):
+    """Signups per UTC day. Counted by triggers on `users` (migration 0008), not by the app."""
+    
+    __tablename__ = "user_signup_days"
+    
+    day = Column(Date, primary_key=True)
+    signups = Column(Integer, nullable=False, default=0)
+
+
+class UserTotals(Base):
+    """
+    Running counts of users, kept by the same triggers, so the admin
+    directory's totals are a primary key read. A single row, ID 1.
+    """
+    
+    __tablename__ = "user_totals"
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    users = Column(Integer, nullable=False, default=0)
+    active = Column(Integer, nullable=False, default=0)
+    admins = Column(Integer, nullable=False, default=0)
@@ -4,6 +4,9 @@ from .orders import router as orders_router
 from .portfolio import router as portfolio_router
 from .users import router as users_router
 from .proposals import router as proposals_router
+from .bulk import router as bulk_router
+from .leaderboard import router as leaderboard_router
+from .risk import router as risk_router
 
 __all__ = [
     "auth_router",
@@ -11,5 +14,8 @@ __all__ = [
     "orders_router",
     "portfolio_router",
     "users_router",
-    "proposals_router"
+    "proposals_router",
+    "bulk_router",
+    "leaderboard_router",
+    "risk_router"
 ]
@@ -1,12 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 from ..database import get_db
 from ..schemas.user import UserCreate, UserResponse, Token
-from ..services.auth import create_user, get_user_by_email, get_user_by_username
+from ..services.auth import register_user
 from ..utils.security import (
     authenticate_user, 
     create_access_token, 
@@ -15,12 +14,10 @@ from ..utils.security import (
     decode_token
 )
 from ..models.user import User
+from ..utils.rate_limit import limiter
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
-# Rate limiter for this router
-limiter = Limiter(key_func=get_remote_address)
-
 
 class RefreshTokenRequest(BaseModel):
     """Request body for token refresh."""
@@ -31,21 +28,13 @@ class RefreshTokenRequest(BaseModel):
 @limiter.limit("3/minute")
 async def register(request: Request, user_data: UserCreate, db: Session = Depends(get_db)):
     """Register a new user. Rate limited to 3 requests per minute."""
-    # Check if email already exists
-    if get_user_by_email(db, user_data.email):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-    
-    # Check if username already exists
-    if get_user_by_username(db, user_data.username):
+    # Hashing the password is deliberately slow: keep it off the event loop
+    user, error = await run_in_threadpool(register_user, db, user_data)
+    if error:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already taken"
+            detail=error
         )
-    
-    user = create_user(db, user_data)
     return user
 
 
@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from ..database import get_db
+from ..services.bulk import (
+    BulkImportError,
+    import_markets,
+    export_markets,
+    export_orders,
+    export_positions
+)
+from ..utils.security import get_current_admin_user
+from ..models.user import User
+
+router = APIRouter(tags=["Bulk Data"])
+
+EXPORTERS = {
+    "markets": export_markets,
+    "orders": export_orders,
+    "positions": export_positions
+}
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"
+}
+
+
+@router.post("/markets/import", status_code=status.HTTP_201_CREATED)
+async def bulk_import_markets(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Import markets from an NDJSON or CSV request body (admin only).
+    The import is all-or-nothing; the first invalid row is reported.
+    """
+    try:
+        imported = await import_markets(db, request.stream(), format)
+    except BulkImportError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    return {"imported": imported}
+
+
+@router.get("/export/{dataset}")
+async def bulk_export(
+    dataset: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Stream markets, orders or positions as NDJSON or CSV (admin only)."""
+    exporter = EXPORTERS.get(dataset)
+    if not exporter:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown dataset. Choose one of: {list(EXPORTERS)}"
+        )
+
+    return StreamingResponse(
+        exporter(format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{format}"'}
+    )
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from typing import List
+from ..database import get_db
+from ..schemas.leaderboard import LeaderboardEntry
+from ..services.leaderboard import leaderboard
+from ..utils.security import get_current_user
+from ..models.user import User
+
+router = APIRouter(prefix="/leaderboard", tags=["Leaderboard"])
+
+
+@router.get("", response_model=List[LeaderboardEntry])
+async def get_leaderboard(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """Get the top users by equity."""
+    return leaderboard.top(limit=limit, skip=skip)
+
+
+@router.get("/me", response_model=LeaderboardEntry)
+async def get_my_rank(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get the current user's rank."""
+    entry = leaderboard.rank(current_user.id)
+    if entry is None:
+        # Not ranked yet (e.g. signed up since the last reconciliation)
+        leaderboard.refresh_users(db, [current_user.id])
+        entry = leaderboard.rank(current_user.id)
+    
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User is not ranked"
+        )
+    
+    return entry
@@ -1,46 +1,177 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from ..database import get_db
-from ..schemas.market import MarketCreate, MarketResponse, MarketUpdate, MarketResolve
-from ..services.market import create_market, get_market, get_markets, update_market, get_market_stats
+from ..schemas.market import MarketCreate, MarketResponse, MarketUpdate, MarketResolve, MarketSort
+from ..schemas.order import OrderBookResponse, MarketTradesResponse
+from ..services.market import (
+    create_market, get_market, get_market_rows, search_market_rows, update_market, get_market_stats
+)
 from ..services.trading import trading_engine
+from ..services.market_cache import market_versions, market_lists, public_cache_control
+from ..services.order_book import order_books
+from ..services.trade_feed import trade_feed
+from ..services.market_purge import mark_market_deleted, purge_market, get_purge_progress
+from ..services.replicas import read_session
+from ..config import settings
 from ..utils.security import get_current_user, get_current_admin_user
+from ..utils.responses import FastJSONResponse
+from ..utils.http_cache import etag_matches, not_modified
 from ..models.user import User
 from ..models.market import MarketStatus
 
 router = APIRouter(prefix="/markets", tags=["Markets"])
 
 
+def _market_read_session():
+    """
+    Session for a market read whose ETag was just taken: a replica only if no
+    market changed recently enough for a replica to still be missing it, so
+    the body is never older than the version in its ETag.
+    """
+    return read_session(use_primary=market_versions.changed_within(settings.replica_max_lag_seconds))
+
+
 @router.get("", response_model=List[MarketResponse])
 async def list_markets(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
     category: Optional[str] = None,
     status: Optional[str] = None,
-    db: Session = Depends(get_db)
+    sort: MarketSort = MarketSort.NEWEST
 ):
-    """Get a list of all markets with optional filtering."""
-    markets = get_markets(db, skip=skip, limit=limit, category=category, status=status)
+    """Get a list of markets with optional filtering and sorting."""
+    cache_control = public_cache_control()
+    etag = market_versions.list_etag(skip, limit, category, status, sort.value)
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control)
+    
+    if skip + limit <= settings.market_list_cache_size:
+        markets = _top_markets(category, status, sort)[skip:skip + limit]
+    else:
+        with _market_read_session() as db:
+            markets = get_market_rows(db, skip=skip, limit=limit, category=category, status=status, sort=sort)
+    return FastJSONResponse(markets, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def _top_markets(category: Optional[str], status: Optional[str], sort: MarketSort) -> List[dict]:
+    """The first rows of a listing, from this worker's cache while no market has changed."""
+    key = (category, status, sort.value)
+    # Taken after the response ETag, so the rows are never older than it
+    list_etag = market_versions.list_etag("top", *key)
+    markets = market_lists.get(key, list_etag)
+    if markets is None:
+        with _market_read_session() as db:
+            markets = get_market_rows(
+                db, limit=settings.market_list_cache_size, category=category, status=status, sort=sort
+            )
+        market_lists.put(key, list_etag, markets)
     return markets
 
 
+@router.get("/search", response_model=List[MarketResponse])
+async def search_markets(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    category: Optional[str] = None,
+    status: Optional[str] = None
+):
+    """Full-text search over market titles and descriptions, best matches first."""
+    cache_control = public_cache_control()
+    etag = market_versions.list_etag("search", q, skip, limit, category, status)
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control)
+    
+    with _market_read_session() as db:
+        markets = search_market_rows(db, q, skip=skip, limit=limit, category=category, status=status)
+    return FastJSONResponse(markets, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
 @router.get("/stats")
-async def market_stats(db: Session = Depends(get_db)):
+async def market_stats(request: Request):
     """Get overall market statistics."""
-    return get_market_stats(db)
+    cache_control = public_cache_control()
+    etag = market_versions.list_etag("stats")
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control)
+    
+    with _market_read_session() as db:
+        stats = get_market_stats(db)
+    return FastJSONResponse(stats, headers={"ETag": etag, "Cache-Control": cache_control})
 
 
 @router.get("/{market_id}", response_model=MarketResponse)
-async def get_market_by_id(market_id: int, db: Session = Depends(get_db)):
+async def get_market_by_id(market_id: int, request: Request):
     """Get a specific market by ID."""
-    market = get_market(db, market_id)
-    if not market:
+    cache_control = public_cache_control()
+    etag = market_versions.market_etag(market_id)
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control)
+    
+    with _market_read_session() as db:
+        market = get_market(db, market_id)
+        if not market:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Market not found"
+            )
+        content = MarketResponse.model_validate(market).model_dump(mode="json")
+    return FastJSONResponse(content, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+@router.get("/{market_id}/book", response_model=OrderBookResponse)
+async def get_order_book(
+    market_id: int,
+    request: Request,
+    depth: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """Get the resting limit orders of a market, aggregated by price level."""
+    cache_control = public_cache_control()
+    etag = market_versions.market_etag(market_id)
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control)
+    
+    # Books follow the primary's book_version, so they are never read from a replica
+    books = await run_in_threadpool(order_books.depth, db, market_id, depth)
+    if books is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Market not found"
         )
-    return market
+    return FastJSONResponse(
+        {"market_id": market_id, **books},
+        headers={"ETag": etag, "Cache-Control": cache_control}
+    )
+
+
+@router.get("/{market_id}/trades", response_model=MarketTradesResponse)
+async def get_market_trades(
+    market_id: int,
+    request: Request,
+    limit: int = Query(20, ge=1, le=settings.trade_feed_size),
+    db: Session = Depends(get_db)
+):
+    """Get a market's most recent trades, newest first, from memory once its feed is loaded."""
+    cache_control = public_cache_control()
+    etag = market_versions.market_etag(market_id)
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control)
+    
+    trades = await run_in_threadpool(trade_feed.recent, db, market_id, limit)
+    if trades is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Market not found"
+        )
+    return FastJSONResponse(
+        {"market_id": market_id, "trades": trades},
+        headers={"ETag": etag, "Cache-Control": cache_control}
+    )
 
 
 @router.post("", response_model=MarketResponse, status_code=status.HTTP_201_CREATED)
@@ -111,13 +242,15 @@ async def resolve_market(
 @router.delete("/{market_id}", status_code=status.HTTP_200_OK)
 async def delete_market(
     market_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin_user)
 ):
-    """Delete a market (admin only). Also deletes related orders and positions."""
-    from ..models.order import Order
-    from ..models.position import Position
-    
+    """
+    Delete a market (admin only).
+    The market disappears immediately; its orders and positions are purged
+    in bounded batches in the background.
+    """
     market = get_market(db, market_id)
     if not market:
         raise HTTPException(
@@ -125,14 +258,26 @@ async def delete_market(
             detail="Market not found"
         )
     
-    # Delete related orders first
-    db.query(Order).filter(Order.market_id == market_id).delete()
-    
-    # Delete related positions
-    db.query(Position).filter(Position.market_id == market_id).delete()
+    mark_market_deleted(db, market)
+    background_tasks.add_task(purge_market, market_id)
     
-    # Delete the market
-    db.delete(market)
-    db.commit()
-    
-    return {"message": f"Market '{market.title}' deleted successfully"}
+    return {
+        "message": f"Market '{market.title}' deleted successfully",
+        "purge_status": f"/api/markets/{market_id}/deletion"
+    }
+
+
+@router.get("/{market_id}/deletion")
+async def get_market_deletion(
+    market_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Get the background purge progress of a deleted market (admin only)."""
+    progress = get_purge_progress(db, market_id)
+    if not progress:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No deletion found for this market"
+        )
+    return progress
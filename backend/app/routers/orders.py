@@ -1,50 +1,79 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import select
+from typing import List, Optional
 from ..database import get_db
-from ..schemas.order import OrderCreate, OrderResponse
-from ..services.market import get_market
+from ..schemas.order import OrderCreate, OrderAmend, OrderResponse
+from ..services.market_schedule import market_statuses
 from ..services.trading import trading_engine
+from ..services.admission import admission_controller, AdmissionRejected
+from ..services.order_history import get_user_order_history, get_user_order, get_idempotency_key, order_request_hash
+from ..services.order_journal import order_journal
+from ..services.replicas import get_user_read_db
 from ..utils.security import get_current_user
+from ..utils.responses import FastJSONResponse
 from ..models.user import User
 from ..models.order import Order
-from ..models.market import MarketStatus
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
 
 
-@router.post("", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
-async def create_order(
-    order_data: OrderCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Place a new order (buy or sell shares)."""
-    # Get the market
-    market = get_market(db, order_data.market_id)
-    if not market:
+def _previous_order(db: Session, current_user: User, idempotency_key: str, request_hash: str):
+    """The order already placed under an idempotency key, if any."""
+    previous = get_idempotency_key(db, current_user.id, idempotency_key)
+    if previous is None:
+        return None
+    if previous.request_hash != request_hash:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Idempotency-Key was already used for a different order"
+        )
+    return get_user_order(db, current_user.id, previous.order_id)
+
+
+def _place_order(db: Session, current_user: User, order_data: OrderCreate, idempotency_key: Optional[str]):
+    """Validate the market and execute the order (blocking; runs in the threadpool)."""
+    request_hash = None
+    if idempotency_key is not None:
+        request_hash = order_request_hash(order_data.model_dump())
+        previous = _previous_order(db, current_user, idempotency_key, request_hash)
+        if previous is not None:
+            return previous
+    
+    # Cached status; the trade re-checks it under the market's row lock
+    is_open = market_statuses.is_open(db, order_data.market_id)
+    if is_open is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Market not found"
         )
-    
-    # Check if market is open
-    if market.status != MarketStatus.OPEN.value:
+    if not is_open:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Market is not open for trading"
         )
     
-    # Execute the order
-    if order_data.order_type == "buy":
-        order, error = trading_engine.execute_buy_order(
-            db, current_user, market, order_data.side, order_data.quantity
-        )
-    else:
-        order, error = trading_engine.execute_sell_order(
-            db, current_user, market, order_data.side, order_data.quantity
+    # Execute the order; a keyed one is journaled until it commits or fails
+    sequence = order_journal.accept({
+        **order_data.model_dump(), "user_id": current_user.id,
+        "idempotency_key": idempotency_key, "request_hash": request_hash
+    })
+    order = None
+    try:
+        order, error = trading_engine.place_order(
+            db, current_user, order_data.market_id, order_data.side, order_data.order_type,
+            order_data.quantity, order_data.limit_price,
+            idempotency_key=idempotency_key, request_hash=request_hash
         )
+    finally:
+        order_journal.done(sequence, order.id if order else None)
     
+    if error and idempotency_key is not None:
+        # A concurrent request with the same key committed first
+        previous = _previous_order(db, current_user, idempotency_key, request_hash)
+        if previous is not None:
+            return previous
     if error:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -54,35 +83,123 @@ async def create_order(
     return order
 
 
+def _get_own_order(db: Session, current_user: User, order_id: int) -> Order:
+    """The current user's order in hot storage, or 404."""
+    order = db.execute(
+        select(Order).where(Order.id == order_id, Order.user_id == current_user.id)
+    ).scalar_one_or_none()
+    if not order:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Order not found"
+        )
+    return order
+
+
+def _cancel_order(db: Session, order: Order):
+    """Cancel a resting limit order (blocking; runs in the threadpool)."""
+    order, error = trading_engine.cancel_order(db, order)
+    if error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error
+        )
+    return order
+
+
+def _amend_order(db: Session, current_user: User, order: Order, amendment: OrderAmend):
+    """Amend a resting limit order (blocking; runs in the threadpool)."""
+    order, error = trading_engine.amend_order(
+        db, current_user, order,
+        quantity=amendment.quantity, limit_price=amendment.limit_price
+    )
+    if error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error
+        )
+    return order
+
+
+async def _admitted(user_id: int, market_id: int, fn, *args):
+    """Run a blocking order operation in the threadpool, behind the market's admission control."""
+    try:
+        async with admission_controller.admit(user_id, market_id):
+            return await run_in_threadpool(fn, *args)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+@router.post("", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
+async def create_order(
+    order_data: OrderCreate,
+    idempotency_key: Optional[str] = Header(None, min_length=1, max_length=64),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Place a new order (buy or sell shares).
+    With a limit_price, whatever can't fill at that price or better rests
+    on the market's order book until it fills or is cancelled.
+    With an Idempotency-Key header, retrying the request returns the order
+    placed the first time instead of placing another.
+    """
+    return await _admitted(
+        current_user.id, order_data.market_id, _place_order, db, current_user, order_data, idempotency_key
+    )
+
+
+@router.delete("/{order_id}", response_model=OrderResponse)
+async def cancel_order(
+    order_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Cancel a resting limit order; its unfilled coins or shares are returned."""
+    order = _get_own_order(db, current_user, order_id)
+    return await _admitted(current_user.id, order.market_id, _cancel_order, db, order)
+
+
+@router.patch("/{order_id}", response_model=OrderResponse)
+async def amend_order(
+    order_id: int,
+    amendment: OrderAmend,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Amend a resting limit order's quantity or price.
+    Returns the order as amended, or its replacement if it had to be replaced.
+    """
+    order = _get_own_order(db, current_user, order_id)
+    return await _admitted(current_user.id, order.market_id, _amend_order, db, current_user, order, amendment)
+
+
 @router.get("", response_model=List[OrderResponse])
 async def get_user_orders(
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
     market_id: int = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_user_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get the current user's orders."""
-    query = db.query(Order).filter(Order.user_id == current_user.id)
-    
-    if market_id:
-        query = query.filter(Order.market_id == market_id)
-    
-    orders = query.order_by(Order.created_at.desc()).offset(skip).limit(limit).all()
-    return orders
+    """Get the current user's orders, including archived ones."""
+    orders = get_user_order_history(db, current_user.id, skip=skip, limit=limit, market_id=market_id)
+    return FastJSONResponse(orders)
 
 
 @router.get("/{order_id}", response_model=OrderResponse)
 async def get_order(
     order_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_user_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get a specific order by ID."""
-    order = db.query(Order).filter(
-        Order.id == order_id,
-        Order.user_id == current_user.id
-    ).first()
+    order = get_user_order(db, current_user.id, order_id)
     
     if not order:
         raise HTTPException(
@@ -1,74 +1,75 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select, or_
 from typing import List
-from ..database import get_db
+from ..services.replicas import get_user_read_db
 from ..schemas.position import PositionResponse
 from ..schemas.order import OrderResponse
+from ..services.order_history import get_user_order_history
+from ..services.order_book import reserved_value
 from ..utils.security import get_current_user
+from ..utils.responses import FastJSONResponse
+from ..utils.http_cache import conditional_json
+from ..services.market_cache import PRIVATE_CACHE_CONTROL
 from ..models.user import User
 from ..models.position import Position
-from ..models.order import Order
-from ..models.market import Market
+from ..models.market import Market, MarketStatus, COINS_PER_DOLLAR
 
 router = APIRouter(prefix="/portfolio", tags=["Portfolio"])
 
 
 @router.get("/positions", response_model=List[PositionResponse])
 async def get_positions(
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_user_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get all positions for the current user."""
-    # Use joinedload to prevent N+1 queries - fetch market data in single query
-    positions = db.query(Position).filter(
-        Position.user_id == current_user.id
-    ).options(
-        joinedload(Position.market)
-    ).all()
+    # Single joined query projected to response columns - no ORM objects built
+    rows = db.execute(
+        select(
+            Position.id,
+            Position.user_id,
+            Position.market_id,
+            Position.yes_shares,
+            Position.no_shares,
+            Position.avg_yes_price,
+            Position.avg_no_price,
+            Position.created_at,
+            Position.updated_at,
+            Market.title.label("market_title"),
+            Market.yes_price.label("current_yes_price"),
+            Market.no_price.label("current_no_price")
+        )
+        .join(Market, Market.id == Position.market_id)
+        .where(
+            Position.user_id == current_user.id,
+            Market.deleted_at.is_(None),
+            # Only include positions with actual shares
+            or_(Position.yes_shares > 0, Position.no_shares > 0)
+        )
+    ).mappings()
     
-    # Build response with enriched market data (already loaded via joinedload)
-    result = []
-    for pos in positions:
-        # Only include positions with actual shares
-        if pos.yes_shares > 0 or pos.no_shares > 0:
-            pos_dict = {
-                "id": pos.id,
-                "user_id": pos.user_id,
-                "market_id": pos.market_id,
-                "yes_shares": pos.yes_shares,
-                "no_shares": pos.no_shares,
-                "avg_yes_price": pos.avg_yes_price,
-                "avg_no_price": pos.avg_no_price,
-                "created_at": pos.created_at,
-                "updated_at": pos.updated_at,
-                "market_title": pos.market.title if pos.market else None,
-                "current_yes_price": pos.market.yes_price if pos.market else None,
-                "current_no_price": pos.market.no_price if pos.market else None
-            }
-            result.append(PositionResponse(**pos_dict))
-    
-    return result
+    return conditional_json(request, [dict(row) for row in rows], PRIVATE_CACHE_CONTROL)
 
 
 @router.get("/history", response_model=List[OrderResponse])
 async def get_trade_history(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_user_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get trade history for the current user."""
-    # Use index on user_id and created_at for efficient query
-    orders = db.query(Order).filter(
-        Order.user_id == current_user.id
-    ).order_by(Order.created_at.desc()).offset(skip).limit(limit).all()
-    
-    return orders
+    """Get trade history for the current user, including archived orders."""
+    # Use index on user_id and created_at in both hot and archived storage
+    orders = get_user_order_history(db, current_user.id, skip=skip, limit=limit)
+    return FastJSONResponse(orders)
 
 
 @router.get("/summary")
 async def get_portfolio_summary(
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_user_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get portfolio summary for the current user."""
@@ -84,30 +85,35 @@ async def get_portfolio_summary(
     active_positions = 0
     
     for pos in positions:
-        if pos.market:
+        # Resolved markets' shares were already paid into the balance
+        if pos.market and pos.market.deleted_at is None and pos.market.status != MarketStatus.RESOLVED.value:
             # Only count positions with shares
             if pos.yes_shares > 0 or pos.no_shares > 0:
                 active_positions += 1
                 
-                # Calculate value based on current market prices (in coins: shares * price * 100)
-                yes_value = pos.yes_shares * pos.market.yes_price * 100
-                no_value = pos.no_shares * pos.market.no_price * 100
+                # Calculate value based on current market prices (in coins)
+                yes_value = pos.yes_shares * pos.market.yes_price * COINS_PER_DOLLAR
+                no_value = pos.no_shares * pos.market.no_price * COINS_PER_DOLLAR
                 current_value += yes_value + no_value
                 
                 # Calculate invested amount based on average purchase price (in coins)
-                yes_invested = pos.yes_shares * pos.avg_yes_price * 100
-                no_invested = pos.no_shares * pos.avg_no_price * 100
+                yes_invested = pos.yes_shares * pos.avg_yes_price * COINS_PER_DOLLAR
+                no_invested = pos.no_shares * pos.avg_no_price * COINS_PER_DOLLAR
                 total_invested += yes_invested + no_invested
     
+    # Escrow of resting limit orders is off the balance and positions but still the user's
+    reserved = db.execute(select(reserved_value(current_user.id))).scalar_one()
+    
     profit_loss = current_value - total_invested
     profit_loss_pct = (profit_loss / total_invested * 100) if total_invested > 0 else 0
     
-    return {
+    return conditional_json(request, {
         "balance": int(current_user.balance),  # Already in coins
         "total_invested": int(round(total_invested)),  # Now in coins
         "current_value": int(round(current_value)),  # Now in coins
         "profit_loss": int(round(profit_loss)),  # Now in coins
         "profit_loss_pct": round(profit_loss_pct, 2),
         "total_positions": active_positions,
-        "total_equity": int(round(current_user.balance + current_value))  # Now in coins
-    }
+        "reserved": int(round(reserved)),  # Escrow of resting limit orders, in coins
+        "total_equity": int(round(current_user.balance + current_value + reserved))  # Now in coins
+    }, PRIVATE_CACHE_CONTROL)
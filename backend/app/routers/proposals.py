@@ -1,11 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 from ..database import get_db
 from ..models.proposal import MarketProposal, ProposalStatus
-from ..models.market import Market
-from ..schemas.proposal import ProposalCreate, ProposalResponse, ProposalReview
+from ..schemas.proposal import (
+    ProposalCreate,
+    ProposalResponse,
+    ProposalReview,
+    ProposalBulkReview,
+    ProposalBulkReviewResult,
+    ProposalCounts
+)
+from ..services.proposals import (
+    get_pending_queue,
+    get_proposal_counts,
+    get_proposal_response,
+    apply_review,
+    bulk_review_proposals
+)
 from ..utils.security import get_current_user, get_current_admin_user
 from ..models.user import User
 
@@ -68,22 +81,42 @@ async def get_my_proposals(
 # Admin endpoints
 @router.get("/admin/pending", response_model=List[ProposalResponse])
 async def get_pending_proposals(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    after_id: Optional[int] = Query(None, ge=0),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin_user)
 ):
-    """Get all pending proposals (admin only)."""
-    proposals = db.query(MarketProposal).filter(
-        MarketProposal.status == ProposalStatus.pending.value
-    ).order_by(MarketProposal.created_at.asc()).all()
-    
-    result = []
-    for p in proposals:
-        response = ProposalResponse.model_validate(p)
-        user = db.query(User).filter(User.id == p.user_id).first()
-        response.username = user.username if user else "Unknown"
-        result.append(response)
-    
-    return result
+    """
+    Get pending proposals, oldest first (admin only).
+    Pass the X-Next-Cursor response header as `after_id` to get the next page.
+    """
+    proposals, next_cursor = get_pending_queue(db, limit=limit, after_id=after_id)
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return proposals
+
+
+@router.get("/admin/counts", response_model=ProposalCounts)
+async def get_proposal_status_counts(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Count proposals by status (admin only)."""
+    return get_proposal_counts(db)
+
+
+@router.post("/admin/bulk-review", response_model=ProposalBulkReviewResult)
+async def bulk_review(
+    review: ProposalBulkReview,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Approve or reject many pending proposals in one transaction (admin only)."""
+    reviewed_ids, skipped_ids = bulk_review_proposals(
+        db, review.proposal_ids, review.action, review.admin_notes
+    )
+    return ProposalBulkReviewResult(reviewed_ids=reviewed_ids, skipped_ids=skipped_ids)
 
 
 @router.post("/admin/{proposal_id}/review", response_model=ProposalResponse)
@@ -108,45 +141,5 @@ async def review_proposal(
             detail="Proposal has already been reviewed"
         )
     
-    proposal.reviewed_at = datetime.now()
-    proposal.admin_notes = review.admin_notes
-    
-    if review.action == "approve":
-        # Use modified values if provided, otherwise use original
-        final_title = review.title or proposal.title
-        final_description = review.description if review.description is not None else proposal.description
-        final_category = review.category or proposal.category
-        final_resolution_date = review.resolution_date or proposal.resolution_date
-        
-        # Update proposal with any modifications (for record keeping)
-        proposal.title = final_title
-        proposal.description = final_description
-        proposal.category = final_category
-        proposal.resolution_date = final_resolution_date
-        
-        # Create the actual market
-        market = Market(
-            title=final_title,
-            description=final_description,
-            category=final_category,
-            resolution_date=final_resolution_date,
-            yes_price=0.5,
-            no_price=0.5
-        )
-        db.add(market)
-        db.flush()  # Get the market ID
-        
-        proposal.status = ProposalStatus.approved.value
-        proposal.market_id = market.id
-        
-    else:  # reject
-        proposal.status = ProposalStatus.rejected.value
-    
-    db.commit()
-    db.refresh(proposal)
-    
-    user = db.query(User).filter(User.id == proposal.user_id).first()
-    response = ProposalResponse.model_validate(proposal)
-    response.username = user.username if user else "Unknown"
-    
-    return response
+    apply_review(db, proposal, review)
+    return get_proposal_response(db, proposal_id)
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from ..database import get_db
+from ..schemas.risk import RiskReport
+from ..services.risk import risk_cache, compute_risk_report
+from ..utils.security import get_current_admin_user
+from ..models.user import User
+
+router = APIRouter(prefix="/risk", tags=["Risk"])
+
+
+def _risk_report(db: Session, top: int, fresh: bool) -> dict:
+    """Build the report (blocking; runs in the threadpool)."""
+    report = None if fresh else risk_cache.report(db, top)
+    # While another request loads the cache, read the database directly
+    return report or compute_risk_report(db, top)
+
+
+@router.get("", response_model=RiskReport)
+async def get_risk_report(
+    top: int = Query(20, ge=1, le=100),
+    fresh: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Platform exposure over unresolved markets (admin only): what would be
+    paid out under each outcome, unrealized P&L and concentration.
+    Served from in-memory positions kept current by trades; `fresh=true`
+    streams every position from the database instead.
+    """
+    return await run_in_threadpool(_risk_report, db, top, fresh)
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from ..database import get_db
-from ..schemas.user import UserResponse, UserUpdate
+from ..schemas.user import UserResponse, UserUpdate, UserSort, UserDirectoryEntry, UserStats
+from ..services.replicas import get_read_db
+from ..services.user_directory import get_user_directory, get_user_stats
 from ..utils.security import get_current_user, get_current_admin_user
 from ..models.user import User
 
@@ -60,7 +62,7 @@ async def update_current_user(
 async def list_users(
     skip: int = 0,
     limit: int = 20,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_admin_user)
 ):
     """List all users (admin only)."""
@@ -68,6 +70,47 @@ async def list_users(
     return users
 
 
+@router.get("/directory", response_model=List[UserDirectoryEntry])
+async def get_directory(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    after: Optional[str] = Query(None, max_length=40),
+    q: Optional[str] = Query(None, min_length=1, max_length=100),
+    sort: UserSort = UserSort.NEWEST,
+    active: Optional[bool] = None,
+    admin: Optional[bool] = None,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Browse users (admin only): `q` matches the start of a username or email,
+    `sort` is newest, balance, equity or trades (largest first).
+    Pass the X-Next-Cursor response header as `after` to get the next page.
+    """
+    try:
+        users, next_cursor = get_user_directory(
+            db, limit=limit, after=after, q=q, sort=sort, active=active, admin=admin
+        )
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return users
+
+
+@router.get("/stats", response_model=UserStats)
+async def get_stats(
+    days: int = Query(30, ge=1, le=366),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """User totals and signups per UTC day (admin only)."""
+    return get_user_stats(db, days)
+
+
 @router.post("/{user_id}/make-admin")
 async def make_user_admin(
     user_id: int,
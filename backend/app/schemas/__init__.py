@@ -1,11 +1,16 @@
-from .user import UserCreate, UserLogin, UserResponse, UserUpdate, Token, TokenData
-from .market import MarketCreate, MarketResponse, MarketUpdate, MarketResolve
-from .order import OrderCreate, OrderResponse
+from .user import UserCreate, UserLogin, UserResponse, UserUpdate, Token, TokenData, UserSort, UserDirectoryEntry, SignupDay, UserStats
+from .market import MarketCreate, MarketResponse, MarketUpdate, MarketResolve, MarketSort
+from .order import OrderCreate, OrderAmend, OrderResponse, OrderBookResponse, MarketTrade, MarketTradesResponse
 from .position import PositionResponse
+from .leaderboard import LeaderboardEntry
+from .risk import RiskReport, MarketRisk, RiskConcentration
 
 __all__ = [
     "UserCreate", "UserLogin", "UserResponse", "UserUpdate", "Token", "TokenData",
-    "MarketCreate", "MarketResponse", "MarketUpdate", "MarketResolve",
-    "OrderCreate", "OrderResponse",
-    "PositionResponse"
+    "UserSort", "UserDirectoryEntry", "SignupDay", "UserStats",
+    "MarketCreate", "MarketResponse", "MarketUpdate", "MarketResolve", "MarketSort",
+    "OrderCreate", "OrderAmend", "OrderResponse", "OrderBookResponse", "MarketTrade", "MarketTradesResponse",
+    "PositionResponse",
+    "LeaderboardEntry",
+    "RiskReport", "MarketRisk", "RiskConcentration"
 ]
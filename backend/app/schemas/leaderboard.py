@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+
+
+class LeaderboardEntry(BaseModel):
+    """Schema for a leaderboard row."""
+    rank: int
+    user_id: int
+    username: str
+    equity: int  # Coins: balance + positions at current prices
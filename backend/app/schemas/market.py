@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
 from typing import Optional
+import enum
 from ..models.market import MarketCategory, MarketStatus
 
 
@@ -22,6 +23,15 @@ class MarketCreate(BaseModel):
         return v
 
 
+class MarketSort(str, enum.Enum):
+    """Orders a market listing can be sorted in."""
+    NEWEST = "newest"
+    VOLUME = "volume"
+    VOLUME_24H = "volume_24h"
+    PRICE_CHANGE_24H = "price_change_24h"  # Biggest YES price rise first
+    CLOSING_SOON = "closing_soon"  # Open markets by resolution date
+
+
 class MarketResponse(BaseModel):
     """Schema for market response."""
     id: int
@@ -32,6 +42,8 @@ class MarketResponse(BaseModel):
     yes_price: float
     no_price: float
     total_volume: float
+    volume_24h: float
+    price_change_24h: float
     liquidity: float
     status: str
     resolution_date: Optional[datetime]
@@ -1,6 +1,13 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
+
+
+def _validate_tick(value: Optional[float]) -> Optional[float]:
+    """Limit prices are whole cents, so they map exactly onto book price levels."""
+    if value is not None and abs(value * 100 - round(value * 100)) > 1e-9:
+        raise ValueError("Limit price must be a multiple of 0.01")
+    return round(value, 2) if value is not None else None
 
 
 class OrderCreate(BaseModel):
@@ -9,6 +16,21 @@ class OrderCreate(BaseModel):
     side: str = Field(..., pattern="^(yes|no)$")  # yes or no
     order_type: str = Field(..., pattern="^(buy|sell)$")  # buy or sell
     quantity: int = Field(..., ge=1, le=10000)  # Max 10,000 shares per order
+    limit_price: Optional[float] = Field(None, ge=0.01, le=0.99)  # Omit for a market order
+    
+    _check_limit_price = field_validator("limit_price")(_validate_tick)
+
+
+class OrderAmend(BaseModel):
+    """
+    Schema for amending a resting limit order.
+    Reducing the quantity keeps the order's place in the queue; a new price or
+    a larger quantity replaces it with a new order at the back of the queue.
+    """
+    quantity: Optional[int] = Field(None, ge=1, le=10000)  # New total quantity, including filled shares
+    limit_price: Optional[float] = Field(None, ge=0.01, le=0.99)
+    
+    _check_limit_price = field_validator("limit_price")(_validate_tick)
 
 
 class OrderResponse(BaseModel):
@@ -21,6 +43,7 @@ class OrderResponse(BaseModel):
     quantity: int
     price: float
     total_cost: float
+    limit_price: Optional[float] = None
     status: str
     filled_quantity: int
     created_at: datetime
@@ -28,3 +51,39 @@ class OrderResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+
+class BookLevel(BaseModel):
+    """Aggregated resting orders at one price."""
+    price: float
+    quantity: int
+    orders: int
+
+
+class BookSideDepth(BaseModel):
+    """Bids (best first) and asks (best first) for one outcome."""
+    bids: List[BookLevel]
+    asks: List[BookLevel]
+
+
+class OrderBookResponse(BaseModel):
+    """Schema for a market's order books."""
+    market_id: int
+    yes: BookSideDepth
+    no: BookSideDepth
+
+
+class MarketTrade(BaseModel):
+    """An order that traded, as shown in a market's recent trades."""
+    order_id: int
+    side: str
+    order_type: str
+    quantity: int  # Shares filled so far
+    price: float  # Average fill price
+    executed_at: Optional[datetime]  # Last fill
+
+
+class MarketTradesResponse(BaseModel):
+    """Schema for a market's recent trades, newest first."""
+    market_id: int
+    trades: List[MarketTrade]
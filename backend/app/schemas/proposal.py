@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 
 class ProposalCreate(BaseModel):
@@ -39,3 +39,23 @@ class ProposalReview(BaseModel):
     description: Optional[str] = Field(None, max_length=2000)
     category: Optional[str] = Field(None, min_length=1, max_length=50)
     resolution_date: Optional[datetime] = None
+
+
+class ProposalBulkReview(BaseModel):
+    """Schema for approving or rejecting many proposals at once."""
+    proposal_ids: List[int] = Field(..., min_length=1, max_length=500)
+    action: str = Field(..., pattern="^(approve|reject)$")
+    admin_notes: Optional[str] = Field(None, max_length=500)
+
+
+class ProposalBulkReviewResult(BaseModel):
+    """Schema for bulk review outcome."""
+    reviewed_ids: List[int]
+    skipped_ids: List[int]  # Not found or already reviewed
+
+
+class ProposalCounts(BaseModel):
+    """Schema for proposal counts by status."""
+    pending: int
+    approved: int
+    rejected: int
@@ -0,0 +1,38 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import List
+
+
+class MarketRisk(BaseModel):
+    """Schema for one market's exposure. Amounts are in coins; a winning share pays 100."""
+    market_id: int
+    title: str
+    yes_liability: float  # Paid out if the market resolves YES
+    no_liability: float  # Paid out if it resolves NO
+    worst_case_liability: float
+    mark_value: float  # Shares held, at current prices
+    unrealized_pnl: float  # Mark value less what holders paid
+    holders: int
+
+
+class RiskConcentration(BaseModel):
+    """Schema for how concentrated exposure is across markets and users."""
+    market_hhi: float  # Herfindahl index of worst-case liability across markets (0-1)
+    top_market_share: float  # Largest market's share of worst-case liability
+    top_user_share: float  # Largest holder's share of mark value
+    top_10_user_share: float
+
+
+class RiskReport(BaseModel):
+    """Schema for the platform risk report over unresolved markets."""
+    generated_at: datetime
+    source: str  # "cache" (in-memory positions kept current by trades) or "database"
+    positions: int
+    markets: int  # Markets with shares held
+    yes_liability: float
+    no_liability: float
+    worst_case_liability: float  # Each market resolving against the house
+    mark_value: float
+    unrealized_pnl: float
+    concentration: RiskConcentration
+    top_markets: List[MarketRisk]
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, EmailStr, Field, field_validator
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from typing import List, Optional
+import enum
 import re
 
 
@@ -59,3 +60,38 @@ class TokenData(BaseModel):
     """Schema for token payload data."""
     user_id: Optional[int] = None
     email: Optional[str] = None
+
+
+class UserSort(str, enum.Enum):
+    """Orders the admin user directory can be sorted in, largest first."""
+    NEWEST = "newest"
+    BALANCE = "balance"
+    EQUITY = "equity"
+    TRADES = "trades"
+
+
+class UserDirectoryEntry(BaseModel):
+    """Schema for a user in the admin directory."""
+    id: int
+    username: str
+    email: str
+    balance: int
+    equity: int  # As of the user's last trade or the last periodic revaluation
+    trade_count: int  # Orders that traded
+    is_active: bool
+    is_admin: bool
+    created_at: Optional[datetime] = None
+
+
+class SignupDay(BaseModel):
+    """Schema for the signups of one UTC day."""
+    day: date
+    signups: int
+
+
+class UserStats(BaseModel):
+    """Schema for user counts in the admin directory."""
+    users: int
+    active: int
+    admins: int
+    signups: List[SignupDay]  # Oldest day first, days without signups included
@@ -0,0 +1,185 @@
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict
+import asyncio
+import math
+import time
+from ..config import settings
+
+
+class AdmissionRejected(Exception):
+    """Raised when an order is turned away; retry_after is a hint in seconds."""
+
+    def __init__(self, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucket:
+    """Allows `rate` events per second on average, with bursts of up to `burst`."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated_at")
+
+    def __init__(self, rate: float, burst: int, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = now
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+    def is_idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+class MarketQueue:
+    """
+    Orders admitted to one market: up to `concurrency` executing, the rest
+    waiting per user. Waiters are served round-robin across users, so one
+    user's backlog can't delay another user by more than one order per turn.
+    """
+
+    __slots__ = ("active", "waiting", "size")
+
+    def __init__(self):
+        self.active = 0
+        self.waiting: "OrderedDict[int, Deque[asyncio.Future]]" = OrderedDict()
+        self.size = 0
+
+    def enqueue(self, user_id: int, future: asyncio.Future) -> None:
+        self.waiting.setdefault(user_id, deque()).append(future)
+        self.size += 1
+
+    def remove(self, user_id: int, future: asyncio.Future) -> None:
+        waiters = self.waiting.get(user_id)
+        if waiters and future in waiters:
+            waiters.remove(future)
+            self.size -= 1
+            if not waiters:
+                del self.waiting[user_id]
+
+    def next_waiter(self):
+        """Pop the next waiter, taking users in turn; None if nobody is waiting."""
+        while self.waiting:
+            user_id, waiters = next(iter(self.waiting.items()))
+            future = waiters.popleft()
+            self.size -= 1
+            if waiters:
+                self.waiting.move_to_end(user_id)
+            else:
+                del self.waiting[user_id]
+            if not future.done():
+                return future
+        return None
+
+
+class AdmissionController:
+    """
+    Admission control for order placement: token-bucket rate limits per user
+    and per market, then a bounded fair queue per market in front of
+    execution. Orders that can't be admitted promptly are rejected at once
+    with a Retry-After hint instead of piling up on the market's row lock.
+    Limits and queues are per worker process.
+    """
+
+    def __init__(self):
+        self._user_buckets: Dict[int, TokenBucket] = {}
+        self._market_buckets: Dict[int, TokenBucket] = {}
+        self._queues: Dict[int, MarketQueue] = {}
+        # Moving average of execution time, to estimate how long a queue takes to drain
+        self._service_time = 0.05
+
+    def _bucket(self, buckets: Dict[int, TokenBucket], key: int, rate: float, burst: int, now: float) -> TokenBucket:
+        bucket = buckets.get(key)
+        if bucket is None:
+            if len(buckets) >= 10000:
+                for idle in [k for k, b in buckets.items() if b.is_idle(now)]:
+                    del buckets[idle]
+            bucket = buckets[key] = TokenBucket(rate, burst, now)
+        return bucket
+
+    def _check_rate(self, user_id: int, market_id: int) -> None:
+        now = time.monotonic()
+        user_bucket = self._bucket(
+            self._user_buckets, user_id, settings.order_user_rate, settings.order_user_burst, now
+        )
+        market_bucket = self._bucket(
+            self._market_buckets, market_id, settings.order_market_rate, settings.order_market_burst, now
+        )
+        wait = user_bucket.wait_time(now)
+        if wait:
+            raise AdmissionRejected("Too many orders. Please slow down.", wait)
+        wait = market_bucket.wait_time(now)
+        if wait:
+            raise AdmissionRejected("This market is busy. Please retry shortly.", wait)
+        user_bucket.take()
+        market_bucket.take()
+
+    def _drain_time(self, queue: MarketQueue) -> float:
+        return (queue.size + 1) * self._service_time / settings.order_market_concurrency
+
+    def _release(self, market_id: int, queue: MarketQueue) -> None:
+        """Hand the execution slot to the next waiter, or free it."""
+        future = queue.next_waiter()
+        if future is not None:
+            future.set_result(None)
+            return
+        queue.active -= 1
+        if queue.active == 0 and not queue.waiting:
+            del self._queues[market_id]
+
+    async def _wait_for_slot(self, user_id: int, market_id: int, queue: MarketQueue) -> None:
+        if queue.active < settings.order_market_concurrency and not queue.waiting:
+            queue.active += 1
+            return
+
+        if queue.size >= settings.order_queue_size:
+            raise AdmissionRejected("This market is busy. Please retry shortly.", self._drain_time(queue))
+        if len(queue.waiting.get(user_id, ())) >= settings.order_queue_per_user:
+            raise AdmissionRejected("Too many pending orders on this market.", self._drain_time(queue))
+
+        future = asyncio.get_running_loop().create_future()
+        queue.enqueue(user_id, future)
+        try:
+            # The slot is handed over by _release, so `active` already counts us
+            await asyncio.wait_for(future, settings.order_queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            queue.remove(user_id, future)
+            raise AdmissionRejected("This market is busy. Please retry shortly.", self._drain_time(queue))
+        except asyncio.CancelledError:
+            # Client went away: give back the slot if it had already been handed to us
+            if future.done() and not future.cancelled():
+                self._release(market_id, queue)
+            else:
+                queue.remove(user_id, future)
+            raise
+
+    @asynccontextmanager
+    async def admit(self, user_id: int, market_id: int):
+        """Hold an execution slot on the market for the body of the block, or raise AdmissionRejected."""
+        self._check_rate(user_id, market_id)
+        queue = self._queues.get(market_id)
+        if queue is None:
+            queue = self._queues[market_id] = MarketQueue()
+        await self._wait_for_slot(user_id, market_id, queue)
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._service_time = 0.9 * self._service_time + 0.1 * (time.monotonic() - started)
+            self._release(market_id, queue)
+
+
+admission_controller = AdmissionController()
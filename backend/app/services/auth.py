@@ -1,43 +1,87 @@
 from sqlalchemy.orm import Session
-from typing import Optional
-from ..models.user import User, generate_referral_code
+from sqlalchemy import select, update, or_
+from sqlalchemy.exc import IntegrityError
+from typing import Optional, Tuple
+from ..models.user import User, referral_code_for
 from ..schemas.user import UserCreate
 from ..utils.security import get_password_hash
 from ..config import settings
+from ..models.ledger import LedgerKind
+from . import ledger
+
+
+def registration_conflict(db: Session, email: str, username: str) -> Optional[str]:
+    """Why an email and username can't register (one indexed query for both), or None."""
+    taken = db.execute(
+        select(User.email, User.username).where(or_(User.email == email, User.username == username))
+    ).all()
+    if any(row.email == email for row in taken):
+        return "Email already registered"
+    if taken:
+        return "Username already taken"
+    return None
 
 
 def create_user(db: Session, user_data: UserCreate) -> User:
-    """Create a new user with hashed password and starting balance."""
+    """
+    Create a new user with hashed password and starting balance, in one
+    transaction. The referral code is derived from the new ID, so needs
+    no uniqueness lookups, and the referrer is credited by a single
+    UPDATE ... RETURNING that finds them too, so concurrent signups with
+    the same code can't lose a bonus.
+    """
     hashed_password = get_password_hash(user_data.password)
-    
-    # Generate unique referral code
-    referral_code = generate_referral_code()
-    while db.query(User).filter(User.referral_code == referral_code).first():
-        referral_code = generate_referral_code()
-    
-    # Check if referral code was provided and find referrer
+
     referred_by = None
     if user_data.referral_code:
-        referrer = db.query(User).filter(User.referral_code == user_data.referral_code).first()
-        if referrer:
-            referred_by = referrer.id
-            # Give referrer bonus coins
-            referrer.balance += 10000
-    
+        referred_by = db.execute(
+            update(User)
+            .where(User.referral_code == user_data.referral_code)
+            .values(balance=User.balance + settings.referral_bonus, equity=User.equity + settings.referral_bonus)
+            .returning(User.id)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+        if referred_by is not None:
+            ledger.record(db, referred_by, LedgerKind.REFERRAL_BONUS, coins=settings.referral_bonus)
+
     db_user = User(
         email=user_data.email,
         username=user_data.username,
         hashed_password=hashed_password,
         balance=settings.starting_balance,
-        referral_code=referral_code,
+        equity=settings.starting_balance,
         referred_by=referred_by
     )
     db.add(db_user)
+    db.flush()
+    # Written with the ledger entries when the transaction commits
+    db_user.referral_code = referral_code_for(db_user.id)
+    ledger.record(db, db_user.id, LedgerKind.SIGNUP_BONUS, coins=settings.starting_balance)
     db.commit()
     db.refresh(db_user)
     return db_user
 
 
+def register_user(db: Session, user_data: UserCreate) -> Tuple[Optional[User], Optional[str]]:
+    """
+    Registration (blocking: password hashing and the transaction). Taken
+    emails and usernames are checked up front; one registered concurrently
+    fails the insert on its unique index instead, rolling back the
+    referral bonus with it. Returns (user, None) or (None, error).
+    """
+    conflict = registration_conflict(db, user_data.email, user_data.username)
+    if conflict:
+        return None, conflict
+    try:
+        return create_user(db, user_data), None
+    except IntegrityError:
+        db.rollback()
+        conflict = registration_conflict(db, user_data.email, user_data.username)
+        if conflict is None:
+            raise
+        return None, conflict
+
+
 def get_user_by_email(db: Session, email: str) -> Optional[User]:
     """Get a user by email."""
     return db.query(User).filter(User.email == email).first()
@@ -61,6 +105,8 @@ def get_user_by_referral_code(db: Session, referral_code: str) -> Optional[User]
 def update_user_balance(db: Session, user: User, amount: int) -> User:
     """Update user balance (positive for credit, negative for debit)."""
     user.balance += amount
+    user.equity += amount
+    ledger.record(db, user.id, LedgerKind.ADJUSTMENT, coins=amount)
     db.commit()
     db.refresh(user)
     return user
@@ -0,0 +1,249 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, insert
+from collections import deque
+from typing import AsyncIterator, Deque, Iterator, List, Tuple
+from pydantic import ValidationError
+import codecs
+import csv
+import io
+import json
+from ..models.market import Market
+from ..models.order import Order, ArchivedOrder
+from ..models.position import Position
+from ..schemas.market import MarketCreate
+from .order_history import ORDER_COLUMNS
+from .market import MARKET_COLUMNS
+from .market_cache import market_versions
+from .market_schedule import market_closer
+from .replicas import replicas
+
+IMPORT_BATCH_SIZE = 500
+EXPORT_CHUNK_SIZE = 1000
+
+POSITION_EXPORT_COLUMNS = [
+    "id", "user_id", "market_id", "yes_shares", "no_shares",
+    "avg_yes_price", "avg_no_price", "created_at", "updated_at"
+]
+
+
+class BulkImportError(ValueError):
+    """Raised when a row of a bulk import cannot be parsed or validated."""
+
+    def __init__(self, line: int, message: str):
+        super().__init__(f"Line {line}: {message}")
+        self.line = line
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    """
+    Decode a streamed request body incrementally and split it into
+    numbered lines (each keeping its newline), without buffering it whole.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    line_number = 0
+    final = False
+    chunks = chunks.__aiter__()
+    while not final:
+        try:
+            chunk = await chunks.__anext__()
+        except StopAsyncIteration:
+            chunk, final = b"", True
+        try:
+            pending += decoder.decode(chunk, final=final)
+        except UnicodeDecodeError as e:
+            line = line_number + pending.count("\n") + e.object[:e.start].count(b"\n") + 1
+            raise BulkImportError(line, "invalid UTF-8")
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            line_number += 1
+            yield line_number, line + "\n"
+    if pending:
+        yield line_number + 1, pending
+
+
+class _LineFeed:
+    """Lines handed to a csv.reader as they arrive; a record is only read once all its lines have."""
+
+    def __init__(self):
+        self._lines: Deque[str] = deque()
+
+    def append(self, line: str) -> None:
+        self._lines.append(line)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self._lines:
+            raise StopIteration
+        return self._lines.popleft()
+
+
+async def _iter_csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple]:
+    """
+    Yield (line_number, dict) for each CSV row, from one csv.reader over the
+    body, so quoted fields may span lines (as the export writes them). A
+    row is complete once its quotes balance; its line number is its first.
+    """
+    feed = _LineFeed()
+    reader = csv.reader(feed)
+    header = None
+    in_quotes = False
+    first_line = 0
+    async for line_number, line in _iter_lines(chunks):
+        if not in_quotes:
+            first_line = line_number
+        feed.append(line)
+        in_quotes ^= line.count('"') % 2 == 1
+        if in_quotes:
+            continue
+        try:
+            values = next(reader)
+        except csv.Error as e:
+            raise BulkImportError(first_line, f"invalid CSV ({e})")
+        if not any(value.strip() for value in values):
+            continue
+        if header is None:
+            header = values
+            continue
+        yield first_line, {k: (v if v != "" else None) for k, v in zip(header, values)}
+    if in_quotes:
+        raise BulkImportError(first_line, "unterminated quoted field")
+
+
+async def _iter_records(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[tuple]:
+    """Yield (line_number, dict) for each NDJSON object or CSV row."""
+    if fmt == "csv":
+        async for record in _iter_csv_records(chunks):
+            yield record
+        return
+    async for line_number, line in _iter_lines(chunks):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise BulkImportError(line_number, f"invalid JSON ({e.msg})")
+        if not isinstance(record, dict):
+            raise BulkImportError(line_number, "expected a JSON object")
+        yield line_number, record
+
+
+def _market_row(line_number: int, record: dict) -> dict:
+    """Validate an import record with the same rules as single market creation."""
+    record = {k: v for k, v in record.items() if v is not None}
+    try:
+        market_data = MarketCreate(**record)
+    except ValidationError as e:
+        error = e.errors()[0]
+        field = ".".join(str(part) for part in error["loc"])
+        raise BulkImportError(line_number, f"{field}: {error['msg']}")
+    return {
+        "title": market_data.title,
+        "description": market_data.description,
+        "category": market_data.category,
+        "image_url": market_data.image_url,
+        "resolution_date": market_data.resolution_date,
+        "liquidity": market_data.liquidity,
+        "yes_price": 0.5,
+        "no_price": 0.5
+    }
+
+
+def _insert_markets(db: Session, batch: List[dict], scheduled: List[tuple]) -> None:
+    """Insert a batch of markets, noting the (ID, resolution date) of those that close on a date."""
+    rows = db.execute(insert(Market).returning(Market.id, Market.resolution_date), batch).all()
+    scheduled.extend(row for row in rows if row.resolution_date is not None)
+
+
+async def import_markets(db: Session, chunks: AsyncIterator[bytes], fmt: str = "ndjson") -> int:
+    """
+    Import markets from a streamed NDJSON or CSV body.
+    Rows are validated and written with multi-row INSERTs in batches, all in
+    one transaction: any invalid row aborts the whole import. Once it
+    commits, the imported markets are scheduled to close.
+    Returns the number of markets created.
+    """
+    batch: List[dict] = []
+    scheduled: List[tuple] = []
+    imported = 0
+    try:
+        async for line_number, record in _iter_records(chunks, fmt):
+            batch.append(_market_row(line_number, record))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                _insert_markets(db, batch, scheduled)
+                imported += len(batch)
+                batch = []
+        if batch:
+            _insert_markets(db, batch, scheduled)
+            imported += len(batch)
+        db.commit()
+        market_versions.bump()
+    except Exception:
+        db.rollback()
+        raise
+    for market_id, resolution_date in scheduled:
+        market_closer.schedule(market_id, resolution_date)
+    return imported
+
+
+def _format_value(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def _stream_rows(statements: list, columns: List[str], fmt: str) -> Iterator[str]:
+    """
+    Stream query results as NDJSON or CSV.
+    Uses its own session (on a replica when available) and a server-side
+    cursor (yield_per), so memory stays constant however many rows are exported.
+    """
+    db = replicas.session_factory()()
+    try:
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            yield buffer.getvalue()
+        for statement in statements:
+            result = db.execute(statement.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+            for rows in result.partitions():
+                if fmt == "csv":
+                    buffer = io.StringIO()
+                    writer = csv.writer(buffer)
+                    writer.writerows([[_format_value(v) for v in row] for row in rows])
+                    yield buffer.getvalue()
+                else:
+                    yield "".join(
+                        json.dumps({c: _format_value(v) for c, v in zip(columns, row)}) + "\n"
+                        for row in rows
+                    )
+    finally:
+        db.close()
+
+
+def export_markets(fmt: str = "ndjson") -> Iterator[str]:
+    """Stream all markets."""
+    statement = (
+        select(*[getattr(Market, c) for c in MARKET_COLUMNS])
+        .where(Market.deleted_at.is_(None))
+        .order_by(Market.id)
+    )
+    return _stream_rows([statement], MARKET_COLUMNS, fmt)
+
+
+def export_orders(fmt: str = "ndjson") -> Iterator[str]:
+    """Stream all orders, hot storage first, then the archive."""
+    statements = [
+        select(*[getattr(model, c) for c in ORDER_COLUMNS]).order_by(model.id)
+        for model in (Order, ArchivedOrder)
+    ]
+    return _stream_rows(statements, ORDER_COLUMNS, fmt)
+
+
+def export_positions(fmt: str = "ndjson") -> Iterator[str]:
+    """Stream all positions."""
+    statement = select(*[getattr(Position, c) for c in POSITION_EXPORT_COLUMNS]).order_by(Position.id)
+    return _stream_rows([statement], POSITION_EXPORT_COLUMNS, fmt)
@@ -0,0 +1,229 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, or_
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterator, Optional, Tuple
+import sys
+from ..models.market import Market, MarketStatus
+from ..models.position import Position
+
+# Market status as a small int, so each market's state holds no string
+STATUS_CODES = {MarketStatus.OPEN.value: 0, MarketStatus.CLOSED.value: 1, MarketStatus.RESOLVED.value: 2}
+
+# (yes_shares, no_shares, avg_yes_price, avg_no_price)
+PositionRow = Tuple[int, int, float, float]
+
+
+class MarketState:
+    """The fields of a market that trading reads and moves, without the ORM instance."""
+
+    __slots__ = ("market_id", "status", "yes_price", "no_price", "liquidity", "total_volume",
+                 "book_version", "resolution_ts")
+
+    def __init__(self, market_id: int, status: int, yes_price: float, no_price: float, liquidity: float,
+                 total_volume: float, book_version: int, resolution_ts: Optional[float]):
+        self.market_id = market_id
+        self.status = status
+        self.yes_price = yes_price
+        self.no_price = no_price
+        self.liquidity = liquidity
+        self.total_volume = total_volume
+        self.book_version = book_version
+        self.resolution_ts = resolution_ts  # UTC timestamp
+
+
+class MarketStates:
+    """Open markets by ID. Markets number in the thousands, so a slotted object each is cheap enough."""
+
+    def __init__(self):
+        self._markets: Dict[int, MarketState] = {}
+
+    def __len__(self) -> int:
+        return len(self._markets)
+
+    def get(self, market_id: int) -> Optional[MarketState]:
+        return self._markets.get(market_id)
+
+    def put(self, state: MarketState) -> None:
+        self._markets[state.market_id] = state
+
+    def remove(self, market_id: int) -> None:
+        self._markets.pop(market_id, None)
+
+    def load(self, db: Session, batch_size: int = 10000) -> int:
+        """Hydrate from the open, undeleted markets; only the needed columns are selected."""
+        from .trading import as_utc
+
+        rows = db.connection().execute(
+            select(
+                Market.id, Market.status, Market.yes_price, Market.no_price, Market.liquidity,
+                Market.total_volume, Market.book_version, Market.resolution_date
+            )
+            .where(Market.status == MarketStatus.OPEN.value, Market.deleted_at.is_(None))
+            .execution_options(yield_per=batch_size)
+        )
+        for row in rows:
+            self.put(MarketState(
+                row.id, STATUS_CODES[row.status], row.yes_price, row.no_price, row.liquidity,
+                row.total_volume or 0.0, row.book_version,
+                as_utc(row.resolution_date).timestamp() if row.resolution_date else None
+            ))
+        return len(self)
+
+    def memory_bytes(self) -> int:
+        """Approximate bytes held: the dict, the states and their float and int fields."""
+        size = sys.getsizeof(self._markets)
+        for state in self._markets.values():
+            size += sys.getsizeof(state) + sys.getsizeof(state.market_id)
+            size += sum(sys.getsizeof(getattr(state, f)) for f in ("yes_price", "no_price", "liquidity", "total_volume"))
+        return size
+
+
+class PositionStore:
+    """
+    Positions by (user ID, market ID), stored as columns in typed arrays:
+    40 bytes a position rather than the kilobytes of a Position instance,
+    and nothing for the garbage collector to track. A row's key packs both
+    IDs into one 64-bit int. Rows up to `_sorted` are in key order and are
+    found by bisection; rows appended since are indexed by user and market
+    until `compact` merges them in, which also drops positions that are now
+    empty. Compaction waits until an eighth as many rows have been appended,
+    so its cost per new position stays constant however large the store.
+    """
+
+    COMPACT_MIN_ROWS = 65536
+
+    def __init__(self):
+        self._keys = array("q")
+        self._yes = array("q")
+        self._no = array("q")
+        self._avg_yes = array("d")
+        self._avg_no = array("d")
+        self._sorted = 0
+        self._recent: Dict[int, Dict[int, int]] = {}  # User ID -> market ID -> row, for rows past _sorted
+        self._recent_rows = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @staticmethod
+    def key(user_id: int, market_id: int) -> int:
+        return user_id << 32 | market_id
+
+    def _find(self, user_id: int, market_id: int) -> Optional[int]:
+        key = self.key(user_id, market_id)
+        row = bisect_left(self._keys, key, 0, self._sorted)
+        if row < self._sorted and self._keys[row] == key:
+            return row
+        recent = self._recent.get(user_id)
+        return recent.get(market_id) if recent else None
+
+    def _row(self, row: int) -> PositionRow:
+        return self._yes[row], self._no[row], self._avg_yes[row], self._avg_no[row]
+
+    def get(self, user_id: int, market_id: int) -> Optional[PositionRow]:
+        row = self._find(user_id, market_id)
+        return None if row is None else self._row(row)
+
+    def set(self, user_id: int, market_id: int, yes_shares: int, no_shares: int,
+            avg_yes_price: float, avg_no_price: float) -> None:
+        row = self._find(user_id, market_id)
+        if row is None:
+            self._recent.setdefault(user_id, {})[market_id] = len(self._keys)
+            self._recent_rows += 1
+            self._keys.append(self.key(user_id, market_id))
+            self._yes.append(yes_shares)
+            self._no.append(no_shares)
+            self._avg_yes.append(avg_yes_price)
+            self._avg_no.append(avg_no_price)
+            if self._recent_rows >= max(self.COMPACT_MIN_ROWS, self._sorted // 8):
+                self.compact()
+            return
+        self._yes[row] = yes_shares
+        self._no[row] = no_shares
+        self._avg_yes[row] = avg_yes_price
+        self._avg_no[row] = avg_no_price
+
+    def user_positions(self, user_id: int) -> Iterator[Tuple[int, PositionRow]]:
+        """A user's (market ID, position) pairs; a user's sorted rows are contiguous."""
+        low, high = self.key(user_id, 0), self.key(user_id + 1, 0)
+        for row in range(bisect_left(self._keys, low, 0, self._sorted), bisect_left(self._keys, high, 0, self._sorted)):
+            yield self._keys[row] & 0xFFFFFFFF, self._row(row)
+        for market_id, row in self._recent.get(user_id, {}).items():
+            yield market_id, self._row(row)
+
+    def columns(self) -> Tuple[array, array, array, array, array]:
+        """The raw columns (keys, yes, no, avg yes, avg no), every row including appended ones, for bulk reads."""
+        return self._keys, self._yes, self._no, self._avg_yes, self._avg_no
+
+    def compact(self) -> None:
+        """Re-sort every row into the bisected region, dropping empty positions."""
+        # Mostly one sorted run and a short one: the sort is close to a linear merge
+        rows = sorted(
+            (row for row in range(len(self._keys)) if self._yes[row] or self._no[row]),
+            key=self._keys.__getitem__
+        )
+        for name in ("_keys", "_yes", "_no", "_avg_yes", "_avg_no"):
+            column = getattr(self, name)
+            setattr(self, name, array(column.typecode, (column[row] for row in rows)))
+        self._sorted = len(self._keys)
+        self._recent = {}
+        self._recent_rows = 0
+
+    def load(self, db: Session, batch_size: int = 10000) -> int:
+        """
+        Hydrate from the positions holding shares, streamed in key order
+        (the unique index on user and market), so rows land already sorted.
+        Run on the connection: plain rows skip the ORM's per-row loading.
+        """
+        rows = db.connection().execute(
+            select(
+                Position.user_id, Position.market_id, Position.yes_shares, Position.no_shares,
+                Position.avg_yes_price, Position.avg_no_price
+            )
+            .where(or_(Position.yes_shares > 0, Position.no_shares > 0))
+            .order_by(Position.user_id, Position.market_id)
+            .execution_options(yield_per=batch_size)
+        )
+        # A batch at a time, column by column
+        for batch in rows.partitions():
+            user_ids, market_ids, yes_shares, no_shares, avg_yes_prices, avg_no_prices = zip(*batch)
+            self._keys.extend(map(self.key, user_ids, market_ids))
+            self._yes.extend(shares or 0 for shares in yes_shares)
+            self._no.extend(shares or 0 for shares in no_shares)
+            self._avg_yes.extend(price or 0.0 for price in avg_yes_prices)
+            self._avg_no.extend(price or 0.0 for price in avg_no_prices)
+        self._sorted = len(self._keys)
+        self._recent = {}
+        self._recent_rows = 0
+        return len(self)
+
+    def memory_bytes(self) -> int:
+        """Approximate bytes held: the array buffers (with their spare capacity) and the append index."""
+        size = sum(
+            sys.getsizeof(column)
+            for column in (self._keys, self._yes, self._no, self._avg_yes, self._avg_no)
+        )
+        size += sys.getsizeof(self._recent) + sum(sys.getsizeof(markets) for markets in self._recent.values())
+        # Each recent entry also holds its user, market and row as int objects
+        return size + self._recent_rows * 64
+
+
+class EngineState:
+    """Trading state held in memory: the open markets and every position with shares."""
+
+    def __init__(self):
+        self.markets = MarketStates()
+        self.positions = PositionStore()
+
+    def load(self, db: Session) -> None:
+        self.markets.load(db)
+        self.positions.load(db)
+
+    def memory_usage(self) -> dict:
+        return {
+            "markets": len(self.markets),
+            "market_bytes": self.markets.memory_bytes(),
+            "positions": len(self.positions),
+            "position_bytes": self.positions.memory_bytes()
+        }
@@ -0,0 +1,180 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, func, and_
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import threading
+from ..config import settings
+from ..models.user import User
+from ..models.market import Market, MarketStatus, COINS_PER_DOLLAR
+from ..models.order import Order
+from ..models.position import Position
+from ..shared_state import broadcast, on_broadcast
+from .order_book import reserved_value
+from .trading import TradingEngine
+
+
+def position_value(user_id):
+    """
+    Scalar subquery: coins a user's shares are worth at current prices.
+    Positions in resolved markets are left out, since resolution already
+    paid them into the balance. `user_id` may be a column, to correlate
+    with an outer query.
+    """
+    return (
+        select(func.coalesce(func.sum(
+            (Position.yes_shares * Market.yes_price + Position.no_shares * Market.no_price) * COINS_PER_DOLLAR
+        ), 0))
+        .select_from(Position)
+        .join(Market, and_(
+            Market.id == Position.market_id,
+            Market.status != MarketStatus.RESOLVED.value,
+            Market.deleted_at.is_(None)
+        ))
+        .where(Position.user_id == user_id)
+        .scalar_subquery()
+    )
+
+
+def equity_query():
+    """
+    Per-user equity in coins: balance plus positions marked at current prices,
+    plus escrow held by resting limit orders.
+    Same valuation as the portfolio summary, as one query over all users.
+    Admin (house) accounts are not ranked.
+    """
+    return (
+        select(User.id, User.username, User.balance + position_value(User.id) + reserved_value(User.id))
+        .where(User.is_admin == False, User.is_active == True)  # noqa: E712
+    )
+
+
+class Leaderboard:
+    """
+    Users ranked by equity, kept in a sorted list of (-equity, user_id) keys.
+    Rank lookups are a binary search (O(log n)); top-N is a slice.
+    Updated incrementally after each trade and resolution, and fully
+    reconciled in the background to pick up price moves on held positions.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys: List[Tuple[int, int]] = []
+        self._equity: Dict[int, int] = {}
+        self._usernames: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _remove(self, user_id: int) -> None:
+        equity = self._equity.pop(user_id, None)
+        if equity is not None:
+            index = bisect_left(self._keys, (-equity, user_id))
+            del self._keys[index]
+
+    def set_equity(self, user_id: int, username: str, equity: float) -> None:
+        """Insert or move a user in the ranking."""
+        equity = int(round(equity))
+        with self._lock:
+            if self._equity.get(user_id) == equity:
+                return
+            self._remove(user_id)
+            self._equity[user_id] = equity
+            self._usernames[user_id] = username
+            insort(self._keys, (-equity, user_id))
+
+    def remove(self, user_id: int) -> None:
+        """Drop a user from the ranking."""
+        with self._lock:
+            self._remove(user_id)
+            self._usernames.pop(user_id, None)
+
+    def top(self, limit: int = 20, skip: int = 0) -> List[dict]:
+        """Get a page of the ranking, best first."""
+        with self._lock:
+            keys = self._keys[skip:skip + limit]
+            return [
+                {
+                    "rank": skip + i + 1,
+                    "user_id": user_id,
+                    "username": self._usernames[user_id],
+                    "equity": -negative_equity
+                }
+                for i, (negative_equity, user_id) in enumerate(keys)
+            ]
+
+    def rank(self, user_id: int) -> Optional[dict]:
+        """Get a user's rank and equity, or None if the user is not ranked."""
+        with self._lock:
+            equity = self._equity.get(user_id)
+            if equity is None:
+                return None
+            return {
+                "rank": bisect_left(self._keys, (-equity, user_id)) + 1,
+                "user_id": user_id,
+                "username": self._usernames[user_id],
+                "equity": equity
+            }
+
+    def refresh_users(self, db: Session, user_ids) -> None:
+        """Recompute equity for the given users."""
+        rows = db.execute(equity_query().where(User.id.in_(user_ids))).all()
+        for user_id, username, equity in rows:
+            self.set_equity(user_id, username, equity)
+
+    def reconcile(self, db: Session) -> None:
+        """Rebuild the ranking from the database."""
+        rows = db.execute(equity_query()).all()
+        keys = sorted((-int(round(equity)), user_id) for user_id, _, equity in rows)
+        with self._lock:
+            self._keys = keys
+            self._equity = {user_id: -negative_equity for negative_equity, user_id in keys}
+            self._usernames = {user_id: username for user_id, username, _ in rows}
+
+    def on_trade(self, db: Session, order: Order) -> None:
+        self.refresh_users(db, [order.user_id])
+        broadcast("leaderboard", {"user_ids": [order.user_id]})
+
+    def on_resolution(self, db: Session, market: Market) -> None:
+        user_ids = db.execute(
+            select(Position.user_id).where(Position.market_id == market.id)
+        ).scalars().all()
+        self.refresh_users(db, user_ids)
+        broadcast("leaderboard", {"user_ids": user_ids})
+
+    def on_broadcast(self, payload: dict) -> None:
+        """Re-value users that another worker saw trade."""
+        from ..database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            self.refresh_users(db, payload["user_ids"])
+        finally:
+            db.close()
+
+
+leaderboard = Leaderboard()
+TradingEngine.add_trade_listener(leaderboard.on_trade)
+TradingEngine.add_resolution_listener(leaderboard.on_resolution)
+on_broadcast("leaderboard", leaderboard.on_broadcast)
+
+
+def reconcile_leaderboard() -> None:
+    """Run a full reconciliation with its own session."""
+    from ..database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        leaderboard.reconcile(db)
+    finally:
+        db.close()
+
+
+async def leaderboard_loop() -> None:
+    """Background task: build the ranking, then reconcile it periodically."""
+    while True:
+        try:
+            await asyncio.to_thread(reconcile_leaderboard)
+        except Exception as e:
+            print(f"[Leaderboard] Reconciliation failed: {type(e).__name__}: {e}")
+        await asyncio.sleep(settings.leaderboard_reconcile_seconds)
@@ -0,0 +1,264 @@
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import select, delete, func, literal, union_all
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
+import asyncio
+from ..config import settings
+from ..shared_state import acquire_lease
+from ..models.ledger import LedgerEntry, LedgerKind, LedgerSnapshot, LedgerSnapshotPosition
+from ..models.position import Position
+from ..models.user import User
+
+
+def record(
+    db: Session,
+    user_id: int,
+    kind: LedgerKind,
+    coins: int = 0,
+    market_id: Optional[int] = None,
+    side: Optional[str] = None,
+    shares: int = 0,
+    order_id: Optional[int] = None
+) -> None:
+    """
+    Append a ledger entry to the caller's transaction, which makes the
+    matching change to the balance or position.
+    """
+    db.add(LedgerEntry(
+        user_id=user_id,
+        kind=kind.value,
+        coins=int(coins),
+        market_id=market_id,
+        yes_shares=shares if side == "yes" else 0,
+        no_shares=shares if side == "no" else 0,
+        order_id=order_id
+    ))
+
+
+class AccountState:
+    """A user's balance and shares per market, as of a ledger entry."""
+
+    __slots__ = ("user_id", "last_entry_id", "balance", "positions")
+
+    def __init__(self, user_id: int, last_entry_id: int = 0, balance: int = 0):
+        self.user_id = user_id
+        self.last_entry_id = last_entry_id
+        self.balance = balance
+        self.positions: Dict[int, List[int]] = {}  # market_id -> [yes_shares, no_shares]
+
+    def apply_shares(self, market_id: int, yes_shares: int, no_shares: int) -> None:
+        shares = self.positions.setdefault(market_id, [0, 0])
+        shares[0] += yes_shares
+        shares[1] += no_shares
+
+    def to_dict(self) -> dict:
+        return {
+            "user_id": self.user_id,
+            "last_entry_id": self.last_entry_id,
+            "balance": self.balance,
+            "positions": {
+                market_id: {"yes_shares": yes, "no_shares": no}
+                for market_id, (yes, no) in sorted(self.positions.items()) if yes or no
+            }
+        }
+
+
+def replay(db: Session, user_id: int, before: Optional[datetime] = None) -> AccountState:
+    """
+    Rebuild a user's balance and positions from the ledger: their latest
+    snapshot plus the entries after it (only those created before `before`,
+    if given).
+    """
+    snapshot = db.get(LedgerSnapshot, user_id)
+    after = snapshot.last_entry_id if snapshot else 0
+    state = AccountState(user_id, after, snapshot.balance if snapshot else 0)
+    if snapshot:
+        for position in db.execute(
+            select(LedgerSnapshotPosition).where(LedgerSnapshotPosition.user_id == user_id)
+        ).scalars():
+            state.apply_shares(position.market_id, position.yes_shares, position.no_shares)
+
+    # Bounded by the last entry seen, so both sums cover the same entries
+    newer = [LedgerEntry.user_id == user_id, LedgerEntry.id > after]
+    if before is not None:
+        newer.append(LedgerEntry.created_at < before)
+    upto = db.execute(select(func.max(LedgerEntry.id)).where(*newer)).scalar()
+    if upto is None:
+        return state
+    tail = (LedgerEntry.user_id == user_id, LedgerEntry.id > after, LedgerEntry.id <= upto)
+    state.balance += db.execute(select(func.sum(LedgerEntry.coins)).where(*tail)).scalar() or 0
+    for market_id, yes_shares, no_shares in db.execute(
+        select(LedgerEntry.market_id, func.sum(LedgerEntry.yes_shares), func.sum(LedgerEntry.no_shares))
+        .where(*tail, LedgerEntry.market_id.isnot(None))
+        .group_by(LedgerEntry.market_id)
+    ):
+        state.apply_shares(market_id, yes_shares, no_shares)
+    state.last_entry_id = upto
+    return state
+
+
+def take_snapshot(db: Session, user_id: int) -> bool:
+    """
+    Replace a user's snapshot with their ledger state, within the caller's
+    transaction. Returns False if there was nothing new to include.
+    Entries younger than settings.ledger_snapshot_settle_seconds are left
+    out: IDs are assigned before commit, so a recent entry may still be
+    joined by an uncommitted one with a lower ID that the snapshot must not
+    skip past.
+    """
+    settled = datetime.now(timezone.utc) - timedelta(seconds=settings.ledger_snapshot_settle_seconds)
+    state = replay(db, user_id, before=settled)
+    snapshot = db.get(LedgerSnapshot, user_id)
+    if state.last_entry_id == (snapshot.last_entry_id if snapshot else 0):
+        return False
+    if snapshot is None:
+        snapshot = LedgerSnapshot(user_id=user_id)
+        db.add(snapshot)
+    snapshot.last_entry_id = state.last_entry_id
+    snapshot.balance = state.balance
+    snapshot.taken_at = func.now()
+    db.execute(delete(LedgerSnapshotPosition).where(LedgerSnapshotPosition.user_id == user_id))
+    db.add_all([
+        LedgerSnapshotPosition(user_id=user_id, market_id=market_id, yes_shares=yes, no_shares=no)
+        for market_id, (yes, no) in state.positions.items() if yes or no
+    ])
+    return True
+
+
+def _tail_after_snapshot(snapshot):
+    """Condition for ledger entries newer than the (outer-joined) snapshot."""
+    return LedgerEntry.id > func.coalesce(snapshot.last_entry_id, 0)
+
+
+def snapshot_users(db: Session, min_entries: int = 1, batch_size: Optional[int] = None) -> int:
+    """
+    Snapshot every user with at least `min_entries` ledger entries since
+    their last snapshot, a batch of users per transaction.
+    Returns the number of snapshots taken.
+    """
+    batch_size = batch_size or settings.ledger_batch_size
+    snapshot = aliased(LedgerSnapshot)
+    new_entries = (
+        select(func.count())
+        .where(LedgerEntry.user_id == User.id, _tail_after_snapshot(snapshot))
+        .scalar_subquery()
+    )
+    taken = 0
+    after = 0
+    while True:
+        rows = db.execute(
+            select(User.id, new_entries)
+            .outerjoin(snapshot, snapshot.user_id == User.id)
+            .where(User.id > after)
+            .order_by(User.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return taken
+        for user_id, count in rows:
+            if count >= min_entries and take_snapshot(db, user_id):
+                taken += 1
+        db.commit()
+        after = rows[-1][0]
+
+
+def check_consistency(db: Session, batch_size: Optional[int] = None) -> Iterator[dict]:
+    """
+    Compare every balance and position with the ledger (snapshot + tail),
+    streaming over users in ID order a batch at a time. Each comparison is a
+    single statement, so it sees one consistent state without locking
+    anything; trades can continue while the check runs.
+    Yields one dict per mismatch: user_id, market_id (None for the balance),
+    expected and actual.
+    """
+    batch_size = batch_size or settings.ledger_batch_size
+    snapshot = aliased(LedgerSnapshot)
+    tail_coins = (
+        select(func.coalesce(func.sum(LedgerEntry.coins), 0))
+        .where(LedgerEntry.user_id == User.id, _tail_after_snapshot(snapshot))
+        .scalar_subquery()
+    )
+    after = 0
+    while True:
+        rows = db.execute(
+            select(User.id, User.balance, func.coalesce(snapshot.balance, 0) + tail_coins)
+            .outerjoin(snapshot, snapshot.user_id == User.id)
+            .where(User.id > after)
+            .order_by(User.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        for user_id, balance, expected in rows:
+            if balance != expected:
+                yield {"user_id": user_id, "market_id": None, "expected": expected, "actual": balance}
+
+        yield from _check_positions(db, after, rows[-1][0])
+        after = rows[-1][0]
+        db.rollback()  # End the read transaction between batches
+
+
+def _check_positions(db: Session, after: int, upto: int) -> Iterator[dict]:
+    """Compare the positions of users in (after, upto] with the ledger, in one statement."""
+    snapshot = aliased(LedgerSnapshot)
+    actual = select(
+        Position.user_id, Position.market_id, Position.yes_shares, Position.no_shares, literal(True)
+    ).where(Position.user_id > after, Position.user_id <= upto)
+    snapshotted = select(
+        LedgerSnapshotPosition.user_id, LedgerSnapshotPosition.market_id,
+        LedgerSnapshotPosition.yes_shares, LedgerSnapshotPosition.no_shares, literal(False)
+    ).where(LedgerSnapshotPosition.user_id > after, LedgerSnapshotPosition.user_id <= upto)
+    tail = (
+        select(
+            LedgerEntry.user_id, LedgerEntry.market_id,
+            func.sum(LedgerEntry.yes_shares), func.sum(LedgerEntry.no_shares), literal(False)
+        )
+        .outerjoin(snapshot, snapshot.user_id == LedgerEntry.user_id)
+        .where(
+            LedgerEntry.user_id > after, LedgerEntry.user_id <= upto,
+            LedgerEntry.market_id.isnot(None), _tail_after_snapshot(snapshot)
+        )
+        .group_by(LedgerEntry.user_id, LedgerEntry.market_id)
+    )
+
+    # (user_id, market_id) -> [expected yes, expected no, actual yes, actual no]
+    accounts: Dict[tuple, List[int]] = {}
+    for user_id, market_id, yes_shares, no_shares, is_actual in db.execute(union_all(actual, snapshotted, tail)):
+        shares = accounts.setdefault((user_id, market_id), [0, 0, 0, 0])
+        offset = 2 if is_actual else 0
+        shares[offset] += yes_shares or 0
+        shares[offset + 1] += no_shares or 0
+    for (user_id, market_id), (expected_yes, expected_no, yes_shares, no_shares) in sorted(accounts.items()):
+        if (expected_yes, expected_no) != (yes_shares, no_shares):
+            yield {
+                "user_id": user_id,
+                "market_id": market_id,
+                "expected": {"yes_shares": expected_yes, "no_shares": expected_no},
+                "actual": {"yes_shares": yes_shares, "no_shares": no_shares}
+            }
+
+
+def run_snapshots() -> int:
+    """Snapshot users with enough new entries (own session; runs in a worker thread)."""
+    from ..database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return snapshot_users(db, settings.ledger_snapshot_min_entries)
+    finally:
+        db.close()
+
+
+async def ledger_snapshot_loop() -> None:
+    """Background task: snapshot busy accounts every configured interval."""
+    while True:
+        await asyncio.sleep(settings.ledger_snapshot_interval_seconds)
+        # Only one worker across the deployment runs each pass
+        if not acquire_lease("ledger_snapshot", settings.ledger_snapshot_interval_seconds * 2):
+            continue
+        try:
+            taken = await asyncio.to_thread(run_snapshots)
+            if taken:
+                print(f"[Ledger] Snapshotted {taken} accounts")
+        except Exception as e:
+            print(f"[Ledger] Snapshot failed: {type(e).__name__}: {e}")
@@ -1,7 +1,28 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import select, func, literal_column, table, column
 from typing import List, Optional
+import re
 from ..models.market import Market, MarketStatus, MarketCategory
-from ..schemas.market import MarketCreate, MarketUpdate
+from ..schemas.market import MarketCreate, MarketUpdate, MarketResponse, MarketSort
+from .market_cache import market_versions
+from .market_schedule import market_statuses, market_closer
+from .trading import trading_engine
+
+# Market columns exposed by the API, in MarketResponse field order
+MARKET_COLUMNS = list(MarketResponse.model_fields)
+
+# Listing order per sort; each key has an index, so a page is an index scan (ties: newest first)
+MARKET_SORTS = {
+    MarketSort.NEWEST: (Market.created_at.desc(), Market.id.desc()),
+    MarketSort.VOLUME: (Market.total_volume.desc(), Market.id.desc()),
+    MarketSort.VOLUME_24H: (Market.volume_24h.desc(), Market.id.desc()),
+    MarketSort.PRICE_CHANGE_24H: (Market.price_change_24h.desc(), Market.id.desc()),
+    MarketSort.CLOSING_SOON: (Market.resolution_date, Market.id),  # Open markets only
+}
+
+# Full-text index (migration 0005): FTS5 table on SQLite, tsvector column on PostgreSQL
+markets_fts = table("markets_fts", column("rowid"))
+SEARCH_MAX_TERMS = 8
 
 
 def create_market(db: Session, market_data: MarketCreate) -> Market:
@@ -19,51 +40,133 @@ def create_market(db: Session, market_data: MarketCreate) -> Market:
     db.add(db_market)
     db.commit()
     db.refresh(db_market)
+    market_versions.bump(db_market.id)
+    market_closer.schedule(db_market.id, db_market.resolution_date)
     return db_market
 
 
 def get_market(db: Session, market_id: int) -> Optional[Market]:
     """Get a market by ID."""
-    return db.query(Market).filter(Market.id == market_id).first()
+    return db.query(Market).filter(Market.id == market_id, Market.deleted_at.is_(None)).first()
 
 
-def get_markets(
+def _listing_filters(
+    category: Optional[str],
+    status: Optional[str],
+    sort: MarketSort
+) -> list:
+    filters = [Market.deleted_at.is_(None)]
+    if category:
+        filters.append(Market.category == category)
+    if status:
+        filters.append(Market.status == status)
+    if sort == MarketSort.CLOSING_SOON:
+        filters += [Market.status == MarketStatus.OPEN.value, Market.resolution_date.isnot(None)]
+    return filters
+
+
+def get_market_rows(
     db: Session,
     skip: int = 0,
     limit: int = 20,
     category: Optional[str] = None,
+    status: Optional[str] = None,
+    sort: MarketSort = MarketSort.NEWEST
+) -> List[dict]:
+    """Get a page of markets with optional filtering, in the given sort order, as plain dicts of response columns."""
+    query = (
+        select(*[getattr(Market, c) for c in MARKET_COLUMNS])
+        .where(*_listing_filters(category, status, sort))
+        .order_by(*MARKET_SORTS[sort])
+        .offset(skip)
+        .limit(limit)
+    )
+    return [dict(row) for row in db.execute(query).mappings()]
+
+
+def _search_terms(q: str) -> List[str]:
+    """Words of a search query, lowercased; anything else (operators, quotes) is dropped."""
+    return re.findall(r"\w+", q.lower())[:SEARCH_MAX_TERMS]
+
+
+def search_market_rows(
+    db: Session,
+    q: str,
+    skip: int = 0,
+    limit: int = 20,
+    category: Optional[str] = None,
     status: Optional[str] = None
-) -> List[Market]:
-    """Get a list of markets with optional filtering."""
-    query = db.query(Market)
-    
+) -> List[dict]:
+    """
+    Markets whose title or description contains every word of `q`, the last
+    word matched as a prefix (search as you type), best matches first; title
+    matches rank above description matches. Projected like get_market_rows.
+    Every match is ranked, so a page deep into a common term's results is
+    still in rank order; the database keeps only the top skip + limit.
+    """
+    terms = _search_terms(q)
+    if not terms:
+        return []
+
+    filters = [Market.deleted_at.is_(None)]
     if category:
-        query = query.filter(Market.category == category)
+        filters.append(Market.category == category)
     if status:
-        query = query.filter(Market.status == status)
-    
-    return query.order_by(Market.created_at.desc()).offset(skip).limit(limit).all()
+        filters.append(Market.status == status)
+
+    query = select(*[getattr(Market, c) for c in MARKET_COLUMNS])
+    if db.get_bind().dialect.name == "postgresql":
+        # bitcoin & pric:* (to_tsquery stems each term like the indexed text)
+        tsquery = func.to_tsquery("english", " & ".join(terms[:-1] + [f"{terms[-1]}:*"]))
+        search_vector = literal_column("markets.search_vector")
+        score = -func.ts_rank(search_vector, tsquery)  # Lowest first, like bm25
+        query = query.where(search_vector.op("@@")(tsquery), *filters)
+    else:
+        # "bitcoin" "pric"* (implicit AND; quoted, so terms can't be FTS5 syntax)
+        match = " ".join([f'"{t}"' for t in terms[:-1]] + [f'"{terms[-1]}"*'])
+        score = func.bm25(literal_column("markets_fts"), 10.0, 1.0)
+        query = (
+            query.select_from(markets_fts)
+            .join(Market, Market.id == markets_fts.c.rowid)
+            .where(literal_column("markets_fts").op("MATCH")(match), *filters)
+        )
+
+    query = query.order_by(score, Market.id.desc()).offset(skip).limit(limit)
+    return [dict(row) for row in db.execute(query).mappings()]
 
 
 def update_market(db: Session, market: Market, market_data: MarketUpdate) -> Market:
-    """Update a market."""
+    """
+    Update a market. Closing it (status moving away from open) cancels its
+    resting orders, as the scheduled close does.
+    """
     update_data = market_data.model_dump(exclude_unset=True)
+    was_open = market.status == MarketStatus.OPEN.value
     for field, value in update_data.items():
         setattr(market, field, value)
     db.commit()
     db.refresh(market)
+    market_versions.bump(market.id)
+    if "status" in update_data or "resolution_date" in update_data:
+        market_statuses.invalidate([market.id])
+        market_closer.schedule(market.id, market.resolution_date)
+    if was_open and market.status != MarketStatus.OPEN.value:
+        # Orders check the status under the market's lock, so none rest after this
+        trading_engine.cancel_market_orders(db, market.id)
+        db.refresh(market)
     return market
 
 
 def get_market_stats(db: Session) -> dict:
     """Get overall market statistics."""
-    total_markets = db.query(Market).count()
-    open_markets = db.query(Market).filter(Market.status == MarketStatus.OPEN.value).count()
-    resolved_markets = db.query(Market).filter(Market.status == MarketStatus.RESOLVED.value).count()
+    markets = db.query(Market).filter(Market.deleted_at.is_(None))
+    total_markets = markets.count()
+    open_markets = markets.filter(Market.status == MarketStatus.OPEN.value).count()
+    resolved_markets = markets.filter(Market.status == MarketStatus.RESOLVED.value).count()
     
     # Total volume across all markets
     from sqlalchemy import func
-    total_volume = db.query(func.sum(Market.total_volume)).scalar() or 0
+    total_volume = db.query(func.sum(Market.total_volume)).filter(Market.deleted_at.is_(None)).scalar() or 0
     
     return {
         "total_markets": total_markets,
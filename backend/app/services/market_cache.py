@@ -0,0 +1,105 @@
+from sqlalchemy.orm import Session
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+import hashlib
+import threading
+import time
+from ..config import settings
+from ..shared_state import shared_state
+from .trading import TradingEngine
+
+
+class MarketVersions:
+    """
+    Version counters for market data, bumped after every committed write.
+    Market ETags are built from these counters, so a conditional request
+    can be answered with 304 before any query or serialization happens.
+    The counters live in the shared state store, so every worker agrees.
+    """
+
+    def __init__(self):
+        # Distinguishes these counters from those of an earlier store (e.g. a restarted memory store)
+        shared_state.set("market:epoch", format(time.time_ns(), "x"), nx=True)
+
+    def bump(self, market_id: Optional[int] = None) -> None:
+        """Record a change to one market (or to the market set as a whole)."""
+        # Before the counters, so a reader that sees the new version also sees the change time
+        shared_state.set("market:changed_at", repr(time.time()))
+        shared_state.incr("market:list_version")
+        if market_id is not None:
+            shared_state.incr(f"market:{market_id}:version")
+
+    def changed_within(self, seconds: float) -> bool:
+        """Whether any market was written in the last `seconds` seconds."""
+        changed_at = shared_state.get("market:changed_at")
+        return changed_at is not None and time.time() - float(changed_at) < seconds
+
+    def _epoch(self) -> str:
+        return shared_state.get("market:epoch") or "0"
+
+    def list_etag(self, *params) -> str:
+        """ETag for a market listing or aggregate, varying by its query parameters."""
+        key = hashlib.blake2b(repr(params).encode(), digest_size=6).hexdigest()
+        version = shared_state.get("market:list_version") or 0
+        return f'W/"ml-{self._epoch()}-{version}-{key}"'
+
+    def market_etag(self, market_id: int) -> str:
+        """ETag for a single market."""
+        version = shared_state.get(f"market:{market_id}:version") or 0
+        return f'W/"m-{self._epoch()}-{market_id}-{version}"'
+
+    def on_trade(self, db: Session, order) -> None:
+        self.bump(order.market_id)
+
+    def on_resolution(self, db: Session, market) -> None:
+        self.bump(market.id)
+
+
+market_versions = MarketVersions()
+TradingEngine.add_trade_listener(market_versions.on_trade)
+TradingEngine.add_resolution_listener(market_versions.on_resolution)
+
+
+class MarketListCache:
+    """
+    The first rows of each market listing (sort, category, status), held by
+    this worker and tagged with the list ETag they were loaded under. Pages
+    within those rows are sliced from memory until any market changes, so
+    popular listings, e.g. trending per category, cost one query per change.
+    """
+
+    # Listings kept; query parameters are free-form, so the least recently used are dropped
+    MAX_ENTRIES = 256
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, Tuple[str, List[dict]]]" = OrderedDict()
+
+    def get(self, key: tuple, etag: str) -> Optional[List[dict]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != etag:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: tuple, etag: str, rows: List[dict]) -> None:
+        with self._lock:
+            self._entries[key] = (etag, rows)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+
+market_lists = MarketListCache()
+
+
+def public_cache_control() -> str:
+    """
+    Cache-Control for anonymous market reads: browsers always revalidate
+    (cheap 304s), while shared caches may serve a response for a few seconds.
+    """
+    return f"public, max-age=0, s-maxage={settings.market_cache_max_age}"
+
+
+PRIVATE_CACHE_CONTROL = "private, no-cache"
@@ -0,0 +1,193 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, delete, update, insert, func, literal, or_
+from datetime import datetime, timezone
+from typing import Optional, Set
+import threading
+import orjson
+from ..config import settings
+from ..models.market import Market
+from ..models.order import Order, ArchivedOrder
+from ..models.position import Position
+from ..models.proposal import MarketProposal
+from ..models.ledger import LedgerEntry, LedgerKind
+from ..shared_state import acquire_lease, shared_state
+from .market_cache import market_versions
+from .market_schedule import market_statuses
+from .order_book import order_books
+from .trading import trading_engine
+
+# Markets this worker is purging, so a second thread leaves them alone
+_purging: Set[int] = set()
+_purging_lock = threading.Lock()
+
+
+def _save_progress(progress: dict) -> None:
+    """Publish a market's purge progress to every worker, for the deletion status endpoint."""
+    shared_state.set(
+        f"market:{progress['market_id']}:purge",
+        orjson.dumps(progress).decode(),
+        ttl=settings.market_purge_progress_ttl_seconds
+    )
+
+
+def _load_progress(market_id: int) -> Optional[dict]:
+    value = shared_state.get(f"market:{market_id}:purge")
+    return orjson.loads(value) if value else None
+
+
+def mark_market_deleted(db: Session, market: Market) -> None:
+    """
+    Soft-delete a market: a single-row UPDATE, after which every read path
+    treats the market as gone. Dependent rows are purged separately.
+    Resting limit orders are cancelled first, returning their escrow.
+    """
+    with order_books.lock(market.id):
+        locked_market = db.execute(
+            select(Market).where(Market.id == market.id).with_for_update()
+        ).scalar_one()
+        trading_engine.cancel_resting_orders(db, locked_market)
+        locked_market.deleted_at = datetime.now(timezone.utc)
+        db.commit()
+    market_versions.bump(market.id)
+    market_statuses.invalidate([market.id])
+    _save_progress({
+        "market_id": market.id,
+        "status": "pending",
+        "orders_deleted": 0,
+        "positions_deleted": 0,
+        "started_at": None,
+        "finished_at": None
+    })
+
+
+def _forfeit_positions(db: Session, ids) -> None:
+    """Record the shares of positions about to be deleted as forfeited in the ledger."""
+    db.execute(insert(LedgerEntry).from_select(
+        ["user_id", "kind", "coins", "market_id", "yes_shares", "no_shares"],
+        select(
+            Position.user_id, literal(LedgerKind.FORFEIT.value), literal(0), Position.market_id,
+            -func.coalesce(Position.yes_shares, 0), -func.coalesce(Position.no_shares, 0)
+        ).where(Position.id.in_(ids), or_(Position.yes_shares != 0, Position.no_shares != 0))
+    ))
+
+
+def _purge_lease(market_id: int) -> bool:
+    return acquire_lease(f"purge:{market_id}", settings.market_purge_lease_seconds)
+
+
+def _delete_in_batches(
+    db: Session, model, market_id: int, batch_size: int, progress: dict, progress_key: str, before_delete=None
+) -> None:
+    """
+    Delete a market's dependent rows in bounded, separately committed batches,
+    adding each batch's count to progress[progress_key] and publishing it.
+    before_delete(db, ids), if given, runs in each batch's transaction first.
+    """
+    while True:
+        if not _purge_lease(market_id):
+            raise RuntimeError("Purge lease lost to another worker")
+        ids = select(model.id).where(model.market_id == market_id).limit(batch_size)
+        if before_delete:
+            # Pin and lock the batch, so the callback and the delete see the same rows
+            # and a purge that overlaps this one can't act on them too
+            ids = db.execute(ids.with_for_update()).scalars().all()
+            before_delete(db, ids)
+        deleted = db.execute(
+            delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        progress[progress_key] += deleted
+        _save_progress(progress)
+        if deleted < batch_size:
+            break
+
+
+def purge_market(market_id: int, batch_size: Optional[int] = None) -> None:
+    """
+    Remove a soft-deleted market and everything that references it.
+    Each batch is its own short transaction, so locks and WAL volume stay
+    bounded however large the market is. Runs only on the worker holding
+    the market's purge lease; others leave it alone.
+    """
+    from ..database import SessionLocal
+
+    batch_size = batch_size or settings.market_purge_batch_size
+    if not _purge_lease(market_id):
+        print(f"[Markets] Market {market_id} is being purged by another worker")
+        return
+    with _purging_lock:
+        if market_id in _purging:
+            return  # Already running in another thread of this worker
+        _purging.add(market_id)
+    # Counts carry on from an earlier, interrupted purge
+    progress = _load_progress(market_id) or {
+        "market_id": market_id, "orders_deleted": 0, "positions_deleted": 0, "finished_at": None
+    }
+    progress["status"] = "purging"
+    progress["started_at"] = datetime.now(timezone.utc)
+    _save_progress(progress)
+
+    db = SessionLocal()
+    try:
+        market = db.get(Market, market_id)
+        if market is None or market.deleted_at is None:
+            raise ValueError("Market is not marked as deleted")
+
+        _delete_in_batches(db, Order, market_id, batch_size, progress, "orders_deleted")
+        _delete_in_batches(db, ArchivedOrder, market_id, batch_size, progress, "orders_deleted")
+        _delete_in_batches(db, Position, market_id, batch_size, progress, "positions_deleted", _forfeit_positions)
+
+        db.execute(
+            update(MarketProposal)
+            .where(MarketProposal.market_id == market_id)
+            .values(market_id=None)
+        )
+        db.execute(delete(Market).where(Market.id == market_id))
+        db.commit()
+
+        # Kept after the market row is gone, so a poll can still see the purge finished
+        progress["status"] = "done"
+        progress["finished_at"] = datetime.now(timezone.utc)
+        _save_progress(progress)
+    except Exception as e:
+        db.rollback()
+        if _purge_lease(market_id):  # A worker that lost the lease leaves the new holder's progress alone
+            progress["status"] = "failed"
+            progress["error"] = str(e)
+            _save_progress(progress)
+        print(f"[Markets] Purge of market {market_id} failed: {type(e).__name__}: {e}")
+    finally:
+        db.close()
+        with _purging_lock:
+            _purging.discard(market_id)
+
+
+def get_purge_progress(db: Session, market_id: int) -> Optional[dict]:
+    """Get the deletion progress of a market, or None if it was never deleted."""
+    progress = _load_progress(market_id)
+    if progress:
+        return progress
+
+    # Progress expired or never published: infer the state from the database
+    row = db.execute(
+        select(Market.deleted_at).where(Market.id == market_id)
+    ).first()
+    if row is None or row.deleted_at is None:
+        return None
+    return {"market_id": market_id, "status": "pending"}
+
+
+def resume_pending_purges() -> None:
+    """Purge markets that were soft-deleted but not purged (e.g. after a restart)."""
+    from ..database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        market_ids = db.execute(
+            select(Market.id).where(Market.deleted_at.isnot(None))
+        ).scalars().all()
+    finally:
+        db.close()
+
+    for market_id in market_ids:
+        purge_market(market_id)
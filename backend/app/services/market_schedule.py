@@ -0,0 +1,256 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, update, and_
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import heapq
+import threading
+from ..config import settings
+from ..models.market import Market, MarketStatus
+from ..models.order import Order
+from ..shared_state import acquire_lease, broadcast, on_broadcast
+from .market_cache import market_versions
+from .order_book import RESTING_STATUSES
+from .trading import TradingEngine, trading_engine, as_utc, resolution_passed
+
+
+class MarketStatusCache:
+    """
+    Each market's status and resolution date as seen by this worker, so the
+    order path can turn away closed markets without a query. Status changes
+    are rare (close, resolve, delete, admin edits) and each is broadcast to
+    every worker; the trade itself re-checks the locked row.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._markets: Dict[int, Tuple[str, Optional[datetime]]] = {}
+
+    def is_open(self, db: Session, market_id: int) -> Optional[bool]:
+        """Whether a market accepts orders, or None if there is no such market."""
+        with self._lock:
+            cached = self._markets.get(market_id)
+        if cached is None:
+            row = db.execute(
+                select(Market.status, Market.resolution_date)
+                .where(Market.id == market_id, Market.deleted_at.is_(None))
+            ).first()
+            if row is None:
+                return None  # Not cached: IDs are client-supplied
+            cached = (row.status, row.resolution_date)
+            with self._lock:
+                self._markets[market_id] = cached
+        status, resolution_date = cached
+        return status == MarketStatus.OPEN.value and not resolution_passed(resolution_date)
+
+    def forget(self, market_ids: List[int]) -> None:
+        with self._lock:
+            for market_id in market_ids:
+                self._markets.pop(market_id, None)
+
+    def invalidate(self, market_ids: List[int]) -> None:
+        """Drop markets whose status changed, here and on every other worker."""
+        self.forget(market_ids)
+        broadcast("market_status", {"market_ids": market_ids})
+
+    def on_resolution(self, db: Session, market: Market) -> None:
+        self.invalidate([market.id])
+
+    def on_broadcast(self, payload: dict) -> None:
+        self.forget(payload["market_ids"])
+
+
+market_statuses = MarketStatusCache()
+TradingEngine.add_resolution_listener(market_statuses.on_resolution)
+on_broadcast("market_status", market_statuses.on_broadcast)
+
+
+def close_due_markets(db: Session, market_ids: Optional[List[int]] = None, batch_size: Optional[int] = None) -> List[int]:
+    """
+    Close open markets whose resolution date has passed (only those in
+    `market_ids`, if given), in batched UPDATEs committed one at a time.
+    Each candidate is re-checked by the UPDATE itself, so stale schedule
+    entries are harmless. Resting limit orders of closed markets are then
+    cancelled, returning their escrow. Returns the IDs of the markets closed.
+    """
+    batch_size = batch_size or settings.market_close_batch_size
+    due = and_(
+        Market.status == MarketStatus.OPEN.value,
+        Market.resolution_date <= datetime.now(timezone.utc),
+        Market.deleted_at.is_(None)
+    )
+    closed: List[int] = []
+    pending = list(market_ids) if market_ids is not None else None
+    while True:
+        if pending is None:
+            candidates = select(Market.id).where(due).order_by(Market.resolution_date).limit(batch_size)
+        elif pending:
+            candidates, pending = pending[:batch_size], pending[batch_size:]
+        else:
+            break
+        batch = db.execute(
+            update(Market)
+            .where(Market.id.in_(candidates), due)
+            .values(status=MarketStatus.CLOSED.value)
+            .returning(Market.id)
+        ).scalars().all()
+        db.commit()
+        if not batch and market_ids is None:
+            break
+        closed.extend(batch)
+        if batch:
+            cancel_closed_market_orders(db, batch)
+    return closed
+
+
+def cancel_closed_market_orders(db: Session, market_ids: List[int]) -> None:
+    """
+    Cancel the resting orders of just-closed markets, a market per
+    transaction; markets without any are skipped without taking their lock.
+    """
+    with_orders = db.execute(
+        select(Order.market_id)
+        .where(Order.market_id.in_(market_ids), Order.status.in_(RESTING_STATUSES))
+        .distinct()
+    ).scalars().all()
+    for market_id in sorted(with_orders):
+        trading_engine.cancel_market_orders(db, market_id)
+
+
+class MarketCloseScheduler:
+    """
+    Closes markets when their resolution date passes. Pending closes are a
+    min-heap of (resolution time, market ID), topped up from the database
+    every refresh interval with the markets due before the next one (an
+    index range scan on status and resolution_date); markets created or
+    rescheduled in the meantime are pushed directly, on every worker.
+    Only the worker holding the lease closes markets; the others discard
+    their due entries. Entries are never removed early: a close re-checks
+    the market, so an outdated entry just does nothing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heap: List[Tuple[float, int]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def _push(self, market_id: int, resolution_date: datetime) -> bool:
+        """Add an entry; returns whether it is now the earliest."""
+        key = (as_utc(resolution_date).timestamp(), market_id)
+        with self._lock:
+            heapq.heappush(self._heap, key)
+            return self._heap[0] == key
+
+    def schedule(self, market_id: int, resolution_date: Optional[datetime]) -> None:
+        """Close a market at its (new) resolution date, whichever worker runs the closes."""
+        if resolution_date is None:
+            return
+        payload = {"market_id": market_id, "resolution_date": resolution_date.isoformat()}
+        self.receive(payload)
+        broadcast("market_schedule", payload)
+
+    def receive(self, payload: dict) -> None:
+        if self._loop is None:
+            return  # Not running (yet); the first refresh loads every market due soon
+        if self._push(payload["market_id"], datetime.fromisoformat(payload["resolution_date"])):
+            self._loop.call_soon_threadsafe(self._wakeup.set)  # Sooner than the loop is sleeping for
+
+    def refresh(self, db: Session, horizon: timedelta) -> int:
+        """Load the open markets due within `horizon` (overdue ones included)."""
+        rows = db.execute(
+            select(Market.id, Market.resolution_date).where(
+                Market.status == MarketStatus.OPEN.value,
+                Market.resolution_date <= datetime.now(timezone.utc) + horizon,
+                Market.deleted_at.is_(None)
+            )
+        ).all()
+        for market_id, resolution_date in rows:
+            self._push(market_id, resolution_date)
+        return len(rows)
+
+    def pop_due(self, now: float) -> List[int]:
+        due = set()
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due.add(heapq.heappop(self._heap)[1])
+        return sorted(due)
+
+    def seconds_until_next(self, now: float) -> Optional[float]:
+        with self._lock:
+            return max(0.0, self._heap[0][0] - now) if self._heap else None
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+
+    async def wait(self, timeout: float) -> None:
+        """Sleep until `timeout` passes or an earlier close is scheduled."""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+
+market_closer = MarketCloseScheduler()
+on_broadcast("market_schedule", market_closer.receive)
+
+
+def _refresh_schedule(horizon: timedelta) -> int:
+    from ..database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return market_closer.refresh(db, horizon)
+    finally:
+        db.close()
+
+
+def run_market_closes(market_ids: Optional[List[int]]) -> List[int]:
+    """Close due markets (own session; runs in a worker thread) and invalidate caches."""
+    from ..database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        closed = close_due_markets(db, market_ids)
+    finally:
+        db.close()
+    if closed:
+        for market_id in closed:
+            market_versions.bump(market_id)
+        market_statuses.invalidate(closed)
+    return closed
+
+
+async def market_close_loop() -> None:
+    """
+    Background task: close markets as their resolution dates pass. Each
+    refresh interval the schedule is topped up from the database and a
+    sweep closes anything overdue that the schedule missed.
+    """
+    interval = settings.market_close_refresh_seconds
+    market_closer.bind(asyncio.get_running_loop())
+    next_refresh = 0.0
+    while True:
+        now = datetime.now(timezone.utc).timestamp()
+        try:
+            sweep = now >= next_refresh
+            if sweep:
+                next_refresh = now + interval
+                await asyncio.to_thread(_refresh_schedule, timedelta(seconds=interval * 2))
+            due = market_closer.pop_due(now)
+            # One worker across the deployment closes markets; the others drop their due entries
+            if (due or sweep) and acquire_lease("market_close", interval * 2):
+                closed = await asyncio.to_thread(run_market_closes, None if sweep else due)
+                if closed:
+                    print(f"[Markets] Closed {len(closed)} markets at their resolution date")
+        except Exception as e:
+            print(f"[Markets] Auto-close failed: {type(e).__name__}: {e}")
+        now = datetime.now(timezone.utc).timestamp()
+        until_next = market_closer.seconds_until_next(now)
+        timeout = next_refresh - now if until_next is None else min(until_next, next_refresh - now)
+        await market_closer.wait(max(0.0, timeout))
@@ -0,0 +1,259 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, func, case
+from bisect import bisect_left, insort
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, List, Optional, Tuple
+import threading
+from ..models.market import COINS_PER_DOLLAR
+from ..models.order import Order, OrderStatus
+
+# Statuses of limit orders that still rest on the book
+RESTING_STATUSES = (OrderStatus.PENDING.value, OrderStatus.PARTIALLY_FILLED.value)
+
+
+def reserved_value(user_id):
+    """
+    Scalar subquery: coins held in escrow by a user's resting limit orders,
+    buys at their limit price and sells marked at the market price. These
+    coins and shares have left the balance and positions, but are still
+    the user's. `user_id` may be a column, to correlate with an outer query.
+    """
+    from ..models.market import Market
+
+    unit_value = case(
+        (Order.order_type == "buy", Order.limit_price),
+        (Order.side == "yes", Market.yes_price),
+        else_=Market.no_price
+    ) * COINS_PER_DOLLAR
+    return (
+        select(func.coalesce(func.sum((Order.quantity - Order.filled_quantity) * unit_value), 0))
+        .join(Market, Market.id == Order.market_id)
+        .where(Order.user_id == user_id, Order.status.in_(RESTING_STATUSES), Order.limit_price.isnot(None))
+        .scalar_subquery()
+    )
+
+
+class RestingOrder:
+    """A limit order's unfilled remainder, queued at its price level."""
+
+    __slots__ = ("order_id", "user_id", "remaining")
+
+    def __init__(self, order_id: int, user_id: int, remaining: int):
+        self.order_id = order_id
+        self.user_id = user_id
+        self.remaining = remaining
+
+
+class BookSide:
+    """
+    One side (bids or asks) of a book: the occupied price levels in a sorted
+    list of ticks, each level a FIFO queue, for price-time priority.
+    Prices are integer ticks of 0.01 (1..99), i.e. coins per share.
+    """
+
+    __slots__ = ("ticks", "levels", "descending")
+
+    def __init__(self, descending: bool):
+        self.ticks: List[int] = []
+        self.levels: Dict[int, Deque[RestingOrder]] = {}
+        self.descending = descending  # Bids: best is the highest price
+
+    def best(self) -> Optional[int]:
+        if not self.ticks:
+            return None
+        return self.ticks[-1] if self.descending else self.ticks[0]
+
+    def add(self, tick: int, entry: RestingOrder) -> None:
+        level = self.levels.get(tick)
+        if level is None:
+            level = self.levels[tick] = deque()
+            insort(self.ticks, tick)
+        level.append(entry)
+
+    def remove(self, tick: int, entry: RestingOrder) -> None:
+        level = self.levels[tick]
+        level.remove(entry)
+        if not level:
+            self._drop_level(tick)
+
+    def _drop_level(self, tick: int) -> None:
+        del self.levels[tick]
+        del self.ticks[bisect_left(self.ticks, tick)]
+
+    def depth(self, limit: int) -> List[dict]:
+        ticks = reversed(self.ticks) if self.descending else iter(self.ticks)
+        result = []
+        for tick in ticks:
+            if len(result) >= limit:
+                break
+            level = self.levels[tick]
+            result.append({
+                "price": tick / COINS_PER_DOLLAR,
+                "quantity": sum(entry.remaining for entry in level),
+                "orders": len(level)
+            })
+        return result
+
+
+class Book:
+    """Bids and asks for one outcome (YES or NO shares) of a market."""
+
+    __slots__ = ("bids", "asks")
+
+    def __init__(self):
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide(descending=False)
+
+    def side(self, order_type: str) -> BookSide:
+        """The side an order of this type rests on."""
+        return self.bids if order_type == "buy" else self.asks
+
+    def opposite(self, order_type: str) -> BookSide:
+        """The side an order of this type matches against."""
+        return self.asks if order_type == "buy" else self.bids
+
+
+class MarketBooks:
+    """The YES and NO books of a market, with an index of resting orders by ID."""
+
+    __slots__ = ("books", "index", "version")
+
+    def __init__(self, version: int):
+        self.books = {"yes": Book(), "no": Book()}
+        # order_id -> (outcome side, order type, tick, entry)
+        self.index: Dict[int, Tuple[str, str, int, RestingOrder]] = {}
+        self.version = version
+
+    def add(self, side: str, order_type: str, tick: int, entry: RestingOrder) -> None:
+        self.books[side].side(order_type).add(tick, entry)
+        self.index[entry.order_id] = (side, order_type, tick, entry)
+
+    def remove(self, order_id: int) -> Optional[RestingOrder]:
+        located = self.index.pop(order_id, None)
+        if located is None:
+            return None
+        side, order_type, tick, entry = located
+        self.books[side].side(order_type).remove(tick, entry)
+        return entry
+
+    def best_match(self, side: str, order_type: str, limit_tick: int) -> Optional[Tuple[int, RestingOrder]]:
+        """
+        The resting order an incoming order trades with next (best price,
+        then oldest), or None if the incoming order's limit doesn't cross it.
+        """
+        book_side = self.books[side].opposite(order_type)
+        tick = book_side.best()
+        if tick is None:
+            return None
+        crosses = tick <= limit_tick if order_type == "buy" else tick >= limit_tick
+        return (tick, book_side.levels[tick][0]) if crosses else None
+
+    def fill(self, order_id: int, quantity: int) -> None:
+        """Reduce a resting order; it leaves the book once fully filled."""
+        entry = self.index[order_id][3]
+        entry.remaining -= quantity
+        if entry.remaining == 0:
+            self.remove(order_id)
+
+    def depth(self, limit: int = 20) -> dict:
+        return {
+            side: {"bids": book.bids.depth(limit), "asks": book.asks.depth(limit)}
+            for side, book in self.books.items()
+        }
+
+
+class OrderBooks:
+    """
+    Per-market order books held in memory; the database is the source of truth.
+    A book is (re)loaded from the resting orders in the database whenever its
+    version differs from the market's book_version, which every book change
+    increments in the same transaction. Books therefore survive restarts and
+    stay coherent across workers, as all changes happen under the market's
+    row lock.
+    """
+
+    def __init__(self):
+        self._books: Dict[int, MarketBooks] = {}
+        self._locks: Dict[int, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    @contextmanager
+    def lock(self, market_id: int):
+        """Serialize book access within this process (taken before the market row lock)."""
+        with self._locks_guard:
+            lock = self._locks.setdefault(market_id, threading.Lock())
+        with lock:
+            yield
+
+    def get(self, db: Session, market_id: int, version: int) -> MarketBooks:
+        """The market's books at `version`, reloading them if this process's copy is stale."""
+        books = self._books.get(market_id)
+        if books is None or books.version != version:
+            books = self._books[market_id] = self.load(db, market_id, version)
+        return books
+
+    @staticmethod
+    def load(db: Session, market_id: int, version: int) -> MarketBooks:
+        books = MarketBooks(version)
+        rows = db.execute(
+            select(Order.id, Order.user_id, Order.side, Order.order_type, Order.limit_price,
+                   Order.quantity, Order.filled_quantity)
+            .where(
+                Order.market_id == market_id,
+                Order.status.in_(RESTING_STATUSES),
+                Order.limit_price.isnot(None)
+            )
+            .order_by(Order.id)
+        ).all()
+        for order_id, user_id, side, order_type, limit_price, quantity, filled in rows:
+            tick = int(round(limit_price * COINS_PER_DOLLAR))
+            books.add(side, order_type, tick, RestingOrder(order_id, user_id, quantity - (filled or 0)))
+        return books
+
+    def depth(self, db: Session, market_id: int, limit: int = 20) -> Optional[dict]:
+        """Aggregated price levels of a market's books, or None if there is no such market."""
+        from ..models.market import Market
+
+        with self.lock(market_id):
+            version = db.execute(
+                select(Market.book_version).where(Market.id == market_id, Market.deleted_at.is_(None))
+            ).scalar_one_or_none()
+            if version is None:
+                return None
+            return self.get(db, market_id, version).depth(limit)
+
+    def discard(self, market_id: int) -> None:
+        """Forget a market's books, e.g. after a failed transaction changed them."""
+        self._books.pop(market_id, None)
+
+    def recover(self, db: Session) -> int:
+        """Load the books of every market with resting orders; returns how many."""
+        from ..models.market import Market
+
+        rows = db.execute(
+            select(Market.id, Market.book_version)
+            .where(Market.id.in_(
+                select(Order.market_id).where(Order.status.in_(RESTING_STATUSES)).distinct()
+            ))
+        ).all()
+        for market_id, version in rows:
+            with self.lock(market_id):
+                self.get(db, market_id, version)
+        return len(rows)
+
+
+order_books = OrderBooks()
+
+
+def recover_order_books() -> None:
+    """Rebuild the in-memory books from the database (startup)."""
+    from ..database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        count = order_books.recover(db)
+        if count:
+            print(f"[OrderBook] Recovered books for {count} markets")
+    finally:
+        db.close()
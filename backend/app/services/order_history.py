@@ -0,0 +1,179 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, insert, delete, union_all, text, tuple_
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+import asyncio
+import hashlib
+import orjson
+from ..config import settings
+from ..shared_state import acquire_lease
+from ..models.order import Order, ArchivedOrder, OrderIdempotencyKey
+from ..models.market import Market, MarketStatus
+
+# Columns shared by the hot and cold order tables, in response order
+ORDER_COLUMNS = [
+    "id", "user_id", "market_id", "side", "order_type", "quantity", "price",
+    "total_cost", "limit_price", "status", "filled_quantity", "created_at", "executed_at"
+]
+
+
+def _columns(model) -> list:
+    return [getattr(model, name) for name in ORDER_COLUMNS]
+
+
+def get_user_order_history(
+    db: Session,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 50,
+    market_id: Optional[int] = None
+) -> List[dict]:
+    """
+    Get a user's orders, newest first, across hot and archived storage.
+    Each side is limited before the union so both use their
+    (user_id, created_at) index and the page cost stays flat as history grows.
+    """
+    branches = []
+    for model in (Order, ArchivedOrder):
+        query = select(*_columns(model)).where(model.user_id == user_id)
+        if market_id:
+            query = query.where(model.market_id == market_id)
+        query = query.order_by(model.created_at.desc(), model.id.desc()).limit(skip + limit)
+        branches.append(query.subquery().select())
+
+    combined = union_all(*branches).subquery()
+    rows = db.execute(
+        select(combined)
+        .order_by(combined.c.created_at.desc(), combined.c.id.desc())
+        .offset(skip)
+        .limit(limit)
+    ).mappings().all()
+    return [dict(row) for row in rows]
+
+
+def get_user_order(db: Session, user_id: int, order_id: int) -> Optional[dict]:
+    """Get one of a user's orders by ID from hot storage, falling back to the archive."""
+    for model in (Order, ArchivedOrder):
+        row = db.execute(
+            select(*_columns(model)).where(model.id == order_id, model.user_id == user_id)
+        ).mappings().first()
+        if row:
+            return dict(row)
+    return None
+
+
+def order_request_hash(fields: dict) -> str:
+    """Fingerprint of an order request, to tell a retry from a reused idempotency key."""
+    return hashlib.sha256(orjson.dumps(fields, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+def get_idempotency_key(db: Session, user_id: int, key: str) -> Optional[OrderIdempotencyKey]:
+    return db.get(OrderIdempotencyKey, (user_id, key))
+
+
+def purge_idempotency_keys(db: Session, batch_size: int = 1000) -> int:
+    """Delete idempotency keys past their TTL, a batch per statement and transaction. Returns the number deleted."""
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.order_idempotency_ttl_hours)
+    expired = OrderIdempotencyKey.created_at < cutoff
+    purged = 0
+    while True:
+        batch = select(OrderIdempotencyKey.user_id, OrderIdempotencyKey.key).where(expired).limit(batch_size)
+        deleted = db.execute(
+            delete(OrderIdempotencyKey)
+            .where(expired, tuple_(OrderIdempotencyKey.user_id, OrderIdempotencyKey.key).in_(batch))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        purged += deleted
+        if deleted < batch_size:
+            return purged
+
+
+def archive_resolved_orders(db: Session, batch_size: int = 1000) -> int:
+    """
+    Move orders of resolved markets into the archive table.
+    Works in batches, committing each one, so locks are held only briefly.
+    Returns the number of orders archived.
+    """
+    archived = 0
+    resolved_markets = select(Market.id).where(Market.status == MarketStatus.RESOLVED.value)
+
+    while True:
+        ids = db.execute(
+            select(Order.id)
+            .where(Order.market_id.in_(resolved_markets))
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+
+        db.execute(
+            insert(ArchivedOrder).from_select(
+                ORDER_COLUMNS,
+                select(*_columns(Order)).where(Order.id.in_(ids))
+            )
+        )
+        db.execute(delete(Order).where(Order.id.in_(ids)))
+        db.commit()
+        archived += len(ids)
+
+    return archived
+
+
+def ensure_order_partitions(connection, months_ahead: int = 3) -> None:
+    """Create monthly partitions from the current month onwards, if `orders` is partitioned."""
+    if connection.dialect.name != "postgresql":
+        return
+    is_partitioned = connection.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('orders')"
+    )).first()
+    if not is_partitioned:
+        return
+
+    connection.execute(text("CREATE TABLE IF NOT EXISTS orders_default PARTITION OF orders DEFAULT"))
+
+    now = datetime.now(timezone.utc)
+    year, month = now.year, now.month
+    for _ in range(months_ahead + 1):
+        next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS orders_y{year}m{month:02d} PARTITION OF orders "
+            f"FOR VALUES FROM ('{year}-{month:02d}-01') TO ('{next_year}-{next_month:02d}-01')"
+        ))
+        year, month = next_year, next_month
+
+
+def init_order_storage(engine) -> None:
+    """Create the upcoming partitions of `orders`, if migration 0001 created it partitioned."""
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as connection:
+        ensure_order_partitions(connection, settings.order_partition_months_ahead)
+
+
+def run_order_maintenance() -> int:
+    """One maintenance pass: roll partitions forward, archive resolved orders and expire idempotency keys."""
+    from ..database import SessionLocal, engine
+
+    init_order_storage(engine)
+    db = SessionLocal()
+    try:
+        purge_idempotency_keys(db, settings.order_archive_batch_size)
+        return archive_resolved_orders(db, settings.order_archive_batch_size)
+    finally:
+        db.close()
+
+
+async def order_maintenance_loop() -> None:
+    """Background task running order maintenance every configured interval."""
+    while True:
+        await asyncio.sleep(settings.order_archive_interval_seconds)
+        # Only one worker across the deployment runs each pass
+        if not acquire_lease("order_maintenance", settings.order_archive_interval_seconds * 2):
+            continue
+        try:
+            archived = await asyncio.to_thread(run_order_maintenance)
+            if archived:
+                print(f"[Orders] Archived {archived} orders of resolved markets")
+        except Exception as e:
+            print(f"[Orders] Maintenance failed: {type(e).__name__}: {e}")
@@ -0,0 +1,265 @@
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+import fcntl
+import mmap
+import os
+import shutil
+import struct
+import threading
+import time
+import zlib
+import orjson
+from ..config import settings
+
+# Record header: payload length, CRC32 of the payload. A zero length ends a segment.
+RECORD_HEADER = struct.Struct("<II")
+SEGMENT_GLOB = "*.seg"
+
+
+class JournalSegment:
+    """
+    One fixed-size, memory-mapped journal file. Records are appended into
+    the mapping and made durable with msync of the pages they touch. A
+    record cut short by a crash fails its CRC, ending the segment there.
+    """
+
+    def __init__(self, path: Path, size: int, create: bool = False):
+        self.path = path
+        flags = os.O_RDWR | (os.O_CREAT | os.O_EXCL if create else 0)
+        self._fd = os.open(path, flags, 0o600)
+        if create:
+            os.ftruncate(self._fd, size)  # Zero-filled: reads as an empty segment
+        self.size = os.fstat(self._fd).st_size
+        # Empty if the process died between creating and sizing the file
+        self._map = mmap.mmap(self._fd, self.size) if self.size else None
+        self.offset = 0
+
+    def records(self) -> Iterator[dict]:
+        """The intact records from the start; leaves `offset` after the last one."""
+        offset = 0
+        while self._map is not None and offset + RECORD_HEADER.size <= self.size:
+            length, crc = RECORD_HEADER.unpack_from(self._map, offset)
+            end = offset + RECORD_HEADER.size + length
+            if length == 0 or end > self.size:
+                break
+            payload = self._map[offset + RECORD_HEADER.size:end]
+            if zlib.crc32(payload) != crc:
+                break  # Torn write
+            offset = self.offset = end
+            yield orjson.loads(payload)
+
+    def append(self, payload: bytes, sync: bool) -> bool:
+        """Append a record, msync'd if `sync`; False if the segment has no room left."""
+        end = self.offset + RECORD_HEADER.size + len(payload)
+        if end > self.size:
+            return False
+        start = self.offset
+        self._map[start + RECORD_HEADER.size:end] = payload
+        RECORD_HEADER.pack_into(self._map, start, len(payload), zlib.crc32(payload))
+        self.offset = end
+        if sync:
+            page = start - start % mmap.ALLOCATIONGRANULARITY
+            self._map.flush(page, end - page)
+        return True
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+        os.close(self._fd)
+
+
+class OrderJournal:
+    """
+    Write-ahead journal of accepted orders, local to this process. An order
+    sent with an Idempotency-Key is journaled (and synced to disk) before
+    it executes, and marked done once its transaction has committed or
+    failed, so an order left unfinished by a crash can be replayed at the
+    next startup; its idempotency key makes the replay safe if the commit
+    had in fact landed.
+
+    Each process journals into its own directory, holding an flock on it
+    for as long as it lives: a directory nobody holds belongs to a process
+    that has died. Segments are rotated when full and deleted once every
+    order in them is done.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int):
+        self.root = Path(directory)
+        self.segment_bytes = segment_bytes
+        self._lock = threading.Lock()
+        self._dir: Optional[Path] = None
+        self._lock_fd: Optional[int] = None
+        self._segment: Optional[JournalSegment] = None
+        self._segment_number = 0
+        self._sequence = 0
+        self._in_flight: Dict[int, int] = {}  # Order sequence -> segment number
+        self._pending: Dict[int, int] = {}  # Segment number -> orders not yet done
+
+    @property
+    def enabled(self) -> bool:
+        return self._dir is not None
+
+    def open(self) -> None:
+        """Claim a directory for this process."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        name = f"{os.getpid()}-{time.time_ns()}"
+        # Locked under a hidden name first, so it is never seen unlocked
+        claiming = self.root / f".{name}"
+        claiming.mkdir()
+        self._lock_fd = os.open(claiming / "lock", os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        self._dir = claiming.rename(self.root / name)
+        self._rotate()
+
+    def _rotate(self) -> None:
+        """Start a new segment; the previous one is deleted if nothing in it is still in flight."""
+        previous = self._segment
+        self._segment_number += 1
+        self._segment = JournalSegment(
+            self._dir / f"{self._segment_number:010d}.seg", self.segment_bytes, create=True
+        )
+        if previous is not None:
+            previous.close()
+            self._release(self._segment_number - 1)
+
+    def _release(self, number: int) -> None:
+        if number != self._segment_number and not self._pending.get(number):
+            self._pending.pop(number, None)
+            (self._dir / f"{number:010d}.seg").unlink(missing_ok=True)
+
+    def _append(self, record: dict, sync: bool) -> None:
+        payload = orjson.dumps(record)
+        if RECORD_HEADER.size + len(payload) > self.segment_bytes:
+            raise ValueError("Journal record larger than a segment")
+        if not self._segment.append(payload, sync):
+            self._rotate()
+            self._segment.append(payload, sync)
+
+    def accept(self, order: dict) -> Optional[int]:
+        """
+        Durably record an order about to execute; returns its sequence
+        number. Orders without an idempotency key cannot be replayed
+        safely, so they are not journaled (None, as when disabled).
+        """
+        if not self.enabled or order["idempotency_key"] is None:
+            return None
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+            self._append({"seq": sequence, "at": time.time(), "order": order}, sync=True)
+            self._in_flight[sequence] = self._segment_number
+            self._pending[self._segment_number] = self._pending.get(self._segment_number, 0) + 1
+            return sequence
+
+    def done(self, sequence: Optional[int], order_id: Optional[int] = None) -> None:
+        """
+        Mark an order finished: committed (with its ID) or rejected. Not
+        synced: if it is lost, the replay finds the order by its key.
+        """
+        if sequence is None:
+            return
+        with self._lock:
+            number = self._in_flight.pop(sequence)
+            self._append({"done": sequence, "order_id": order_id}, sync=False)
+            self._pending[number] -= 1
+            self._release(number)
+
+    def orphans(self) -> Iterator[Path]:
+        """Directories of dead processes, each locked by this process while it is handled."""
+        if not self.root.is_dir():
+            return
+        for directory in sorted(self.root.iterdir()):
+            if directory == self._dir or directory.name.startswith(".") or not directory.is_dir():
+                continue
+            try:
+                fd = os.open(directory / "lock", os.O_RDWR)
+            except FileNotFoundError:
+                continue  # Being removed by another process
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue  # Its process is alive, or another one is replaying it
+            try:
+                if directory.exists():
+                    yield directory
+            finally:
+                os.close(fd)
+
+    @staticmethod
+    def unfinished(directory: Path) -> List[dict]:
+        """Orders a dead process accepted but never finished, oldest first."""
+        accepted: Dict[int, dict] = {}
+        for path in sorted(directory.glob(SEGMENT_GLOB)):
+            segment = JournalSegment(path, 0)
+            try:
+                for record in segment.records():
+                    if "done" in record:
+                        accepted.pop(record["done"], None)
+                    else:
+                        accepted[record["seq"]] = record
+            finally:
+                segment.close()
+        return [accepted[sequence] for sequence in sorted(accepted)]
+
+    @staticmethod
+    def remove(directory: Path) -> None:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    def close(self) -> None:
+        """At shutdown: remove the directory, unless orders are still in flight (then it is replayed)."""
+        with self._lock:
+            if self._segment is not None:
+                self._segment.close()
+                self._segment = None
+            if self._dir is not None and not self._in_flight:
+                shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+
+order_journal = OrderJournal(settings.order_journal_dir, settings.order_journal_segment_bytes)
+
+
+def replay_order_journals() -> int:
+    """
+    Finish the orders that dead processes journaled but never finished
+    (own sessions; runs in a worker thread at startup). Orders are placed
+    again under their idempotency key, which is a no-op if the first
+    attempt committed. Orders without a key, or older than
+    order_journal_replay_seconds, are dropped: their clients saw an error
+    and may have placed them again. Returns the number of orders placed.
+    """
+    from ..database import SessionLocal
+    from ..models.user import User
+    from .order_history import get_idempotency_key
+    from .trading import trading_engine
+
+    placed = 0
+    for directory in order_journal.orphans():
+        for record in order_journal.unfinished(directory):
+            order = record["order"]
+            key = order["idempotency_key"]
+            if key is None or time.time() - record["at"] > settings.order_journal_replay_seconds:
+                print(f"[Orders] Dropped unfinished journaled order: {orjson.dumps(order).decode()}")
+                continue
+            db = SessionLocal()
+            try:
+                if get_idempotency_key(db, order["user_id"], key) is not None:
+                    continue  # Committed before the crash
+                user = db.get(User, order["user_id"])
+                placed_order, error = trading_engine.place_order(
+                    db, user, order["market_id"], order["side"], order["order_type"],
+                    order["quantity"], order["limit_price"],
+                    idempotency_key=key, request_hash=order["request_hash"]
+                )
+                if error:
+                    print(f"[Orders] Journaled order for user {order['user_id']} failed on replay: {error}")
+                else:
+                    placed += 1
+            finally:
+                db.close()
+        order_journal.remove(directory)
+    return placed
@@ -0,0 +1,174 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, insert, update, func
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from ..models.proposal import MarketProposal, ProposalStatus
+from ..models.market import Market
+from ..models.user import User
+from ..schemas.proposal import ProposalResponse, ProposalReview
+from .market_cache import market_versions
+from .market_schedule import market_closer
+
+
+def _with_usernames(rows) -> List[ProposalResponse]:
+    """Build responses from (proposal, username) rows."""
+    result = []
+    for proposal, username in rows:
+        response = ProposalResponse.model_validate(proposal)
+        response.username = username or "Unknown"
+        result.append(response)
+    return result
+
+
+def _proposals_with_usernames():
+    """Proposals joined to their submitter's username in the same query."""
+    return (
+        select(MarketProposal, User.username)
+        .outerjoin(User, User.id == MarketProposal.user_id)
+    )
+
+
+def get_proposal_response(db: Session, proposal_id: int) -> Optional[ProposalResponse]:
+    """Get a proposal with its submitter's username."""
+    rows = db.execute(
+        _proposals_with_usernames().where(MarketProposal.id == proposal_id)
+    ).all()
+    return _with_usernames(rows)[0] if rows else None
+
+
+def get_pending_queue(
+    db: Session,
+    limit: int = 50,
+    after_id: Optional[int] = None
+) -> Tuple[List[ProposalResponse], Optional[int]]:
+    """
+    Get a page of the pending queue in submission order.
+    Uses keyset pagination on id, so deep pages cost the same as the first.
+    Returns (proposals, next_cursor); next_cursor is None on the last page.
+    """
+    query = _proposals_with_usernames().where(
+        MarketProposal.status == ProposalStatus.pending.value
+    )
+    if after_id is not None:
+        query = query.where(MarketProposal.id > after_id)
+    rows = db.execute(query.order_by(MarketProposal.id.asc()).limit(limit + 1)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1][0].id
+    return _with_usernames(rows), next_cursor
+
+
+def get_proposal_counts(db: Session) -> Dict[str, int]:
+    """Count proposals by status in a single grouped query."""
+    counts = {status.value: 0 for status in ProposalStatus}
+    rows = db.execute(
+        select(MarketProposal.status, func.count()).group_by(MarketProposal.status)
+    ).all()
+    for status, count in rows:
+        counts[status] = count
+    return counts
+
+
+def _market_values(proposal: MarketProposal) -> dict:
+    return {
+        "title": proposal.title,
+        "description": proposal.description,
+        "category": proposal.category,
+        "resolution_date": proposal.resolution_date,
+        "yes_price": 0.5,
+        "no_price": 0.5
+    }
+
+
+def apply_review(db: Session, proposal: MarketProposal, review: ProposalReview) -> MarketProposal:
+    """Approve (creating its market) or reject a single pending proposal."""
+    proposal.reviewed_at = datetime.now()
+    proposal.admin_notes = review.admin_notes
+
+    if review.action == "approve":
+        # Use modified values if provided, otherwise use original
+        proposal.title = review.title or proposal.title
+        if review.description is not None:
+            proposal.description = review.description
+        proposal.category = review.category or proposal.category
+        proposal.resolution_date = review.resolution_date or proposal.resolution_date
+
+        market = Market(**_market_values(proposal))
+        db.add(market)
+        db.flush()  # Get the market ID
+
+        proposal.status = ProposalStatus.approved.value
+        proposal.market_id = market.id
+    else:
+        proposal.status = ProposalStatus.rejected.value
+
+    db.commit()
+    if proposal.market_id:
+        market_versions.bump(proposal.market_id)
+        market_closer.schedule(proposal.market_id, proposal.resolution_date)
+    return proposal
+
+
+def bulk_review_proposals(
+    db: Session,
+    proposal_ids: List[int],
+    action: str,
+    admin_notes: Optional[str] = None
+) -> Tuple[List[int], List[int]]:
+    """
+    Approve or reject many pending proposals in one transaction.
+    Approval creates all markets with one multi-row INSERT ... RETURNING.
+    Returns (reviewed_ids, skipped_ids); proposals that do not exist or
+    were already reviewed are skipped.
+    """
+    proposals = db.execute(
+        select(MarketProposal)
+        .where(
+            MarketProposal.id.in_(proposal_ids),
+            MarketProposal.status == ProposalStatus.pending.value
+        )
+        .order_by(MarketProposal.id)
+        .with_for_update()
+    ).scalars().all()
+
+    reviewed_ids = [p.id for p in proposals]
+    skipped_ids = sorted(set(proposal_ids) - set(reviewed_ids))
+    if not proposals:
+        return reviewed_ids, skipped_ids
+
+    reviewed_at = datetime.now()
+    if action == "approve":
+        markets = db.execute(
+            insert(Market).returning(Market.id, Market.resolution_date, sort_by_parameter_order=True),
+            [_market_values(p) for p in proposals]
+        ).all()
+        db.execute(update(MarketProposal), [
+            {
+                "id": proposal.id,
+                "status": ProposalStatus.approved.value,
+                "market_id": market_id,
+                "admin_notes": admin_notes,
+                "reviewed_at": reviewed_at
+            }
+            for proposal, (market_id, _) in zip(proposals, markets)
+        ])
+    else:
+        db.execute(
+            update(MarketProposal)
+            .where(MarketProposal.id.in_(reviewed_ids))
+            .values(
+                status=ProposalStatus.rejected.value,
+                admin_notes=admin_notes,
+                reviewed_at=reviewed_at
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    db.commit()
+    if action == "approve":
+        market_versions.bump()
+        for market_id, resolution_date in markets:
+            market_closer.schedule(market_id, resolution_date)
+    return reviewed_ids, skipped_ids
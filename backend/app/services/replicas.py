@@ -0,0 +1,142 @@
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session, sessionmaker
+from contextlib import contextmanager
+from itertools import count
+from typing import List, Optional
+import asyncio
+from fastapi import Depends
+from ..config import settings
+from ..database import SessionLocal
+from ..models.market import Market
+from ..models.order import Order
+from ..models.position import Position
+from ..models.user import User
+from ..shared_state import shared_state
+from ..utils.security import get_current_user
+from .trading import TradingEngine
+
+# Replication delay of a PostgreSQL standby, in seconds; 0 when it has replayed
+# everything it received (an idle standby's last replay timestamp is old but current)
+POSTGRES_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class Replica:
+    """A read replica with its session factory and last measured lag."""
+
+    def __init__(self, url: str):
+        self.engine = create_engine(url, pool_pre_ping=True)
+        self.name = self.engine.url.host or self.engine.url.database
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.lag: Optional[float] = None
+        self.healthy = False  # Until the first lag check passes
+
+    def measure_lag(self) -> float:
+        with self.engine.connect() as connection:
+            if self.engine.dialect.name == "postgresql":
+                return float(connection.execute(POSTGRES_LAG_QUERY).scalar() or 0)
+            connection.execute(text("SELECT 1"))
+            return 0.0
+
+
+class ReplicaSet:
+    """
+    Routes read-only sessions round-robin over the replicas whose lag is
+    within settings.replica_max_lag_seconds, and to the primary when none is.
+    """
+
+    def __init__(self, urls: List[str]):
+        self.replicas = [Replica(url) for url in urls]
+        self._turn = count()
+
+    def session_factory(self, use_primary: bool = False):
+        """Session factory for a read: a healthy replica, or the primary."""
+        if not use_primary:
+            healthy = [replica for replica in self.replicas if replica.healthy]
+            if healthy:
+                return healthy[next(self._turn) % len(healthy)].session_factory
+        return SessionLocal
+
+    def check(self) -> None:
+        """Measure every replica's lag and take lagging or unreachable ones out of rotation."""
+        for replica in self.replicas:
+            try:
+                replica.lag = replica.measure_lag()
+                healthy = replica.lag <= settings.replica_max_lag_seconds
+            except Exception as e:
+                replica.lag = None
+                healthy = False
+                if replica.healthy:
+                    print(f"[Replicas] {replica.name} unreachable: {type(e).__name__}: {e}")
+            if replica.healthy and not healthy and replica.lag is not None:
+                print(f"[Replicas] {replica.name} lagging {replica.lag:.1f}s, reading from primary")
+            replica.healthy = healthy
+
+    def status(self) -> List[dict]:
+        return [
+            {"host": replica.name, "healthy": replica.healthy, "lag_seconds": replica.lag}
+            for replica in self.replicas
+        ]
+
+
+replicas = ReplicaSet([url.strip() for url in settings.database_replica_urls.split(",") if url.strip()])
+
+
+@contextmanager
+def read_session(use_primary: bool = False):
+    """A session for read-only queries; see ReplicaSet."""
+    db = replicas.session_factory(use_primary)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_read_db():
+    """Dependency for read-only endpoints that may see data a few seconds old."""
+    with read_session() as db:
+        yield db
+
+
+# Read-your-writes: after a user's writes, their own reads go to the primary
+# for as long as a replica may lag behind it
+def mark_recent_writer(user_ids) -> None:
+    for user_id in user_ids:
+        shared_state.set(f"recent_writer:{user_id}", "1", ttl=settings.replica_max_lag_seconds)
+
+
+def is_recent_writer(user_id: int) -> bool:
+    return shared_state.get(f"recent_writer:{user_id}") is not None
+
+
+def get_user_read_db(current_user: User = Depends(get_current_user)):
+    """Dependency for reads of the current user's own data, consistent with their writes."""
+    with read_session(use_primary=is_recent_writer(current_user.id)) as db:
+        yield db
+
+
+def _on_trade(db: Session, order: Order) -> None:
+    mark_recent_writer([order.user_id])
+
+
+def _on_resolution(db: Session, market: Market) -> None:
+    mark_recent_writer(db.execute(
+        select(Position.user_id).where(Position.market_id == market.id)
+    ).scalars().all())
+
+
+if replicas.replicas:
+    TradingEngine.add_trade_listener(_on_trade)
+    TradingEngine.add_resolution_listener(_on_resolution)
+
+
+async def replica_monitor_loop() -> None:
+    """Background task: re-check replica lag every configured interval."""
+    while True:
+        try:
+            await asyncio.to_thread(replicas.check)
+        except Exception as e:
+            print(f"[Replicas] Lag check failed: {type(e).__name__}: {e}")
+        await asyncio.sleep(settings.replica_check_seconds)
@@ -0,0 +1,272 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, func, case, or_
+from datetime import datetime, timezone
+from typing import Dict, Optional
+import threading
+import numpy as np
+from ..config import settings
+from ..models.market import Market, MarketStatus, COINS_PER_DOLLAR
+from ..models.order import Order
+from ..models.position import Position
+from ..shared_state import broadcast, on_broadcast
+from .engine_state import PositionStore
+from .order_book import RESTING_STATUSES
+from .trading import TradingEngine, PAYOUT_PER_SHARE
+
+
+class MarketPrices:
+    """Current prices of the unresolved, undeleted markets, as arrays indexed by market ID."""
+
+    def __init__(self, db: Session):
+        rows = db.connection().execute(
+            select(Market.id, Market.yes_price, Market.no_price).where(
+                Market.status != MarketStatus.RESOLVED.value,
+                Market.deleted_at.is_(None)
+            )
+        ).all()
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        size = int(ids.max()) + 1 if len(rows) else 1
+        self.live = np.zeros(size, dtype=bool)
+        self.yes_price = np.zeros(size)
+        self.no_price = np.zeros(size)
+        self.live[ids] = True
+        self.yes_price[ids] = [row[1] or 0.0 for row in rows]
+        self.no_price[ids] = [row[2] or 0.0 for row in rows]
+
+    def __len__(self) -> int:
+        return len(self.live)
+
+
+class RiskAccumulator:
+    """
+    Per-market and per-user sums over positions fed in as chunks of NumPy
+    arrays: memory is a few arrays the size of the market and user ID
+    ranges, whatever the number of positions.
+    """
+
+    def __init__(self, prices: MarketPrices):
+        size = len(prices)
+        self.prices = prices
+        self.positions = 0
+        self.yes_shares = np.zeros(size)
+        self.no_shares = np.zeros(size)
+        self.cost = np.zeros(size)  # Coins paid for the shares held
+        self.holders = np.zeros(size, dtype=np.int64)
+        self.user_value = np.zeros(1)  # Mark value per user ID
+
+    def add(self, user_ids, market_ids, yes_shares, no_shares, cost=None, count: bool = True) -> None:
+        """Add positions; `cost` defaults to their mark value (escrowed shares carry no P&L)."""
+        size = len(self.prices)
+        # Positions in markets since resolved, deleted or created are left out
+        in_range = market_ids < size
+        live = np.zeros(len(market_ids), dtype=bool)
+        live[in_range] = self.prices.live[market_ids[in_range]]
+        user_ids, market_ids = user_ids[live], market_ids[live]
+        yes_shares, no_shares = yes_shares[live], no_shares[live]
+
+        value = (yes_shares * self.prices.yes_price[market_ids] + no_shares * self.prices.no_price[market_ids]) * COINS_PER_DOLLAR
+        self.yes_shares += np.bincount(market_ids, weights=yes_shares, minlength=size)
+        self.no_shares += np.bincount(market_ids, weights=no_shares, minlength=size)
+        self.cost += np.bincount(market_ids, weights=value if cost is None else cost[live], minlength=size)
+        if count:
+            held = (yes_shares > 0) | (no_shares > 0)
+            self.holders += np.bincount(market_ids[held], minlength=size)
+            self.positions += int(held.sum())
+
+        per_user = np.bincount(user_ids, weights=value)
+        if len(per_user) > len(self.user_value):
+            self.user_value = np.concatenate([self.user_value, np.zeros(len(per_user) - len(self.user_value))])
+        self.user_value[:len(per_user)] += per_user
+
+    def add_rows(self, rows) -> None:
+        """Add a chunk of (user_id, market_id, yes_shares, no_shares, avg_yes_price, avg_no_price) rows."""
+        if not rows:
+            return
+        # Column by column: NumPy converts a list of result rows one element at a time
+        user_ids, market_ids, yes_shares, no_shares, avg_yes, avg_no = (
+            np.fromiter(column, dtype=np.int64 if index < 2 else np.float64, count=len(rows))
+            for index, column in enumerate(zip(*rows))
+        )
+        self.add(user_ids, market_ids, yes_shares, no_shares, (yes_shares * avg_yes + no_shares * avg_no) * COINS_PER_DOLLAR)
+
+    def add_escrow(self, db: Session) -> None:
+        """
+        Shares escrowed by resting sell orders have left their positions but
+        still pay out; they count toward liability and exposure, at no P&L.
+        """
+        remaining = Order.quantity - func.coalesce(Order.filled_quantity, 0)
+        rows = db.connection().execute(
+            select(
+                Order.user_id, Order.market_id,
+                func.sum(case((Order.side == "yes", remaining), else_=0)),
+                func.sum(case((Order.side == "no", remaining), else_=0))
+            )
+            .where(Order.status.in_(RESTING_STATUSES), Order.order_type == "sell", Order.limit_price.isnot(None))
+            .group_by(Order.user_id, Order.market_id)
+        ).all()
+        if rows:
+            user_ids, market_ids, yes_shares, no_shares = (np.array(column) for column in zip(*rows))
+            self.add(user_ids, market_ids, yes_shares.astype(np.float64), no_shares.astype(np.float64), count=False)
+
+    def report(self, db: Session, source: str, top: int) -> dict:
+        # What each outcome would pay out, as resolve_market credits it
+        yes_liability = self.yes_shares * PAYOUT_PER_SHARE
+        no_liability = self.no_shares * PAYOUT_PER_SHARE
+        worst = np.maximum(yes_liability, no_liability)
+        mark = (self.yes_shares * self.prices.yes_price + self.no_shares * self.prices.no_price) * COINS_PER_DOLLAR
+        pnl = mark - self.cost
+
+        total_worst = float(worst.sum())
+        total_mark = float(mark.sum())
+        shares = worst / total_worst if total_worst else worst
+        user_value = np.sort(self.user_value)[::-1]
+
+        held = np.flatnonzero(worst)
+        ranked = held[np.argsort(worst[held])[::-1][:top]]
+        titles = dict(db.execute(
+            select(Market.id, Market.title).where(Market.id.in_(ranked.tolist()))
+        ).all()) if len(ranked) else {}
+        return {
+            "generated_at": datetime.now(timezone.utc),
+            "source": source,
+            "positions": self.positions,
+            "markets": len(held),
+            "yes_liability": float(yes_liability.sum()),
+            "no_liability": float(no_liability.sum()),
+            "worst_case_liability": total_worst,
+            "mark_value": total_mark,
+            "unrealized_pnl": float(pnl.sum()),
+            "concentration": {
+                "market_hhi": float((shares ** 2).sum()) if total_worst else 0.0,
+                "top_market_share": float(shares.max()) if total_worst else 0.0,
+                "top_user_share": float(user_value[0] / total_mark) if total_mark else 0.0,
+                "top_10_user_share": float(user_value[:10].sum() / total_mark) if total_mark else 0.0
+            },
+            "top_markets": [
+                {
+                    "market_id": int(market_id),
+                    "title": titles.get(int(market_id), ""),
+                    "yes_liability": float(yes_liability[market_id]),
+                    "no_liability": float(no_liability[market_id]),
+                    "worst_case_liability": float(worst[market_id]),
+                    "mark_value": float(mark[market_id]),
+                    "unrealized_pnl": float(pnl[market_id]),
+                    "holders": int(self.holders[market_id])
+                }
+                for market_id in ranked
+            ]
+        }
+
+
+def compute_risk_report(db: Session, top: int = 20, chunk_size: Optional[int] = None) -> dict:
+    """
+    Risk report straight from the database: positions are streamed in
+    chunks and aggregated with NumPy, so memory stays bounded.
+    """
+    accumulator = RiskAccumulator(MarketPrices(db))
+    rows = db.connection().execute(
+        select(
+            Position.user_id, Position.market_id,
+            func.coalesce(Position.yes_shares, 0), func.coalesce(Position.no_shares, 0),
+            func.coalesce(Position.avg_yes_price, 0.0), func.coalesce(Position.avg_no_price, 0.0)
+        )
+        .where(or_(Position.yes_shares > 0, Position.no_shares > 0))
+        .execution_options(yield_per=chunk_size or settings.risk_report_chunk_size)
+    )
+    for chunk in rows.partitions():
+        accumulator.add_rows(chunk)
+    accumulator.add_escrow(db)
+    return accumulator.report(db, "database", top)
+
+
+class RiskCache:
+    """
+    Every position with shares, held in a PositionStore and kept current
+    by trades, so a report reads no positions from the database. Loaded
+    on a worker's first report; until then trades are ignored. Trades on
+    other workers arrive as broadcasts, and positions touched while the
+    store loads are re-read once it has.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._store: Optional[PositionStore] = None
+        self._loading = False
+        self._touched: set = set()
+
+    def _read(self, db: Session, keys) -> Dict[tuple, tuple]:
+        user_ids = {user_id for user_id, _ in keys}
+        rows = db.execute(
+            select(
+                Position.user_id, Position.market_id, Position.yes_shares, Position.no_shares,
+                Position.avg_yes_price, Position.avg_no_price
+            ).where(Position.user_id.in_(user_ids))
+        ).all()
+        found = {(row[0], row[1]): tuple(row[2:]) for row in rows}
+        return {key: found.get(key, (0, 0, 0.0, 0.0)) for key in keys}
+
+    def refresh(self, db: Session, keys) -> None:
+        """Re-read (user ID, market ID) positions that changed."""
+        with self._lock:
+            if self._loading:
+                self._touched.update(keys)
+                return
+            if self._store is None:
+                return
+        positions = self._read(db, keys)
+        with self._lock:
+            for (user_id, market_id), (yes_shares, no_shares, avg_yes, avg_no) in positions.items():
+                self._store.set(user_id, market_id, yes_shares or 0, no_shares or 0, avg_yes or 0.0, avg_no or 0.0)
+
+    def _ensure_loaded(self, db: Session) -> None:
+        with self._lock:
+            if self._store is not None or self._loading:
+                return
+            self._loading = True
+        store = PositionStore()
+        try:
+            store.load(db)
+        finally:
+            with self._lock:
+                self._loading = False
+                touched, self._touched = self._touched, set()
+        with self._lock:
+            self._store = store
+        if touched:
+            self.refresh(db, touched)
+
+    def report(self, db: Session, top: int = 20) -> Optional[dict]:
+        """The risk report from the in-memory positions; None while another request is loading them."""
+        self._ensure_loaded(db)
+        accumulator = RiskAccumulator(MarketPrices(db))
+        with self._lock:
+            if self._store is None:
+                return None
+            # The views must be gone before the lock is released: arrays can't grow while viewed
+            keys, yes, no, avg_yes, avg_no = (np.frombuffer(column, dtype=column.typecode) for column in self._store.columns())
+            yes, no = yes.astype(np.float64), no.astype(np.float64)
+            accumulator.add(keys >> 32, keys & 0xFFFFFFFF, yes, no, (yes * avg_yes + no * avg_no) * COINS_PER_DOLLAR)
+            del keys, avg_yes, avg_no
+        accumulator.add_escrow(db)
+        return accumulator.report(db, "cache", top)
+
+    def on_trade(self, db: Session, order: Order) -> None:
+        self.refresh(db, [(order.user_id, order.market_id)])
+        broadcast("risk_positions", {"positions": [[order.user_id, order.market_id]]})
+
+    def on_broadcast(self, payload: dict) -> None:
+        """Re-read positions that another worker saw trade (once this worker has loaded them)."""
+        if self._store is None and not self._loading:
+            return
+        from ..database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            self.refresh(db, [tuple(key) for key in payload["positions"]])
+        finally:
+            db.close()
+
+
+risk_cache = RiskCache()
+TradingEngine.add_trade_listener(risk_cache.on_trade)
+on_broadcast("risk_positions", risk_cache.on_broadcast)
@@ -0,0 +1,160 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from collections import OrderedDict, deque
+from datetime import datetime
+from itertools import islice
+from typing import Deque, Dict, List, Optional
+import threading
+from ..config import settings
+from ..models.market import Market, MarketStatus
+from ..models.order import Order
+from ..shared_state import broadcast, on_broadcast
+from .market_schedule import market_statuses
+from .trading import TradingEngine
+
+TRADE_COLUMNS = (Order.id, Order.side, Order.order_type, Order.filled_quantity, Order.price, Order.executed_at)
+
+
+def _trade(order_id: int, side: str, order_type: str, quantity: int, price: float,
+           executed_at: Optional[datetime]) -> dict:
+    # executed_at as an ISO string: entries go out as JSON, locally and in broadcasts
+    return {
+        "order_id": order_id,
+        "side": side,
+        "order_type": order_type,
+        "quantity": quantity,
+        "price": price,
+        "executed_at": executed_at.isoformat() if executed_at else None
+    }
+
+
+class TradeFeed:
+    """
+    Each market's most recent trades, newest first: the last
+    trade_feed_size orders that traded, with their filled quantity and
+    average price. A market's feed is a bounded deque, loaded from the
+    (market_id, created_at) index on first read (or at startup, for the
+    busiest markets) and then kept current by trades, so reads don't touch
+    the database. An order that fills again moves back to the front.
+    Trades on other workers arrive as broadcasts; those that arrive while
+    a feed loads are applied once it has. At most trade_feed_markets feeds
+    are kept, the least recently read dropped first (a deleted market's
+    feed among them: reads check the market first). Orders archived with
+    their resolved market drop out of its feed when it next loads.
+    """
+
+    def __init__(self, size: int, max_markets: int):
+        self.size = size
+        self.max_markets = max_markets
+        self._lock = threading.Lock()
+        self._feeds: "OrderedDict[int, Deque[dict]]" = OrderedDict()
+        self._loading: Dict[int, List[dict]] = {}  # Market ID -> trades received during its load
+
+    def __len__(self) -> int:
+        return len(self._feeds)
+
+    def cached(self, market_id: int, limit: int) -> Optional[List[dict]]:
+        """A market's latest trades if its feed is loaded, else None."""
+        with self._lock:
+            feed = self._feeds.get(market_id)
+            if feed is None:
+                return None
+            self._feeds.move_to_end(market_id)
+            return list(islice(feed, limit))
+
+    def recent(self, db: Session, market_id: int, limit: int) -> Optional[List[dict]]:
+        """
+        A market's latest trades, loading its feed if needed; None if the
+        market doesn't exist (checked against the per-worker status cache,
+        so only a miss reads the database).
+        """
+        if market_statuses.is_open(db, market_id) is None:
+            return None
+        trades = self.cached(market_id, limit)
+        if trades is None:
+            self.load(db, market_id)
+            trades = self.cached(market_id, limit)
+        return trades or []
+
+    def load(self, db: Session, market_id: int) -> None:
+        """Read a market's feed from the database."""
+        with self._lock:
+            if market_id in self._feeds or market_id in self._loading:
+                return  # Loaded meanwhile, or loading in another thread
+            self._loading[market_id] = []
+        try:
+            rows = db.execute(
+                select(*TRADE_COLUMNS)
+                .where(Order.market_id == market_id, Order.filled_quantity > 0)
+                .order_by(Order.created_at.desc())
+                .limit(self.size)
+            ).all()
+        except Exception:
+            with self._lock:
+                self._loading.pop(market_id, None)
+            raise
+        # Placed newest first; a resting order that filled later belongs by its last fill
+        trades = sorted((_trade(*row) for row in rows), key=lambda trade: trade["executed_at"] or "", reverse=True)
+        with self._lock:
+            self._feeds[market_id] = deque(trades, maxlen=self.size)
+            for trade in self._loading.pop(market_id):
+                self._add(market_id, trade)
+            while len(self._feeds) > self.max_markets:
+                self._feeds.popitem(last=False)
+
+    def _add(self, market_id: int, trade: dict) -> None:
+        feed = self._feeds[market_id]
+        for index, existing in enumerate(feed):
+            if existing["order_id"] == trade["order_id"]:
+                if existing["quantity"] == trade["quantity"]:
+                    return  # Nothing new: already loaded, or the order was only cancelled
+                del feed[index]
+                break
+        feed.appendleft(trade)
+
+    def record(self, market_id: int, trade: dict) -> None:
+        """Add a trade to a market's feed, if this worker has it loaded (or is loading it)."""
+        with self._lock:
+            if market_id in self._loading:
+                self._loading[market_id].append(trade)
+            elif market_id in self._feeds:
+                self._add(market_id, trade)
+
+    def on_trade(self, db: Session, order: Order) -> None:
+        if not order.filled_quantity:
+            return
+        trade = _trade(
+            order.id, order.side, order.order_type, order.filled_quantity, order.price, order.executed_at
+        )
+        self.record(order.market_id, trade)
+        broadcast("market_trades", {"market_id": order.market_id, "trade": trade})
+
+    def on_broadcast(self, payload: dict) -> None:
+        self.record(payload["market_id"], payload["trade"])
+
+
+trade_feed = TradeFeed(settings.trade_feed_size, settings.trade_feed_markets)
+TradingEngine.add_trade_listener(trade_feed.on_trade)
+on_broadcast("market_trades", trade_feed.on_broadcast)
+
+
+def warm_trade_feeds() -> int:
+    """
+    Load the feeds of the busiest open markets by 24h volume (own session;
+    runs in a worker thread at startup). Returns the number loaded.
+    """
+    from ..database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        market_ids = db.execute(
+            select(Market.id)
+            .where(Market.status == MarketStatus.OPEN.value, Market.deleted_at.is_(None))
+            .order_by(Market.volume_24h.desc())
+            .limit(settings.trade_feed_warm_markets)
+        ).scalars().all()
+        for market_id in market_ids:
+            trade_feed.load(db, market_id)
+        return len(market_ids)
+    finally:
+        db.close()
@@ -1,13 +1,30 @@
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import select
-from datetime import datetime
-from typing import Optional, Tuple
-from ..models.market import Market, MarketStatus
-from ..models.order import Order, OrderStatus
+from sqlalchemy import select, update, func
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+from ..models.market import Market, MarketActivity, MarketStatus, COINS_PER_DOLLAR
+from ..models.order import Order, OrderStatus, OrderIdempotencyKey
 from ..models.position import Position
 from ..models.user import User
+from ..models.ledger import LedgerKind
+from . import ledger
+from .order_book import order_books, MarketBooks, RestingOrder, RESTING_STATUSES
+from .trending import bucket_start, update_trending_keys
 import math
 
+# Coins a winning share pays at resolution: $1
+PAYOUT_PER_SHARE = COINS_PER_DOLLAR
+
+
+def as_utc(value: datetime) -> datetime:
+    """A stored datetime as an aware UTC one (SQLite returns naive datetimes, in UTC)."""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def resolution_passed(resolution_date: Optional[datetime]) -> bool:
+    """Whether a market's resolution date has passed, which ends its trading."""
+    return resolution_date is not None and as_utc(resolution_date) <= datetime.now(timezone.utc)
+
 
 class TradingEngine:
     """
@@ -15,6 +32,29 @@ class TradingEngine:
     Uses a simplified constant-product formula with proper transaction safety.
     """
     
+    # Callbacks run after a trade or resolution commits: fn(db, order) / fn(db, market)
+    _trade_listeners: List[Callable] = []
+    _resolution_listeners: List[Callable] = []
+    
+    @classmethod
+    def add_trade_listener(cls, listener: Callable) -> None:
+        """Register a callback invoked with (db, order) after each committed trade or order change."""
+        cls._trade_listeners.append(listener)
+    
+    @classmethod
+    def add_resolution_listener(cls, listener: Callable) -> None:
+        """Register a callback invoked with (db, market) after a market is resolved."""
+        cls._resolution_listeners.append(listener)
+    
+    @staticmethod
+    def _notify(listeners: List[Callable], db: Session, subject) -> None:
+        """Run post-commit listeners; a failing listener never fails the trade."""
+        for listener in listeners:
+            try:
+                listener(db, subject)
+            except Exception as e:
+                print(f"[Trading] Listener {listener.__qualname__} failed: {type(e).__name__}: {e}")
+    
     @staticmethod
     def calculate_price(shares_yes: float, shares_no: float) -> Tuple[float, float]:
         """
@@ -56,116 +96,396 @@ class TradingEngine:
         return round(new_price, 4)
     
     @staticmethod
-    def execute_buy_order(
-        db: Session,
-        user: User,
-        market: Market,
-        side: str,
-        quantity: int
-    ) -> Tuple[Optional[Order], Optional[str]]:
+    def _upsert_insert(db: Session):
+        """Return the dialect-specific INSERT construct that supports ON CONFLICT."""
+        if db.get_bind().dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        return insert
+    
+    @staticmethod
+    def _lock_market(db: Session, market_id: int) -> Market:
+        """Lock the market row; the AMM price must be read and moved atomically."""
+        return db.execute(
+            select(Market).where(Market.id == market_id).with_for_update()
+        ).scalar_one()
+    
+    @staticmethod
+    def _is_tradable(market: Market) -> bool:
+        """Whether a (locked) market accepts orders: open, not deleted, before its resolution date."""
+        return (
+            market.status == MarketStatus.OPEN.value
+            and market.deleted_at is None
+            and not resolution_passed(market.resolution_date)
+        )
+    
+    @staticmethod
+    def _add_shares(db: Session, order: Order, quantity: int, price: float) -> None:
+        """Create or extend the position of a buy order's user, keeping a weighted average price."""
+        user_id, market_id, side = order.user_id, order.market_id, order.side
+        shares_col = Position.yes_shares if side == "yes" else Position.no_shares
+        avg_col = Position.avg_yes_price if side == "yes" else Position.avg_no_price
+        insert = TradingEngine._upsert_insert(db)
+        stmt = insert(Position).values(
+            user_id=user_id,
+            market_id=market_id,
+            yes_shares=quantity if side == "yes" else 0,
+            no_shares=quantity if side == "no" else 0,
+            avg_yes_price=price if side == "yes" else 0,
+            avg_no_price=price if side == "no" else 0
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Position.user_id, Position.market_id],
+            set_={
+                shares_col.key: shares_col + quantity,
+                avg_col.key: (avg_col * shares_col + price * quantity) / (shares_col + quantity),
+                Position.updated_at.key: func.now()
+            }
+        )
+        db.execute(stmt)
+        ledger.record(db, user_id, LedgerKind.TRADE, market_id=market_id, side=side, shares=quantity, order_id=order.id)
+    
+    @staticmethod
+    def _credit(db: Session, order: Order, coins: int, kind: LedgerKind) -> None:
+        """Credit coins to an order's user."""
+        if coins:
+            db.execute(update(User).where(User.id == order.user_id).values(balance=User.balance + coins))
+            ledger.record(db, order.user_id, kind, coins=coins, market_id=order.market_id, order_id=order.id)
+    
+    @staticmethod
+    def _count_trades(db: Session, trade_counts: Dict[int, int]) -> None:
+        """Add to the trade counts (orders that traded) of users, in ID order."""
+        for user_id in sorted(trade_counts):
+            db.execute(update(User).where(User.id == user_id).values(trade_count=User.trade_count + trade_counts[user_id]))
+    
+    @staticmethod
+    def _fill_from_amm(market: Market, side: str, order_type: str, quantity: int) -> Tuple[float, int]:
         """
-        Execute a buy order with proper transaction safety.
-        Uses SELECT FOR UPDATE to prevent race conditions.
-        Returns (order, error_message).
+        Fill against the AMM at its current price and move the price.
+        Returns (price, coins); the caller settles balance and position.
         """
-        try:
-            # Lock user and market rows to prevent race conditions
-            locked_user = db.execute(
-                select(User).where(User.id == user.id).with_for_update()
-            ).scalar_one()
-            
-            locked_market = db.execute(
-                select(Market).where(Market.id == market.id).with_for_update()
-            ).scalar_one()
-            
-            # Calculate cost using current price (in coins: price * quantity * 100)
-            current_price = locked_market.yes_price if side == "yes" else locked_market.no_price
-            total_cost = int(round(current_price * quantity * 100))  # Cost in coins
-            
-            # Check if user has enough balance (balance is in coins)
-            if locked_user.balance < total_cost:
-                return None, f"Insufficient balance. Need 🪙{total_cost}, have 🪙{locked_user.balance}"
-            
-            # Update user balance (ensure it stays as integer)
-            locked_user.balance = int(locked_user.balance - total_cost)
-            
+        current_price = market.yes_price if side == "yes" else market.no_price
+        coins = int(round(current_price * quantity * COINS_PER_DOLLAR))
+        
+        if order_type == "buy":
             # Update market prices with improved impact formula
             if side == "yes":
                 new_yes_price = TradingEngine.calculate_price_impact(
-                    quantity, locked_market.liquidity, "yes", locked_market.yes_price
+                    quantity, market.liquidity, "yes", market.yes_price
                 )
-                locked_market.yes_price = new_yes_price
-                locked_market.no_price = round(1.0 - new_yes_price, 4)
+                market.yes_price = new_yes_price
+                market.no_price = round(1.0 - new_yes_price, 4)
             else:
                 new_no_price = TradingEngine.calculate_price_impact(
-                    quantity, locked_market.liquidity, "yes", locked_market.no_price
+                    quantity, market.liquidity, "yes", market.no_price
                 )
-                locked_market.no_price = new_no_price
-                locked_market.yes_price = round(1.0 - new_no_price, 4)
-            
-            locked_market.total_volume += total_cost
-            
-            # Create order record
-            order = Order(
-                user_id=locked_user.id,
-                market_id=locked_market.id,
-                side=side,
-                order_type="buy",
-                quantity=quantity,
-                price=current_price,
-                total_cost=total_cost,
-                status=OrderStatus.FILLED.value,
-                filled_quantity=quantity,
-                executed_at=datetime.utcnow()
+                market.no_price = new_no_price
+                market.yes_price = round(1.0 - new_no_price, 4)
+        else:
+            # Inverse of buy - selling reduces price
+            impact = quantity / (market.liquidity * 10)
+            if side == "yes":
+                available_room = market.yes_price - 0.01
+                market.yes_price = round(max(0.01, market.yes_price - impact * (available_room / 0.49)), 4)
+                market.no_price = round(1.0 - market.yes_price, 4)
+            else:
+                available_room = market.no_price - 0.01
+                market.no_price = round(max(0.01, market.no_price - impact * (available_room / 0.49)), 4)
+                market.yes_price = round(1.0 - market.no_price, 4)
+        
+        market.total_volume += coins
+        return current_price, coins
+    
+    @staticmethod
+    def _record_activity(db: Session, market: Market, volume: float, price_before: float) -> None:
+        """Count a trade's volume in the market's current activity bucket and refresh its 24h sort keys."""
+        now = datetime.now(timezone.utc)
+        insert = TradingEngine._upsert_insert(db)
+        db.execute(
+            insert(MarketActivity)
+            .values(market_id=market.id, bucket_start=bucket_start(now), volume=volume, open_price=price_before)
+            .on_conflict_do_update(
+                index_elements=["market_id", "bucket_start"],
+                set_={"volume": MarketActivity.volume + volume}
             )
-            db.add(order)
-            
-            # Update or create position with row locking
-            position = db.execute(
-                select(Position).where(
-                    Position.user_id == locked_user.id,
-                    Position.market_id == locked_market.id
-                ).with_for_update()
+        )
+        update_trending_keys(db, market, now)
+    
+    @staticmethod
+    def _record_fill(order: Order, quantity: int, price: float, coins: int) -> None:
+        """Add a fill to an order's filled quantity, total and average price."""
+        filled = order.filled_quantity or 0
+        average = order.price * filled if filled else 0
+        order.filled_quantity = filled + quantity
+        order.total_cost = (order.total_cost or 0) + coins
+        order.price = round((average + price * quantity) / order.filled_quantity, 4)
+        order.status = (
+            OrderStatus.FILLED.value if order.filled_quantity == order.quantity
+            else OrderStatus.PARTIALLY_FILLED.value
+        )
+        order.executed_at = datetime.utcnow()
+    
+    @staticmethod
+    def _return_escrow(db: Session, order: Order, quantity: int) -> None:
+        """Return the escrow of `quantity` unfilled shares of a limit order: coins for a buy, shares for a sell."""
+        if order.order_type == "buy":
+            TradingEngine._credit(db, order, int(round(order.limit_price * COINS_PER_DOLLAR)) * quantity, LedgerKind.ESCROW_RELEASE)
+        else:
+            shares_col = Position.yes_shares if order.side == "yes" else Position.no_shares
+            db.execute(
+                update(Position)
+                .where(Position.user_id == order.user_id, Position.market_id == order.market_id)
+                .values({shares_col: shares_col + quantity, Position.updated_at: func.now()})
+            )
+            ledger.record(
+                db, order.user_id, LedgerKind.ESCROW_RELEASE,
+                market_id=order.market_id, side=order.side, shares=quantity, order_id=order.id
+            )
+    
+    @staticmethod
+    def _release_order(db: Session, books: MarketBooks, order: Order) -> None:
+        """Cancel a resting order: take it off the book and return its escrow."""
+        books.remove(order.id)
+        TradingEngine._return_escrow(db, order, order.quantity - (order.filled_quantity or 0))
+        order.status = OrderStatus.CANCELLED.value
+    
+    @staticmethod
+    def _match(
+        db: Session,
+        user: User,
+        market: Market,
+        books: MarketBooks,
+        side: str,
+        order_type: str,
+        quantity: int,
+        limit_price: Optional[float]
+    ) -> Tuple[Optional[Order], Optional[str], List[Order]]:
+        """
+        Execute an order within the caller's transaction: escrow, match against
+        the book, fill the rest from the AMM if its price is acceptable, and
+        rest any remainder of a limit order on the book.
+        Returns (order, error_message, maker_orders_touched).
+        """
+        limit_tick = int(round(limit_price * COINS_PER_DOLLAR)) if limit_price is not None else None
+        shares_col = Position.yes_shares if side == "yes" else Position.no_shares
+        volume_before, price_before = market.total_volume, market.yes_price
+        
+        # Escrow: coins for a limit buy, shares for any sell
+        if order_type == "buy" and limit_tick is not None:
+            escrow = limit_tick * quantity
+            new_balance = db.execute(
+                update(User)
+                .where(User.id == user.id, User.balance >= escrow)
+                .values(balance=User.balance - escrow)
+                .returning(User.balance)
             ).scalar_one_or_none()
-            
-            if not position:
-                position = Position(
-                    user_id=locked_user.id,
-                    market_id=locked_market.id,
-                    yes_shares=0,
-                    no_shares=0,
-                    avg_yes_price=0,
-                    avg_no_price=0
+            if new_balance is None:
+                return None, TradingEngine._insufficient_balance(db, user, escrow), []
+        elif order_type == "sell":
+            remaining_shares = db.execute(
+                update(Position)
+                .where(
+                    Position.user_id == user.id,
+                    Position.market_id == market.id,
+                    shares_col >= quantity
                 )
-                db.add(position)
-                db.flush()  # Get the position ID
+                .values({shares_col: shares_col - quantity, Position.updated_at: func.now()})
+                .returning(shares_col)
+            ).scalar_one_or_none()
+            if remaining_shares is None:
+                db.rollback()
+                shares_held = db.execute(
+                    select(shares_col).where(
+                        Position.user_id == user.id,
+                        Position.market_id == market.id
+                    )
+                ).scalar_one_or_none()
+                if shares_held is None:
+                    return None, "No position to sell", []
+                return None, f"Insufficient shares. You have {shares_held} shares.", []
+        
+        order = Order(
+            user_id=user.id,
+            market_id=market.id,
+            side=side,
+            order_type=order_type,
+            quantity=quantity,
+            price=limit_price if limit_price is not None else 0,
+            total_cost=0,
+            limit_price=limit_price,
+            status=OrderStatus.PENDING.value,
+            filled_quantity=0
+        )
+        db.add(order)
+        db.flush()  # Assigns the ID the book (and ledger) reference the order by
+        if order_type == "buy" and limit_tick is not None:
+            ledger.record(db, user.id, LedgerKind.ESCROW, coins=-escrow, market_id=market.id, order_id=order.id)
+        elif order_type == "sell":
+            ledger.record(
+                db, user.id, LedgerKind.TRADE if limit_tick is None else LedgerKind.ESCROW,
+                market_id=market.id, side=side, shares=-quantity, order_id=order.id
+            )
+        
+        # Book liquidity is only taken while it is priced at least as well as the AMM
+        amm_price = market.yes_price if side == "yes" else market.no_price
+        match_limit = amm_price * COINS_PER_DOLLAR
+        if limit_tick is not None:
+            match_limit = min(limit_tick, match_limit) if order_type == "buy" else max(limit_tick, match_limit)
+        
+        makers: List[Order] = []
+        trade_counts: Dict[int, int] = {}  # User ID -> orders that traded for the first time
+        remaining = quantity
+        while remaining:
+            match = books.best_match(side, order_type, match_limit)
+            if match is None:
+                break
+            tick, entry = match
+            maker = db.get(Order, entry.order_id)
+            if entry.user_id == user.id:
+                # Self-trade prevention: the older resting order is cancelled
+                TradingEngine._release_order(db, books, maker)
+                makers.append(maker)
+                continue
             
-            # Update position with new shares and calculate weighted average price
-            if side == "yes":
-                total_shares = position.yes_shares + quantity
-                if total_shares > 0:
-                    position.avg_yes_price = (
-                        (position.avg_yes_price * position.yes_shares) + 
-                        (current_price * quantity)
-                    ) / total_shares
-                position.yes_shares = total_shares
+            fill = min(remaining, entry.remaining)
+            coins = tick * fill  # Trades at the resting order's price
+            books.fill(entry.order_id, fill)
+            if not maker.filled_quantity:
+                trade_counts[maker.user_id] = trade_counts.get(maker.user_id, 0) + 1
+            TradingEngine._record_fill(maker, fill, tick / COINS_PER_DOLLAR, coins)
+            TradingEngine._record_fill(order, fill, tick / COINS_PER_DOLLAR, coins)
+            if order_type == "buy":
+                TradingEngine._credit(db, maker, coins, LedgerKind.TRADE)
+                TradingEngine._add_shares(db, order, fill, tick / COINS_PER_DOLLAR)
             else:
-                total_shares = position.no_shares + quantity
-                if total_shares > 0:
-                    position.avg_no_price = (
-                        (position.avg_no_price * position.no_shares) + 
-                        (current_price * quantity)
-                    ) / total_shares
-                position.no_shares = total_shares
-            
-            db.commit()
-            db.refresh(order)
-            
-            return order, None
+                TradingEngine._add_shares(db, maker, fill, tick / COINS_PER_DOLLAR)
+            market.total_volume += coins
+            makers.append(maker)
+            remaining -= fill
+        
+        # The AMM takes the rest of a market order, and of a limit order if its price is within the limit
+        amm_acceptable = limit_tick is None or (
+            amm_price * COINS_PER_DOLLAR <= limit_tick if order_type == "buy" else amm_price * COINS_PER_DOLLAR >= limit_tick
+        )
+        if remaining and amm_acceptable:
+            price, coins = TradingEngine._fill_from_amm(market, side, order_type, remaining)
+            TradingEngine._record_fill(order, remaining, price, coins)
+            if order_type == "buy":
+                TradingEngine._add_shares(db, order, remaining, price)
+            remaining = 0
+        
+        if remaining:
+            books.add(side, order_type, limit_tick, RestingOrder(order.id, user.id, remaining))
+        if order.filled_quantity:
+            trade_counts[user.id] = trade_counts.get(user.id, 0) + 1
+        TradingEngine._count_trades(db, trade_counts)
+        
+        # Settle the taker's coins
+        if order_type == "sell":
+            TradingEngine._credit(db, order, int(order.total_cost), LedgerKind.TRADE)
+        elif limit_tick is not None:
+            # Refund what the fills didn't use of the escrow, keeping the resting remainder's share
+            TradingEngine._credit(
+                db, order, escrow - int(order.total_cost) - limit_tick * remaining, LedgerKind.ESCROW_RELEASE
+            )
+        else:
+            total_cost = int(order.total_cost)
+            new_balance = db.execute(
+                update(User)
+                .where(User.id == user.id, User.balance >= total_cost)
+                .values(balance=User.balance - total_cost)
+                .returning(User.balance)
+            ).scalar_one_or_none()
+            if new_balance is None:
+                return None, TradingEngine._insufficient_balance(db, user, total_cost), []
+            ledger.record(db, user.id, LedgerKind.TRADE, coins=-total_cost, market_id=market.id, order_id=order.id)
+        
+        traded = market.total_volume - volume_before
+        if traded:
+            TradingEngine._record_activity(db, market, traded, price_before)
+        if makers or remaining:
+            market.book_version += 1
+        return order, None, makers
+    
+    @staticmethod
+    def _insufficient_balance(db: Session, user: User, needed: int) -> str:
+        db.rollback()
+        balance = db.execute(
+            select(User.balance).where(User.id == user.id)
+        ).scalar_one()
+        return f"Insufficient balance. Need 🪙{needed}, have 🪙{balance}"
+    
+    @staticmethod
+    def _commit_book_change(db: Session, market: Market, books: MarketBooks, orders: List[Order]) -> None:
+        """Commit, adopt the new book version and notify listeners of every order touched."""
+        db.commit()
+        books.version = market.book_version
+        notified = set()
+        for order in orders:
+            if order.id not in notified:
+                notified.add(order.id)
+                db.refresh(order)
+                TradingEngine._notify(TradingEngine._trade_listeners, db, order)
+    
+    @staticmethod
+    def place_order(
+        db: Session,
+        user: User,
+        market_id: int,
+        side: str,
+        order_type: str,
+        quantity: int,
+        limit_price: Optional[float] = None,
+        idempotency_key: Optional[str] = None,
+        request_hash: Optional[str] = None
+    ) -> Tuple[Optional[Order], Optional[str]]:
+        """
+        Place a market order (no limit_price) or a limit order.
+        The order first matches resting limit orders in price-time priority,
+        each fill at the resting order's price; what remains trades with the
+        AMM if its price is within the limit, otherwise rests on the book.
+        Balance and share checks are conditional UPDATEs, so only the market
+        row is locked for the duration of the trade.
+        An idempotency key is committed with the order; a concurrent placement
+        under the same key fails on its primary key instead.
+        Returns (order, error_message).
+        """
+        with order_books.lock(market_id):
+            try:
+                locked_market = TradingEngine._lock_market(db, market_id)
+                if not TradingEngine._is_tradable(locked_market):
+                    db.rollback()
+                    return None, "Market is not open for trading"
+                books = order_books.get(db, locked_market.id, locked_market.book_version)
+                order, error, makers = TradingEngine._match(
+                    db, user, locked_market, books, side, order_type, quantity, limit_price
+                )
+                if error:
+                    order_books.discard(locked_market.id)
+                    return None, error
+                if idempotency_key is not None:
+                    db.add(OrderIdempotencyKey(
+                        user_id=user.id, key=idempotency_key, order_id=order.id, request_hash=request_hash
+                    ))
+                TradingEngine._commit_book_change(db, locked_market, books, [order] + makers)
+                return order, None
             
-        except Exception as e:
-            db.rollback()
-            return None, f"Transaction failed: {str(e)}"
+            except Exception as e:
+                db.rollback()
+                order_books.discard(market_id)
+                return None, f"Transaction failed: {str(e)}"
+    
+    @staticmethod
+    def execute_buy_order(
+        db: Session,
+        user: User,
+        market: Market,
+        side: str,
+        quantity: int
+    ) -> Tuple[Optional[Order], Optional[str]]:
+        """Execute a market buy order. Returns (order, error_message)."""
+        return TradingEngine.place_order(db, user, market.id, side, "buy", quantity)
     
     @staticmethod
     def execute_sell_order(
@@ -175,92 +495,138 @@ class TradingEngine:
         side: str,
         quantity: int
     ) -> Tuple[Optional[Order], Optional[str]]:
+        """Execute a market sell order. Returns (order, error_message)."""
+        return TradingEngine.place_order(db, user, market.id, side, "sell", quantity)
+    
+    @staticmethod
+    def _lock_resting_order(db: Session, order: Order) -> Tuple[Market, MarketBooks, Optional[Order]]:
+        """Lock the order's market and load its books; the order is None if it no longer rests."""
+        locked_market = db.execute(
+            select(Market).where(Market.id == order.market_id).with_for_update()
+        ).scalar_one()
+        books = order_books.get(db, locked_market.id, locked_market.book_version)
+        db.refresh(order)
+        if order.status not in RESTING_STATUSES or order.id not in books.index:
+            return locked_market, books, None
+        return locked_market, books, order
+    
+    @staticmethod
+    def cancel_order(db: Session, order: Order) -> Tuple[Optional[Order], Optional[str]]:
         """
-        Execute a sell order with proper transaction safety.
-        Uses SELECT FOR UPDATE to prevent race conditions.
+        Cancel a resting limit order, returning its unfilled escrow.
         Returns (order, error_message).
         """
-        try:
-            # Lock user and market rows
-            locked_user = db.execute(
-                select(User).where(User.id == user.id).with_for_update()
-            ).scalar_one()
+        with order_books.lock(order.market_id):
+            try:
+                locked_market, books, resting = TradingEngine._lock_resting_order(db, order)
+                if resting is None:
+                    db.rollback()
+                    return None, "Order is not open"
+                TradingEngine._release_order(db, books, resting)
+                locked_market.book_version += 1
+                TradingEngine._commit_book_change(db, locked_market, books, [resting])
+                return resting, None
             
-            locked_market = db.execute(
-                select(Market).where(Market.id == market.id).with_for_update()
-            ).scalar_one()
-            
-            # Get and lock user's position
-            position = db.execute(
-                select(Position).where(
-                    Position.user_id == locked_user.id,
-                    Position.market_id == locked_market.id
-                ).with_for_update()
-            ).scalar_one_or_none()
-            
-            if not position:
-                return None, "No position to sell"
-            
-            # Check if user has enough shares
-            shares_held = position.yes_shares if side == "yes" else position.no_shares
-            if shares_held < quantity:
-                return None, f"Insufficient shares. You have {shares_held} shares."
-            
-            # Calculate payout at current price (in coins: price * quantity * 100)
-            current_price = locked_market.yes_price if side == "yes" else locked_market.no_price
-            total_payout = int(round(current_price * quantity * 100))  # Payout in coins
-            
-            # Update user balance (ensure it stays as integer)
-            locked_user.balance = int(locked_user.balance + total_payout)
-            
-            # Update market prices (inverse of buy - selling reduces price)
-            if side == "yes":
-                # Selling YES reduces YES price
-                impact = quantity / (locked_market.liquidity * 10)
-                available_room = locked_market.yes_price - 0.01
-                adjusted_impact = impact * (available_room / 0.49)
-                locked_market.yes_price = max(0.01, locked_market.yes_price - adjusted_impact)
-                locked_market.yes_price = round(locked_market.yes_price, 4)
-                locked_market.no_price = round(1.0 - locked_market.yes_price, 4)
-            else:
-                impact = quantity / (locked_market.liquidity * 10)
-                available_room = locked_market.no_price - 0.01
-                adjusted_impact = impact * (available_room / 0.49)
-                locked_market.no_price = max(0.01, locked_market.no_price - adjusted_impact)
-                locked_market.no_price = round(locked_market.no_price, 4)
-                locked_market.yes_price = round(1.0 - locked_market.no_price, 4)
-            
-            locked_market.total_volume += total_payout
-            
-            # Create order record
-            order = Order(
-                user_id=locked_user.id,
-                market_id=locked_market.id,
-                side=side,
-                order_type="sell",
-                quantity=quantity,
-                price=current_price,
-                total_cost=total_payout,
-                status=OrderStatus.FILLED.value,
-                filled_quantity=quantity,
-                executed_at=datetime.utcnow()
-            )
-            db.add(order)
-            
-            # Update position
-            if side == "yes":
-                position.yes_shares -= quantity
-            else:
-                position.no_shares -= quantity
+            except Exception as e:
+                db.rollback()
+                order_books.discard(order.market_id)
+                return None, f"Cancel failed: {str(e)}"
+    
+    @staticmethod
+    def amend_order(
+        db: Session,
+        user: User,
+        order: Order,
+        quantity: Optional[int] = None,
+        limit_price: Optional[float] = None
+    ) -> Tuple[Optional[Order], Optional[str]]:
+        """
+        Amend a resting limit order. Reducing its quantity at the same price
+        keeps the order and its place in the queue, releasing the escrow for
+        the removed shares. A new price or a larger quantity cancels it and
+        places a new order for the unfilled remainder at the back of the
+        queue, which may match at once.
+        Returns (order, error_message); the order is the replacement, if any.
+        """
+        with order_books.lock(order.market_id):
+            try:
+                locked_market, books, resting = TradingEngine._lock_resting_order(db, order)
+                if resting is None:
+                    db.rollback()
+                    return None, "Order is not open"
+                if not TradingEngine._is_tradable(locked_market):
+                    db.rollback()
+                    return None, "Market is not open for trading"
+                
+                filled = resting.filled_quantity or 0
+                new_quantity = quantity if quantity is not None else resting.quantity
+                new_price = limit_price if limit_price is not None else resting.limit_price
+                if new_quantity <= filled:
+                    db.rollback()
+                    return None, f"Quantity must exceed the {filled} shares already filled"
+                
+                if new_price == resting.limit_price and new_quantity <= resting.quantity:
+                    released = resting.quantity - new_quantity
+                    if released:
+                        books.index[resting.id][3].remaining -= released
+                        TradingEngine._return_escrow(db, resting, released)
+                        resting.quantity = new_quantity
+                        locked_market.book_version += 1
+                    TradingEngine._commit_book_change(db, locked_market, books, [resting])
+                    return resting, None
+                
+                TradingEngine._release_order(db, books, resting)
+                replacement, error, makers = TradingEngine._match(
+                    db, user, locked_market, books, resting.side, resting.order_type,
+                    new_quantity - filled, new_price
+                )
+                if error:
+                    order_books.discard(locked_market.id)
+                    return None, error
+                locked_market.book_version += 1
+                TradingEngine._commit_book_change(db, locked_market, books, [resting, replacement] + makers)
+                return replacement, None
             
+            except Exception as e:
+                db.rollback()
+                order_books.discard(order.market_id)
+                return None, f"Amend failed: {str(e)}"
+    
+    @staticmethod
+    def cancel_resting_orders(db: Session, market: Market) -> int:
+        """
+        Cancel every resting order of a locked market and return their escrow,
+        within the caller's transaction (before resolution or deletion; the
+        caller holds order_books.lock). Returns the number of orders cancelled.
+        """
+        resting = db.execute(
+            select(Order).where(Order.market_id == market.id, Order.status.in_(RESTING_STATUSES))
+        ).scalars().all()
+        for order in resting:
+            TradingEngine._return_escrow(db, order, order.quantity - (order.filled_quantity or 0))
+            order.status = OrderStatus.CANCELLED.value
+        if resting:
+            market.book_version += 1
+        order_books.discard(market.id)
+        return len(resting)
+    
+    @staticmethod
+    def cancel_market_orders(db: Session, market_id: int) -> int:
+        """
+        Cancel every resting order of a closed market in a transaction of its
+        own. Trade listeners hear of each cancelled order, as they would of a
+        cancel by its owner. Returns the number of orders cancelled.
+        """
+        with order_books.lock(market_id):
+            locked_market = TradingEngine._lock_market(db, market_id)
+            cancelled = db.execute(
+                select(Order).where(Order.market_id == market_id, Order.status.in_(RESTING_STATUSES))
+            ).scalars().all()
+            TradingEngine.cancel_resting_orders(db, locked_market)
             db.commit()
-            db.refresh(order)
-            
-            return order, None
-            
-        except Exception as e:
-            db.rollback()
-            return None, f"Transaction failed: {str(e)}"
+        for order in cancelled:
+            TradingEngine._notify(TradingEngine._trade_listeners, db, order)
+        return len(cancelled)
     
     @staticmethod
     def resolve_market(
@@ -273,57 +639,65 @@ class TradingEngine:
         Processes in batches to handle large numbers of positions.
         Returns (settled_count, error_message).
         """
-        try:
-            # Lock the market
-            locked_market = db.execute(
-                select(Market).where(Market.id == market.id).with_for_update()
-            ).scalar_one()
-            
-            locked_market.status = MarketStatus.RESOLVED.value
-            locked_market.resolved_outcome = outcome
-            
-            # Process positions in batches
-            batch_size = 500
-            offset = 0
-            settled_count = 0
-            
-            while True:
-                # Get batch of positions with user data eagerly loaded
-                positions = db.query(Position).filter(
-                    Position.market_id == locked_market.id
-                ).options(
-                    joinedload(Position.user)
-                ).offset(offset).limit(batch_size).all()
+        with order_books.lock(market.id):
+            try:
+                # Lock the market
+                locked_market = db.execute(
+                    select(Market).where(Market.id == market.id).with_for_update()
+                ).scalar_one()
+                
+                # Resting limit orders are cancelled first, so escrowed shares are paid out too
+                TradingEngine.cancel_resting_orders(db, locked_market)
+                
+                locked_market.status = MarketStatus.RESOLVED.value
+                locked_market.resolved_outcome = outcome
                 
-                if not positions:
-                    break
+                # Process positions in batches
+                batch_size = 500
+                offset = 0
+                settled_count = 0
                 
-                for position in positions:
-                    if outcome == "yes":
-                        # YES holders win $1 per share
-                        payout = position.yes_shares * 1.0
-                    else:
-                        # NO holders win $1 per share
-                        payout = position.no_shares * 1.0
+                while True:
+                    # Get batch of positions with user data eagerly loaded
+                    positions = db.query(Position).filter(
+                        Position.market_id == locked_market.id
+                    ).options(
+                        joinedload(Position.user)
+                    ).offset(offset).limit(batch_size).all()
+                    
+                    if not positions:
+                        break
+                    
+                    for position in positions:
+                        if outcome == "yes":
+                            # YES holders win $1 per share
+                            payout = position.yes_shares * PAYOUT_PER_SHARE
+                        else:
+                            # NO holders win $1 per share
+                            payout = position.no_shares * PAYOUT_PER_SHARE
+                        
+                        if payout > 0:
+                            # Lock the user row for update
+                            user = db.execute(
+                                select(User).where(User.id == position.user_id).with_for_update()
+                            ).scalar_one()
+                            user.balance += payout
+                            ledger.record(
+                                db, user.id, LedgerKind.PAYOUT, coins=payout, market_id=locked_market.id
+                            )
+                            settled_count += 1
                     
-                    if payout > 0:
-                        # Lock the user row for update
-                        user = db.execute(
-                            select(User).where(User.id == position.user_id).with_for_update()
-                        ).scalar_one()
-                        user.balance += payout
-                        settled_count += 1
+                    offset += batch_size
+                    # Commit each batch to prevent long-running transactions
+                    db.flush()
                 
-                offset += batch_size
-                # Commit each batch to prevent long-running transactions
-                db.flush()
-            
-            db.commit()
-            return settled_count, None
-            
-        except Exception as e:
-            db.rollback()
-            return 0, f"Resolution failed: {str(e)}"
+                db.commit()
+                TradingEngine._notify(TradingEngine._resolution_listeners, db, locked_market)
+                return settled_count, None
+                
+            except Exception as e:
+                db.rollback()
+                return 0, f"Resolution failed: {str(e)}"
 
 
 trading_engine = TradingEngine()
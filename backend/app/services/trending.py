@@ -0,0 +1,97 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, delete
+from datetime import datetime, timedelta, timezone
+from typing import List
+import asyncio
+from ..config import settings
+from ..models.market import Market, MarketActivity
+from ..shared_state import acquire_lease
+
+# The trailing window behind volume_24h and price_change_24h
+TRENDING_WINDOW = timedelta(hours=24)
+
+
+def bucket_start(at: datetime) -> datetime:
+    """Start of the activity bucket containing `at`."""
+    seconds = settings.market_activity_bucket_seconds
+    return datetime.fromtimestamp(at.timestamp() // seconds * seconds, timezone.utc)
+
+
+def window_start(at: datetime) -> datetime:
+    """Start of the oldest bucket in the trailing window at `at` (the current bucket is the newest)."""
+    return bucket_start(at) - TRENDING_WINDOW + timedelta(seconds=settings.market_activity_bucket_seconds)
+
+
+def update_trending_keys(db: Session, market: Market, now: datetime) -> None:
+    """
+    Recompute a market's volume_24h and price_change_24h from its buckets in
+    the window, within the caller's transaction (which holds the market row).
+    At most one bucket per market_activity_bucket_seconds is read, however
+    busy the market.
+    """
+    buckets = db.execute(
+        select(MarketActivity.volume, MarketActivity.open_price)
+        .where(MarketActivity.market_id == market.id, MarketActivity.bucket_start >= window_start(now))
+        .order_by(MarketActivity.bucket_start)
+    ).all()
+    market.volume_24h = sum(volume for volume, _ in buckets)
+    # The price before the window's first trade is the price at the start of the window
+    market.price_change_24h = round(market.yes_price - buckets[0].open_price, 4) if buckets else 0.0
+
+
+def roll_trending_keys(db: Session, batch_size: int = 500) -> List[int]:
+    """
+    Recompute the sort keys of markets with buckets that have left the
+    window, then drop those buckets; a batch of markets per transaction.
+    Markets that trade get their keys updated with each trade, so this
+    only catches up markets whose trading has gone quiet.
+    Returns the IDs of the markets updated.
+    """
+    now = datetime.now(timezone.utc)
+    expired = MarketActivity.bucket_start < window_start(now)
+    rolled: List[int] = []
+    while True:
+        market_ids = db.execute(
+            select(MarketActivity.market_id).where(expired).distinct().limit(batch_size)
+        ).scalars().all()
+        if not market_ids:
+            return rolled
+        # Row locks in ID order, as a trade would take them
+        markets = db.execute(
+            select(Market).where(Market.id.in_(market_ids)).order_by(Market.id).with_for_update()
+        ).scalars().all()
+        for market in markets:
+            update_trending_keys(db, market, now)
+        db.execute(delete(MarketActivity).where(MarketActivity.market_id.in_(market_ids), expired))
+        db.commit()
+        rolled.extend(market.id for market in markets)
+
+
+def run_trending_roll() -> int:
+    """Roll the trending window (own session; runs in a worker thread)."""
+    from ..database import SessionLocal
+    from .market_cache import market_versions
+
+    db = SessionLocal()
+    try:
+        rolled = roll_trending_keys(db)
+    finally:
+        db.close()
+    for market_id in rolled:
+        market_versions.bump(market_id)
+    return len(rolled)
+
+
+async def trending_roll_loop() -> None:
+    """Background task: roll the trending window every configured interval."""
+    while True:
+        await asyncio.sleep(settings.market_trending_roll_seconds)
+        # Only one worker across the deployment runs each pass
+        if not acquire_lease("trending_roll", settings.market_trending_roll_seconds * 2):
+            continue
+        try:
+            rolled = await asyncio.to_thread(run_trending_roll)
+            if rolled:
+                print(f"[Trending] Rolled the 24h window of {rolled} markets")
+        except Exception as e:
+            print(f"[Trending] Roll failed: {type(e).__name__}: {e}")
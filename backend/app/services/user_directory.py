@@ -0,0 +1,206 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, update, func, and_, or_, tuple_, cast, Integer
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Set, Tuple
+import asyncio
+import threading
+import time
+from ..config import settings
+from ..models.user import User, UserSignupDay, UserTotals
+from ..models.market import Market
+from ..models.order import Order
+from ..models.position import Position
+from ..schemas.user import UserSort
+from ..shared_state import acquire_lease
+from .order_book import reserved_value
+from .leaderboard import position_value
+from .trading import TradingEngine
+
+# Each sort's key; pages run down it, ties broken by ID, over the matching (key, id) index
+USER_SORTS = {
+    UserSort.NEWEST: User.id,
+    UserSort.BALANCE: User.balance,
+    UserSort.EQUITY: User.equity,
+    UserSort.TRADES: User.trade_count,
+}
+
+DIRECTORY_COLUMNS = (
+    User.id, User.username, User.email, User.balance, User.equity, User.trade_count,
+    User.is_active, User.is_admin, User.created_at
+)
+
+
+def equity_value(user_id):
+    """
+    Scalar expression: a user's equity in whole coins, valued as on the
+    leaderboard (balance, positions at current prices, resting-order
+    escrow). `user_id` may be a column, to correlate with an outer statement.
+    """
+    return cast(func.round(User.balance + position_value(user_id) + reserved_value(user_id)), Integer)
+
+
+def _prefix_match(db: Session, column, prefix: str):
+    """
+    Case-insensitive prefix match on lower(column), as a range scan of its
+    index (migration 0008): LIKE over a text_pattern_ops index on
+    PostgreSQL, a plain range on SQLite, whose ordering is byte-wise.
+    """
+    key = func.lower(column)
+    prefix = prefix.lower()
+    if db.get_bind().dialect.name == "postgresql":
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return key.like(escaped + "%")
+    return and_(key >= prefix, key < prefix[:-1] + chr(ord(prefix[-1]) + 1))
+
+
+def parse_cursor(cursor: str) -> Tuple[int, int]:
+    """A next-page cursor's (sort key, user ID); ValueError if malformed."""
+    value, user_id = cursor.split(":")
+    return int(value), int(user_id)
+
+
+def get_user_directory(
+    db: Session,
+    limit: int = 50,
+    after: Optional[str] = None,
+    q: Optional[str] = None,
+    sort: UserSort = UserSort.NEWEST,
+    active: Optional[bool] = None,
+    admin: Optional[bool] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    A page of users, largest sort key first, optionally those whose
+    username or email starts with `q`. Uses keyset pagination on (sort key,
+    ID), so deep pages cost the same as the first. Returns (users,
+    next_cursor); next_cursor is None on the last page.
+    """
+    key = USER_SORTS[sort]
+    query = select(*DIRECTORY_COLUMNS)
+    if q:
+        query = query.where(or_(_prefix_match(db, User.username, q), _prefix_match(db, User.email, q)))
+    if active is not None:
+        query = query.where(User.is_active == active)
+    if admin is not None:
+        query = query.where(User.is_admin == admin)
+    if after is not None:
+        value, user_id = parse_cursor(after)
+        query = query.where(User.id < user_id if key is User.id else tuple_(key, User.id) < (value, user_id))
+    rows = db.execute(query.order_by(key.desc(), User.id.desc()).limit(limit + 1)).mappings().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = f"{last[key.key]}:{last['id']}"
+    return [dict(row) for row in rows], next_cursor
+
+
+def get_user_stats(db: Session, days: int = 30) -> dict:
+    """User totals and signups per day over the last `days` UTC days, from the trigger-kept counters."""
+    totals = db.get(UserTotals, 1)
+    start = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+    signups = dict(db.execute(
+        select(UserSignupDay.day, UserSignupDay.signups).where(UserSignupDay.day >= start)
+    ).all())
+    return {
+        "users": totals.users if totals else 0,
+        "active": totals.active if totals else 0,
+        "admins": totals.admins if totals else 0,
+        "signups": [
+            {"day": day, "signups": signups.get(day, 0)}
+            for day in (start + timedelta(days=offset) for offset in range(days))
+        ]
+    }
+
+
+class EquityRefresher:
+    """
+    Keeps users.equity, the directory's equity sort key, close to current.
+    Users who trade, or hold a market that resolves, are revalued shortly
+    after by the worker that saw it, in batched UPDATEs computed in the
+    database. Price moves change the equity of everyone holding the
+    market, so every user_equity_refresh_seconds one worker revalues all
+    users, writing only rows whose equity changed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Set[int] = set()
+
+    def mark(self, user_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._pending.update(user_ids)
+
+    def flush(self, db: Session, batch_size: Optional[int] = None) -> int:
+        """Revalue the users marked since the last flush; returns how many."""
+        batch_size = batch_size or settings.user_equity_batch_size
+        with self._lock:
+            pending, self._pending = sorted(self._pending), set()
+        for start in range(0, len(pending), batch_size):
+            db.execute(
+                update(User)
+                .where(User.id.in_(pending[start:start + batch_size]))
+                .values(equity=equity_value(User.id))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        return len(pending)
+
+    def on_trade(self, db: Session, order: Order) -> None:
+        self.mark([order.user_id])
+
+    def on_resolution(self, db: Session, market: Market) -> None:
+        self.mark(db.execute(select(Position.user_id).where(Position.market_id == market.id)).scalars().all())
+
+
+equity_refresher = EquityRefresher()
+TradingEngine.add_trade_listener(equity_refresher.on_trade)
+TradingEngine.add_resolution_listener(equity_refresher.on_resolution)
+
+
+def revalue_all_users(db: Session, batch_size: Optional[int] = None) -> int:
+    """Revalue every user, an ID range per transaction. Returns the number of users whose equity changed."""
+    batch_size = batch_size or settings.user_equity_batch_size
+    last_id = db.execute(select(func.max(User.id))).scalar() or 0
+    value = equity_value(User.id)
+    changed = 0
+    for start in range(0, last_id + 1, batch_size):
+        changed += db.execute(
+            update(User)
+            .where(User.id >= start, User.id < start + batch_size, User.equity != value)
+            .values(equity=value)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+    return changed
+
+
+def run_equity_refresh(revalue_all: bool) -> None:
+    """Flush this worker's marked users, and revalue everyone if asked (own session; runs in a worker thread)."""
+    from ..database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        equity_refresher.flush(db)
+        if revalue_all:
+            changed = revalue_all_users(db)
+            if changed:
+                print(f"[Users] Revalued equity of {changed} users")
+    finally:
+        db.close()
+
+
+async def user_equity_loop() -> None:
+    """Background task: revalue users who traded, and periodically (on one worker) everyone."""
+    interval = settings.user_equity_refresh_seconds
+    next_full = 0.0
+    while True:
+        try:
+            revalue_all = time.monotonic() >= next_full
+            if revalue_all:
+                next_full = time.monotonic() + interval
+                revalue_all = acquire_lease("user_equity", interval * 2)
+            await asyncio.to_thread(run_equity_refresh, revalue_all)
+        except Exception as e:
+            print(f"[Users] Equity refresh failed: {type(e).__name__}: {e}")
+        await asyncio.sleep(settings.user_equity_flush_seconds)
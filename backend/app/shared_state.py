@@ -0,0 +1,166 @@
+from typing import Callable, Dict, List, Optional
+import json
+import os
+import threading
+import time
+import uuid
+from .config import settings
+
+# Identifies this worker process in broadcasts and leases
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+class InMemorySharedState:
+    """
+    Process-local implementation of the shared state interface.
+    Correct for a single worker and used as the fake in tests; with several
+    workers each one would see only its own state.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[str, str] = {}
+        self._expiry: Dict[str, float] = {}
+        self._subscribers: Dict[str, List[Callable[[str], None]]] = {}
+
+    def _expire(self, key: str) -> None:
+        expires_at = self._expiry.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._values.pop(key, None)
+            self._expiry.pop(key, None)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            self._expire(key)
+            return self._values.get(key)
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None, nx: bool = False) -> bool:
+        """Set a value; with nx=True only if the key does not exist. Returns whether it was set."""
+        with self._lock:
+            self._expire(key)
+            if nx and key in self._values:
+                return False
+            self._values[key] = str(value)
+            if ttl is not None:
+                self._expiry[key] = time.monotonic() + ttl
+            else:
+                self._expiry.pop(key, None)
+            return True
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            self._expire(key)
+            value = int(self._values.get(key, 0)) + amount
+            self._values[key] = str(value)
+            return value
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._values.pop(key, None)
+            self._expiry.pop(key, None)
+
+    def publish(self, channel: str, message: str) -> None:
+        for callback in list(self._subscribers.get(channel, [])):
+            callback(message)
+
+    def subscribe(self, channel: str, callback: Callable[[str], None]) -> None:
+        self._subscribers.setdefault(channel, []).append(callback)
+
+    def start_listener(self) -> None:
+        """Nothing to start: messages are delivered synchronously."""
+
+
+class RedisSharedState:
+    """Shared state in Redis (or any Redis-compatible server), visible to all workers and nodes."""
+
+    def __init__(self, url: str):
+        import redis
+
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._pubsub = None
+        self._handlers: Dict[str, List[Callable[[str], None]]] = {}
+
+    def get(self, key: str) -> Optional[str]:
+        return self._redis.get(key)
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None, nx: bool = False) -> bool:
+        px = int(ttl * 1000) if ttl is not None else None
+        return bool(self._redis.set(key, value, px=px, nx=nx))
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        return int(self._redis.incrby(key, amount))
+
+    def delete(self, key: str) -> None:
+        self._redis.delete(key)
+
+    def publish(self, channel: str, message: str) -> None:
+        self._redis.publish(channel, message)
+
+    def subscribe(self, channel: str, callback: Callable[[str], None]) -> None:
+        """Deliver messages on a channel to callback, from the listener thread."""
+        is_new_channel = channel not in self._handlers
+        self._handlers.setdefault(channel, []).append(callback)
+        if is_new_channel and self._pubsub is not None:
+            self._pubsub.subscribe(**{channel: self._dispatch})
+
+    def _dispatch(self, message) -> None:
+        for handler in list(self._handlers.get(message["channel"], [])):
+            handler(message["data"])
+
+    def start_listener(self) -> None:
+        """Subscribe to all registered channels and start the listener thread."""
+        if self._pubsub is not None or not self._handlers:
+            return
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{channel: self._dispatch for channel in self._handlers})
+        self._pubsub.run_in_thread(sleep_time=0.05, daemon=True)
+
+
+def create_shared_state(url: str):
+    """Create the shared state backend for a memory:// or redis:// URL."""
+    if url.startswith("memory://"):
+        return InMemorySharedState()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSharedState(url)
+    raise ValueError(f"Unsupported shared state URL: {url}")
+
+
+shared_state = create_shared_state(settings.shared_state_url)
+
+
+def broadcast(topic: str, payload: dict) -> None:
+    """Send a cache invalidation to the other workers."""
+    shared_state.publish(
+        f"broadcast:{topic}",
+        json.dumps({"origin": WORKER_ID, "payload": payload})
+    )
+
+
+def on_broadcast(topic: str, handler: Callable[[dict], None]) -> None:
+    """Handle invalidations broadcast by other workers (never this one's own)."""
+
+    def receive(message: str) -> None:
+        envelope = json.loads(message)
+        if envelope["origin"] == WORKER_ID:
+            return
+        try:
+            handler(envelope["payload"])
+        except Exception as e:
+            print(f"[Broadcast] Handler for '{topic}' failed: {type(e).__name__}: {e}")
+
+    shared_state.subscribe(f"broadcast:{topic}", receive)
+
+
+def acquire_lease(name: str, ttl: float) -> bool:
+    """
+    Try to become the only worker running a job for the next ttl seconds.
+    The holder re-acquires before each run, so the lease moves to another
+    worker if the holder dies.
+    """
+    key = f"lease:{name}"
+    if shared_state.set(key, WORKER_ID, ttl=ttl, nx=True):
+        return True
+    if shared_state.get(key) == WORKER_ID:
+        shared_state.set(key, WORKER_ID, ttl=ttl)
+        return True
+    return False
@@ -0,0 +1,41 @@
+from fastapi import Request, Response
+from typing import Optional
+import hashlib
+import orjson
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check the request's If-None-Match header against an ETag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    """Build an empty 304 response carrying the validators."""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def conditional_json(
+    request: Request,
+    content,
+    cache_control: str,
+    etag: Optional[str] = None
+) -> Response:
+    """
+    Serialize content and answer with 304 if the client already has it.
+    Without an explicit ETag one is derived from the body, which saves
+    bandwidth but not the query.
+    """
+    body = orjson.dumps(content)
+    if etag is None:
+        etag = 'W/"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control)
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": cache_control}
+    )
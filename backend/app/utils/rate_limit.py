@@ -0,0 +1,7 @@
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+from ..config import settings
+
+# Single limiter for the whole app. Counters live in the shared state store,
+# so limits hold across all workers and nodes when it points at Redis.
+limiter = Limiter(key_func=get_remote_address, storage_uri=settings.shared_state_url)
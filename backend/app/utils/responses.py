@@ -0,0 +1,14 @@
+from fastapi.responses import JSONResponse
+from typing import Any
+import orjson
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson.
+    Returned directly by list endpoints that build plain dicts from
+    column-projected queries, which skips per-row response model validation.
+    """
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
@@ -0,0 +1,113 @@
+from contextlib import contextmanager
+from importlib.abc import MetaPathFinder
+from typing import Dict, List, Tuple
+import os
+import sys
+import time
+
+# Set STARTUP_TIMING=1 to also time every module imported while the app loads
+IMPORT_TIMING_ENABLED = os.environ.get("STARTUP_TIMING", "").lower() in ("1", "true", "yes")
+
+
+class _TimedLoader:
+    """Wraps a module loader to time its exec_module."""
+
+    def __init__(self, loader, timer: "StartupTimer"):
+        self._loader = loader
+        self._timer = timer
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._timer._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._timer._stack.pop()
+            if self._timer._stack:
+                self._timer._stack[-1] += elapsed
+            # Self time: excludes modules imported from inside this one
+            self._timer.imports[module.__name__] = elapsed - children
+
+
+class _ImportTimingFinder(MetaPathFinder):
+    """Meta path hook that hands every found module a timed loader."""
+
+    def __init__(self, timer: "StartupTimer"):
+        self._timer = timer
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader, self._timer)
+                return spec
+        return None
+
+
+class StartupTimer:
+    """
+    Records how long startup takes: named init phases always, and the
+    self time of each imported module when import timing is enabled.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+        self.imports: Dict[str, float] = {}
+        self._stack: List[float] = []
+        self._finder = None
+
+    def install_import_hook(self) -> None:
+        if IMPORT_TIMING_ENABLED and self._finder is None:
+            self._finder = _ImportTimingFinder(self)
+            sys.meta_path.insert(0, self._finder)
+
+    def remove_import_hook(self) -> None:
+        if self._finder is not None:
+            sys.meta_path.remove(self._finder)
+            self._finder = None
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def mark(self, name: str) -> None:
+        """Record a phase that ran from the previous mark (or process start) until now."""
+        elapsed = time.perf_counter() - self.started_at - sum(d for _, d in self.phases)
+        self.phases.append((name, elapsed))
+
+    def report(self, top: int = 15) -> dict:
+        """Startup timings in milliseconds, slowest imports first."""
+        slowest = sorted(self.imports.items(), key=lambda item: item[1], reverse=True)[:top]
+        return {
+            "total_ms": round((time.perf_counter() - self.started_at) * 1000, 1),
+            "phases": {name: round(duration * 1000, 1) for name, duration in self.phases},
+            "import_total_ms": round(sum(self.imports.values()) * 1000, 1),
+            "slowest_imports": {name: round(duration * 1000, 1) for name, duration in slowest}
+        }
+
+    def print_report(self) -> None:
+        report = self.report()
+        phases = ", ".join(f"{name} {ms}ms" for name, ms in report["phases"].items())
+        print(f"[Startup] Ready in {report['total_ms']}ms ({phases})")
+        if self.imports:
+            print(f"[Startup] Imports took {report['import_total_ms']}ms; slowest modules (self time):")
+            for name, ms in report["slowest_imports"].items():
+                print(f"[Startup]   {ms:>8}ms  {name}")
+
+
+startup_timer = StartupTimer()
@@ -0,0 +1,142 @@
+from fastapi import Request, Response
+from pathlib import Path
+from typing import Dict, Optional
+import gzip
+import hashlib
+import mimetypes
+
+# Assets that get a content hash in their URL and can be cached forever
+FINGERPRINTED_SUFFIXES = {".js", ".css", ".png", ".jpg", ".jpeg", ".svg", ".ico", ".webp"}
+# Assets worth compressing (images are already compressed)
+COMPRESSIBLE_SUFFIXES = {".js", ".css", ".html", ".svg", ".json"}
+# Pages whose asset references are rewritten to fingerprinted URLs
+PAGE_SUFFIXES = {".html"}
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+
+def _brotli():
+    """The brotli module, imported on first use; None if not installed (gzip is still served)."""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+class StaticAsset:
+    """A static file held in memory with its precompressed variants."""
+
+    __slots__ = ("content_type", "etag", "cache_control", "variants")
+
+    def __init__(self, content: bytes, content_type: str, cache_control: str, compress: bool):
+        brotli = _brotli() if compress else None
+        self.content_type = content_type
+        # Weak, since the same validator covers every encoding of the content
+        self.etag = 'W/"' + hashlib.blake2b(content, digest_size=12).hexdigest() + '"'
+        self.cache_control = cache_control
+        self.variants: Dict[str, bytes] = {"identity": content}
+        if compress:
+            if brotli is not None:
+                self.variants["br"] = brotli.compress(content, quality=11)
+            self.variants["gzip"] = gzip.compress(content, compresslevel=9, mtime=0)
+            # Keep only encodings that actually make the file smaller
+            for encoding in ("br", "gzip"):
+                if encoding in self.variants and len(self.variants[encoding]) >= len(content):
+                    del self.variants[encoding]
+
+    def with_cache_control(self, cache_control: str) -> "StaticAsset":
+        """Same content and variants under a different caching policy."""
+        asset = object.__new__(StaticAsset)
+        asset.content_type = self.content_type
+        asset.etag = self.etag
+        asset.cache_control = cache_control
+        asset.variants = self.variants
+        return asset
+
+    def response(self, request: Request) -> Response:
+        """Serve the best encoding the client accepts, or 304 if it is current."""
+        headers = {
+            "ETag": self.etag,
+            "Cache-Control": self.cache_control,
+            "Vary": "Accept-Encoding"
+        }
+        if request.headers.get("if-none-match") == self.etag:
+            return Response(status_code=304, headers=headers)
+
+        accepted = request.headers.get("accept-encoding", "")
+        encoding = "identity"
+        for candidate in ("br", "gzip"):
+            if candidate in self.variants and candidate in accepted:
+                encoding = candidate
+                break
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(
+            content=self.variants[encoding],
+            media_type=self.content_type,
+            headers=headers
+        )
+
+
+class StaticAssetPipeline:
+    """
+    Builds the frontend's static assets once at startup.
+    JS/CSS/images get content-hashed URLs with immutable caching, text
+    assets are precompressed with gzip (and brotli when installed), and
+    HTML pages are rewritten to the fingerprinted URLs and kept in memory.
+    """
+
+    def __init__(self, root: Path, url_prefix: str = "/static"):
+        self.root = root
+        self.url_prefix = url_prefix
+        self.assets: Dict[str, StaticAsset] = {}
+        self.fingerprints: Dict[str, str] = {}
+
+    def build(self) -> None:
+        """Build all assets, then swap them in at once (safe to run in a thread while serving)."""
+        assets: Dict[str, StaticAsset] = {}
+        fingerprints: Dict[str, str] = {}
+        files = sorted(p for p in self.root.rglob("*") if p.is_file())
+
+        for path in files:
+            suffix = path.suffix.lower()
+            if suffix in PAGE_SUFFIXES:
+                continue
+            relative = path.relative_to(self.root).as_posix()
+            content = path.read_bytes()
+            content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+            compress = suffix in COMPRESSIBLE_SUFFIXES
+
+            # The original URL keeps working, but must be revalidated
+            asset = StaticAsset(content, content_type, REVALIDATE_CACHE_CONTROL, compress)
+            assets[relative] = asset
+            if suffix in FINGERPRINTED_SUFFIXES:
+                digest = hashlib.blake2b(content, digest_size=5).hexdigest()
+                fingerprinted = f"{relative[:-len(suffix)]}.{digest}{suffix}"
+                fingerprints[relative] = fingerprinted
+                assets[fingerprinted] = asset.with_cache_control(IMMUTABLE_CACHE_CONTROL)
+
+        for path in files:
+            if path.suffix.lower() in PAGE_SUFFIXES:
+                relative = path.relative_to(self.root).as_posix()
+                html = self.rewrite(path.read_text(encoding="utf-8"), fingerprints)
+                assets[relative] = StaticAsset(
+                    html.encode("utf-8"), "text/html; charset=utf-8", REVALIDATE_CACHE_CONTROL, True
+                )
+
+        self.fingerprints = fingerprints
+        self.assets = assets
+
+    def rewrite(self, html: str, fingerprints: Optional[Dict[str, str]] = None) -> str:
+        """Point asset references in a page at their fingerprinted URLs."""
+        for original, fingerprinted in (fingerprints or self.fingerprints).items():
+            html = html.replace(
+                f'"{self.url_prefix}/{original}"',
+                f'"{self.url_prefix}/{fingerprinted}"'
+            )
+        return html
+
+    def get(self, path: str) -> Optional[StaticAsset]:
+        return self.assets.get(path)
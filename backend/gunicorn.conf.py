@@ -0,0 +1,48 @@
+# Gunicorn settings for running several Uvicorn workers per node.
+# Usage (from backend/): gunicorn app.main:app -c gunicorn.conf.py
+#
+# With more than one worker (or node), set SHARED_STATE_URL to a Redis URL so
+# rate limits, cache versions and invalidation broadcasts are shared.
+import multiprocessing
+import os
+import subprocess
+import sys
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2 + 1, 8)))
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Each worker builds its own DB engine and background tasks after the fork
+preload_app = False
+
+# Trust X-Forwarded-* from the load balancer so rate limits see client IPs
+forwarded_allow_ips = os.environ.get("FORWARDED_ALLOW_IPS", "*")
+
+timeout = int(os.environ.get("WORKER_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+
+# Restart workers periodically to bound memory growth
+max_requests = int(os.environ.get("MAX_REQUESTS", "10000"))
+max_requests_jitter = 1000
+
+accesslog = "-"
+
+
+def on_starting(server):
+    shared_state_url = os.environ.get("SHARED_STATE_URL", "memory://")
+    if server.cfg.workers > 1 and shared_state_url.startswith("memory://"):
+        server.log.warning(
+            "Running %d workers with in-memory shared state: rate limits and caches "
+            "are per worker. Set SHARED_STATE_URL to a Redis URL.", server.cfg.workers
+        )
+
+    # Migrate once here, before forking, instead of in every worker. Set
+    # AUTO_MIGRATE=false to skip this when migrations run as a release step.
+    if os.environ.get("AUTO_MIGRATE", "true").lower() not in ("0", "false", "no"):
+        subprocess.run(
+            [sys.executable, "-m", "app.manage", "migrate"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            check=True
+        )
+    os.environ["AUTO_MIGRATE"] = "false"
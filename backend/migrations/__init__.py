@@ -0,0 +1 @@
+# Alembic migrations
@@ -0,0 +1,68 @@
+"""
+Alembic environment.
+
+Used both by the `alembic` CLI and by the app (`app.database.run_migrations`),
+which passes its own connection in `config.attributes["connection"]`.
+Each migration runs in its own transaction, so a migration can leave it
+(`op.get_context().autocommit_block()`) for CREATE INDEX CONCURRENTLY or
+batched backfills; see migrations/helpers.py.
+"""
+from logging.config import fileConfig
+from alembic import context
+from app.config import settings
+from app.database import Base, engine
+import app.models  # noqa: F401  (registers all tables on Base.metadata)
+
+config = context.config
+target_metadata = Base.metadata
+
+# Search objects maintained by the database (migrations 0005 and 0008), not the models
+SEARCH_OBJECTS = (
+    "markets_fts", "search_vector", "idx_market_search",
+    "idx_user_username_prefix", "idx_user_email_prefix"
+)
+
+
+def include_object(obj, name, type_, reflected, compare_to) -> bool:
+    return not (reflected and name and name.startswith(SEARCH_OBJECTS))
+
+
+def _configure(**kwargs) -> None:
+    context.configure(
+        target_metadata=target_metadata,
+        # SQLite can't ALTER most things in place; batch mode rebuilds the table
+        render_as_batch=settings.database_url.startswith("sqlite"),
+        transaction_per_migration=True,
+        compare_type=True,
+        include_object=include_object,
+        **kwargs
+    )
+
+
+def run_migrations_offline() -> None:
+    """Emit the migration SQL instead of running it (`alembic upgrade head --sql`)."""
+    _configure(url=settings.database_url, literal_binds=True, dialect_opts={"paramstyle": "named"})
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    if config.config_file_name is not None:
+        fileConfig(config.config_file_name)
+    with engine.connect() as connection:
+        _configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,72 @@
+"""
+Operations for changing the schema of a live database without long locks.
+
+Each helper steps out of the migration's transaction, so a migration using
+them should do nothing else that needs to be atomic with them.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+def _is_partitioned(bind, table: str) -> bool:
+    if op.get_context().as_sql:  # Offline SQL generation: no database to ask
+        return False
+    return bind.execute(
+        sa.text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"),
+        {"table": table}
+    ).first() is not None
+
+
+def create_index_concurrently(name: str, table: str, columns: list, **kwargs) -> None:
+    """
+    Create an index without blocking writes to the table.
+    PostgreSQL builds it with CREATE INDEX CONCURRENTLY (which can't run in a
+    transaction); elsewhere it is a plain CREATE INDEX.
+    """
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql" and _is_partitioned(bind, table):
+        # CONCURRENTLY isn't supported on a partitioned parent; this regular
+        # build blocks writes to the table while it runs
+        op.create_index(name, table, columns, if_not_exists=True, **kwargs)
+    elif bind.dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            # A failed concurrent build leaves an INVALID index behind; replace it
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
+            op.create_index(name, table, columns, postgresql_concurrently=True, **kwargs)
+    else:
+        op.create_index(name, table, columns, if_not_exists=True, **kwargs)
+
+
+def drop_index_concurrently(name: str, table: str) -> None:
+    """Drop an index without blocking reads or writes (PostgreSQL)."""
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql" and not _is_partitioned(bind, table):
+        with op.get_context().autocommit_block():
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
+    else:
+        op.drop_index(name, table_name=table, if_exists=True)
+
+
+def backfill_in_batches(table: str, values: dict, where, batch_size: int = 1000, key: str = "id") -> int:
+    """
+    UPDATE table SET values WHERE where, a bounded batch of rows at a time,
+    each batch committed on its own so row locks are short-lived.
+    `where` must stop matching rows once they are updated, e.g.
+    `sa.column("new_col").is_(None)`. Returns the number of rows updated.
+    """
+    target = sa.table(table, sa.column(key), *(sa.column(name) for name in values))
+    key_column = sa.column(key)
+    total = 0
+    with op.get_context().autocommit_block():
+        if op.get_context().as_sql:  # Offline SQL: no row counts to loop on
+            op.execute(sa.update(target).where(where).values(**values))
+            return 0
+        bind = op.get_bind()
+        while True:
+            batch = sa.select(key_column).select_from(sa.table(table)).where(where).limit(batch_size)
+            updated = bind.execute(
+                sa.update(target).where(target.c[key].in_(batch.scalar_subquery())).values(**values)
+            ).rowcount
+            total += updated
+            if updated < batch_size:
+                return total
@@ -0,0 +1,207 @@
+"""baseline: the schema as create_all built it before migrations
+
+Databases created before migrations existed run it in adopt mode (see
+app.database.run_migrations): tables and indexes they already have are kept,
+and only what is missing is added.
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-19 05:34:02.096505
+"""
+from alembic import context, op
+import sqlalchemy as sa
+from app.config import settings
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _adopting() -> bool:
+    return bool(context.config.attributes.get("adopt"))
+
+
+def create_table(name: str, *elements, **kwargs) -> None:
+    """op.create_table, or when adopting an existing table, add the columns it lacks."""
+    inspector = sa.inspect(op.get_bind()) if _adopting() else None
+    if inspector is None or not inspector.has_table(name):
+        op.create_table(name, *elements, **kwargs)
+        return
+    existing = {column["name"] for column in inspector.get_columns(name)}
+    for element in elements:
+        # Existing rows can only take a nullable or defaulted column
+        if isinstance(element, sa.Column) and element.name not in existing \
+                and (element.nullable or element.server_default is not None):
+            op.add_column(name, element)
+
+
+def create_index(name: str, table: str, columns: list, **kwargs) -> None:
+    op.create_index(name, table, columns, if_not_exists=_adopting() or None, **kwargs)
+
+
+def upgrade() -> None:
+    create_table('markets',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=500), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('category', sa.String(length=50), nullable=True),
+    sa.Column('image_url', sa.String(length=500), nullable=True),
+    sa.Column('yes_price', sa.Float(), nullable=True),
+    sa.Column('no_price', sa.Float(), nullable=True),
+    sa.Column('total_volume', sa.Float(), nullable=True),
+    sa.Column('liquidity', sa.Float(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('resolution_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('resolved_outcome', sa.String(length=10), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    create_index('idx_market_status_category', 'markets', ['status', 'category'], unique=False)
+    create_index('ix_markets_category', 'markets', ['category'], unique=False)
+    create_index('ix_markets_id', 'markets', ['id'], unique=False)
+    create_index('ix_markets_status', 'markets', ['status'], unique=False)
+
+    create_table('orders_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('market_id', sa.Integer(), nullable=False),
+    sa.Column('side', sa.String(length=10), nullable=False),
+    sa.Column('order_type', sa.String(length=10), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.Column('total_cost', sa.Float(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('filled_quantity', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('executed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    create_index('idx_order_archive_user_created', 'orders_archive', ['user_id', 'created_at'], unique=False)
+    create_index('ix_orders_archive_market_id', 'orders_archive', ['market_id'], unique=False)
+
+    create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('username', sa.String(), nullable=False),
+    sa.Column('hashed_password', sa.String(), nullable=False),
+    sa.Column('balance', sa.Integer(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('is_admin', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('referral_code', sa.String(length=8), nullable=True),
+    sa.Column('referred_by', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['referred_by'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    create_index('ix_users_email', 'users', ['email'], unique=True)
+    create_index('ix_users_id', 'users', ['id'], unique=False)
+    create_index('ix_users_referral_code', 'users', ['referral_code'], unique=True)
+    create_index('ix_users_username', 'users', ['username'], unique=True)
+
+    create_table('market_proposals',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('category', sa.String(length=50), nullable=False),
+    sa.Column('resolution_date', sa.DateTime(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('admin_notes', sa.Text(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('market_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('reviewed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['market_id'], ['markets.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    create_index('ix_market_proposals_id', 'market_proposals', ['id'], unique=False)
+    create_index('ix_market_proposals_status', 'market_proposals', ['status'], unique=False)
+    create_index('ix_market_proposals_user_id', 'market_proposals', ['user_id'], unique=False)
+
+    # With ORDERS_PARTITIONED on PostgreSQL, orders is partitioned by month on
+    # created_at; the primary key has to include the partition key
+    partitioned = op.get_bind().dialect.name == "postgresql" and settings.orders_partitioned
+    create_table('orders',
+    sa.Column('id', sa.Integer(), nullable=False, autoincrement=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('market_id', sa.Integer(), nullable=False),
+    sa.Column('side', sa.String(length=10), nullable=False),
+    sa.Column('order_type', sa.String(length=10), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.Column('total_cost', sa.Float(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('filled_quantity', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=not partitioned),
+    sa.Column('executed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['market_id'], ['markets.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id', 'created_at') if partitioned else sa.PrimaryKeyConstraint('id'),
+    **({"postgresql_partition_by": "RANGE (created_at)"} if partitioned else {})
+    )
+    create_index('idx_order_user_created', 'orders', ['user_id', 'created_at'], unique=False)
+    create_index('idx_order_user_market', 'orders', ['user_id', 'market_id'], unique=False)
+    create_index('ix_orders_id', 'orders', ['id'], unique=False)
+    create_index('ix_orders_market_id', 'orders', ['market_id'], unique=False)
+    create_index('ix_orders_user_id', 'orders', ['user_id'], unique=False)
+
+    create_table('positions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('market_id', sa.Integer(), nullable=False),
+    sa.Column('yes_shares', sa.Integer(), nullable=True),
+    sa.Column('no_shares', sa.Integer(), nullable=True),
+    sa.Column('avg_yes_price', sa.Float(), nullable=True),
+    sa.Column('avg_no_price', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['market_id'], ['markets.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'market_id', name='unique_user_market_position')
+    )
+    create_index('ix_positions_id', 'positions', ['id'], unique=False)
+    create_index('ix_positions_market_id', 'positions', ['market_id'], unique=False)
+    create_index('ix_positions_user_id', 'positions', ['user_id'], unique=False)
+
+
+
+def downgrade() -> None:
+    op.drop_index('ix_positions_user_id', table_name='positions')
+    op.drop_index('ix_positions_market_id', table_name='positions')
+    op.drop_index('ix_positions_id', table_name='positions')
+
+    op.drop_table('positions')
+    op.drop_index('ix_orders_user_id', table_name='orders')
+    op.drop_index('ix_orders_market_id', table_name='orders')
+    op.drop_index('ix_orders_id', table_name='orders')
+    op.drop_index('idx_order_user_market', table_name='orders')
+    op.drop_index('idx_order_user_created', table_name='orders')
+
+    op.drop_table('orders')
+    op.drop_index('ix_market_proposals_user_id', table_name='market_proposals')
+    op.drop_index('ix_market_proposals_status', table_name='market_proposals')
+    op.drop_index('ix_market_proposals_id', table_name='market_proposals')
+
+    op.drop_table('market_proposals')
+    op.drop_index('ix_users_username', table_name='users')
+    op.drop_index('ix_users_referral_code', table_name='users')
+    op.drop_index('ix_users_id', table_name='users')
+    op.drop_index('ix_users_email', table_name='users')
+
+    op.drop_table('users')
+    op.drop_index('ix_orders_archive_market_id', table_name='orders_archive')
+    op.drop_index('idx_order_archive_user_created', table_name='orders_archive')
+
+    op.drop_table('orders_archive')
+    op.drop_index('ix_markets_status', table_name='markets')
+    op.drop_index('ix_markets_id', table_name='markets')
+    op.drop_index('ix_markets_category', table_name='markets')
+    op.drop_index('idx_market_status_category', table_name='markets')
+
+    op.drop_table('markets')
@@ -0,0 +1,36 @@
+"""hot path indexes: open positions per user, pending proposal queue
+
+Built with CREATE INDEX CONCURRENTLY on PostgreSQL, so it can run against
+the live database without blocking trades or proposal submissions.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 05:40:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+from migrations.helpers import create_index_concurrently, drop_index_concurrently
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+OPEN_POSITION = sa.text('yes_shares > 0 OR no_shares > 0')
+
+
+def upgrade() -> None:
+    # Schema version table of the pre-migration startup check; Alembic tracks versions now
+    op.execute('DROP TABLE IF EXISTS schema_version')
+
+    create_index_concurrently(
+        'idx_position_user_open', 'positions', ['user_id'],
+        postgresql_where=OPEN_POSITION, sqlite_where=OPEN_POSITION
+    )
+    create_index_concurrently('idx_proposal_status_id', 'market_proposals', ['status', 'id'])
+
+
+def downgrade() -> None:
+    drop_index_concurrently('idx_proposal_status_id', 'market_proposals')
+    drop_index_concurrently('idx_position_user_open', 'positions')
@@ -0,0 +1,39 @@
+"""limit orders: limit_price on orders, book_version on markets, resting order index
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 06:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+from migrations.helpers import create_index_concurrently, drop_index_concurrently
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+RESTING = sa.text("status IN ('pending', 'partially_filled')")
+
+
+def upgrade() -> None:
+    # Nullable columns and a constant default: metadata-only changes, no table rewrite
+    op.add_column('orders', sa.Column('limit_price', sa.Float(), nullable=True))
+    op.add_column('orders_archive', sa.Column('limit_price', sa.Float(), nullable=True))
+    op.add_column('markets', sa.Column('book_version', sa.Integer(), server_default='0', nullable=False))
+
+    create_index_concurrently(
+        'idx_order_resting', 'orders', ['market_id', 'id'],
+        postgresql_where=RESTING, sqlite_where=RESTING
+    )
+
+
+def downgrade() -> None:
+    drop_index_concurrently('idx_order_resting', 'orders')
+    with op.batch_alter_table('markets') as batch_op:
+        batch_op.drop_column('book_version')
+    with op.batch_alter_table('orders_archive') as batch_op:
+        batch_op.drop_column('limit_price')
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.drop_column('limit_price')
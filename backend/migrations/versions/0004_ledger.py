@@ -0,0 +1,78 @@
+"""ledger: append-only balance and share movements, per-user snapshots
+
+Existing balances and positions are carried into the ledger as one
+opening entry per balance and per non-empty position.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 07:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+LedgerId = sa.BigInteger().with_variant(sa.Integer(), "sqlite")
+
+
+def upgrade() -> None:
+    op.create_table('ledger_entries',
+    sa.Column('id', LedgerId, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('coins', sa.Integer(), nullable=False),
+    sa.Column('market_id', sa.Integer(), nullable=True),
+    sa.Column('yes_shares', sa.Integer(), nullable=False),
+    sa.Column('no_shares', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_ledger_user_id', 'ledger_entries', ['user_id', 'id'], unique=False)
+
+    op.create_table('ledger_snapshots',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('last_entry_id', LedgerId, nullable=False),
+    sa.Column('balance', sa.Integer(), nullable=False),
+    sa.Column('taken_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table('ledger_snapshot_positions',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('market_id', sa.Integer(), nullable=False),
+    sa.Column('yes_shares', sa.Integer(), nullable=False),
+    sa.Column('no_shares', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'market_id')
+    )
+
+    # Opening entries, as two INSERT ... SELECTs into the new (unlocked) table
+    ledger = sa.table('ledger_entries', *(sa.column(name) for name in (
+        'user_id', 'kind', 'coins', 'market_id', 'yes_shares', 'no_shares'
+    )))
+    users = sa.table('users', sa.column('id'), sa.column('balance'))
+    positions = sa.table('positions', *(sa.column(name) for name in (
+        'user_id', 'market_id', 'yes_shares', 'no_shares'
+    )))
+    columns = ['user_id', 'kind', 'coins', 'market_id', 'yes_shares', 'no_shares']
+    op.execute(ledger.insert().from_select(columns, sa.select(
+        users.c.id, sa.literal('opening'), sa.cast(sa.func.round(sa.func.coalesce(users.c.balance, 0)), sa.Integer),
+        sa.null(), sa.literal(0), sa.literal(0)
+    ).order_by(users.c.id)))
+    op.execute(ledger.insert().from_select(columns, sa.select(
+        positions.c.user_id, sa.literal('opening'), sa.literal(0), positions.c.market_id,
+        sa.func.coalesce(positions.c.yes_shares, 0), sa.func.coalesce(positions.c.no_shares, 0)
+    ).where(sa.or_(positions.c.yes_shares != 0, positions.c.no_shares != 0)).order_by(positions.c.user_id)))
+
+
+def downgrade() -> None:
+    op.drop_table('ledger_snapshot_positions')
+    op.drop_table('ledger_snapshots')
+    op.drop_index('idx_ledger_user_id', table_name='ledger_entries')
+    op.drop_table('ledger_entries')
@@ -0,0 +1,107 @@
+"""market search: full-text index over market titles and descriptions
+
+SQLite: an external-content FTS5 table, `markets_fts`, kept in sync by
+triggers on `markets`. PostgreSQL: a weighted `search_vector` tsvector
+column, set by a trigger and indexed with GIN.
+
+Either way the database maintains the index itself, so every write path
+(ORM, bulk Core inserts, proposal approval, purges) keeps it current.
+These objects aren't in the models; migrations/env.py leaves them out of
+autogenerate. On SQLite, a later migration that rebuilds `markets` through
+batch_alter_table drops its triggers and must recreate them.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 08:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from migrations.helpers import create_index_concurrently, drop_index_concurrently, backfill_in_batches
+
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+# Title matches outrank description matches
+PG_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce({row}title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce({row}description, '')), 'B')"
+)
+
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER markets_fts_insert AFTER INSERT ON markets BEGIN
+        INSERT INTO markets_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER markets_fts_delete AFTER DELETE ON markets BEGIN
+        INSERT INTO markets_fts (markets_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER markets_fts_update AFTER UPDATE OF title, description ON markets BEGIN
+        INSERT INTO markets_fts (markets_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO markets_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        _upgrade_postgresql()
+    else:
+        _upgrade_sqlite()
+
+
+def _upgrade_sqlite() -> None:
+    # prefix: partly typed words (up to 6 letters) read a prefix index instead of
+    # merging the postings of every word they start
+    op.execute(
+        "CREATE VIRTUAL TABLE markets_fts USING fts5("
+        "title, description, content='markets', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6')"
+    )
+    for trigger in SQLITE_TRIGGERS:
+        op.execute(trigger)
+    op.execute("INSERT INTO markets_fts (markets_fts) VALUES ('rebuild')")
+
+
+def _upgrade_postgresql() -> None:
+    # Nullable and without a default: a metadata-only change, no table rewrite
+    op.add_column('markets', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    op.execute(
+        "CREATE FUNCTION markets_search_vector_update() RETURNS trigger AS $$ BEGIN "
+        f"NEW.search_vector := {PG_SEARCH_VECTOR.format(row='NEW.')}; RETURN NEW; "
+        "END $$ LANGUAGE plpgsql"
+    )
+    op.execute(
+        "CREATE TRIGGER markets_search_vector BEFORE INSERT OR UPDATE OF title, description "
+        "ON markets FOR EACH ROW EXECUTE FUNCTION markets_search_vector_update()"
+    )
+    # Rows written from here on are covered by the trigger (committed with it
+    # by the backfill's autocommit block); fill in the rest
+    backfill_in_batches(
+        'markets',
+        {'search_vector': sa.literal_column(PG_SEARCH_VECTOR.format(row=''))},
+        where=sa.column('search_vector').is_(None)
+    )
+    create_index_concurrently('idx_market_search', 'markets', ['search_vector'], postgresql_using='gin')
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        drop_index_concurrently('idx_market_search', 'markets')
+        op.execute("DROP TRIGGER IF EXISTS markets_search_vector ON markets")
+        op.execute("DROP FUNCTION IF EXISTS markets_search_vector_update()")
+        op.drop_column('markets', 'search_vector')
+    else:
+        for name in ('insert', 'delete', 'update'):
+            op.execute(f"DROP TRIGGER IF EXISTS markets_fts_{name}")
+        op.execute("DROP TABLE IF EXISTS markets_fts")
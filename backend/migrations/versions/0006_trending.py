@@ -0,0 +1,57 @@
+"""trending: 24h volume and price change sort keys, activity buckets, listing sort indexes
+
+The 24h keys start at zero and fill in as markets trade.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 09:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+from migrations.helpers import create_index_concurrently, drop_index_concurrently
+
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+SORT_INDEXES = [
+    ('idx_market_created_at', ['created_at']),
+    ('idx_market_category_created_at', ['category', 'created_at']),
+    ('idx_market_total_volume', ['total_volume']),
+    ('idx_market_category_total_volume', ['category', 'total_volume']),
+    ('idx_market_volume_24h', ['volume_24h']),
+    ('idx_market_category_volume_24h', ['category', 'volume_24h']),
+    ('idx_market_price_change_24h', ['price_change_24h']),
+    ('idx_market_category_price_change_24h', ['category', 'price_change_24h']),
+    ('idx_market_status_resolution_date', ['status', 'resolution_date']),
+]
+
+
+def upgrade() -> None:
+    # Constant defaults: metadata-only changes, no table rewrite
+    op.add_column('markets', sa.Column('volume_24h', sa.Float(), server_default='0', nullable=False))
+    op.add_column('markets', sa.Column('price_change_24h', sa.Float(), server_default='0', nullable=False))
+
+    op.create_table('market_activity',
+    sa.Column('market_id', sa.Integer(), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('volume', sa.Float(), nullable=False),
+    sa.Column('open_price', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('market_id', 'bucket_start')
+    )
+    op.create_index('idx_market_activity_bucket_start', 'market_activity', ['bucket_start'], unique=False)
+
+    for name, columns in SORT_INDEXES:
+        create_index_concurrently(name, 'markets', columns)
+
+
+def downgrade() -> None:
+    for name, _ in reversed(SORT_INDEXES):
+        drop_index_concurrently(name, 'markets')
+    op.drop_index('idx_market_activity_bucket_start', table_name='market_activity')
+    op.drop_table('market_activity')
+    # Not batch_alter_table: rebuilding markets on SQLite would drop its search triggers (0005)
+    op.drop_column('markets', 'price_change_24h')
+    op.drop_column('markets', 'volume_24h')
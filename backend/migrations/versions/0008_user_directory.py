@@ -0,0 +1,170 @@
+"""user directory: equity and trade count sort keys, prefix search indexes, user counters
+
+`user_totals` and `user_signup_days` are kept by triggers on `users`, so
+every write path (registration, the seeded admin, manual SQL) keeps them
+current. The triggers and the prefix indexes on lower(username) and
+lower(email) aren't in the models; migrations/env.py leaves the indexes
+out of autogenerate. On SQLite, a later migration that rebuilds `users`
+through batch_alter_table drops its triggers and must recreate them.
+
+equity starts at zero and is filled in by the app's first equity refresh;
+trade_count is backfilled from the orders (live and archived) that traded.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 11:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+from migrations.helpers import create_index_concurrently, drop_index_concurrently, backfill_in_batches
+
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+SORT_INDEXES = [
+    ('idx_user_balance', ['balance', 'id']),
+    ('idx_user_equity', ['equity', 'id']),
+    ('idx_user_trade_count', ['trade_count', 'id']),
+]
+
+PREFIX_COLUMNS = [('idx_user_username_prefix', 'username'), ('idx_user_email_prefix', 'email')]
+
+
+def _flag(value: str) -> str:
+    return f"(CASE WHEN {value} THEN 1 ELSE 0 END)"
+
+
+def _totals_change(sign: str, row: str) -> str:
+    return (
+        f"users = users {sign} 1, "
+        f"active = active {sign} {_flag(row + '.is_active')}, "
+        f"admins = admins {sign} {_flag(row + '.is_admin')}"
+    )
+
+
+FLAGS_CHANGE = (
+    f"active = active + {_flag('new.is_active')} - {_flag('old.is_active')}, "
+    f"admins = admins + {_flag('new.is_admin')} - {_flag('old.is_admin')}"
+)
+
+SIGNUP_UPSERT = (
+    "INSERT INTO user_signup_days (day, signups) VALUES ({day}, 1) "
+    "ON CONFLICT (day) DO UPDATE SET signups = user_signup_days.signups + 1"
+)
+
+SQLITE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER users_counts_insert AFTER INSERT ON users BEGIN
+        {SIGNUP_UPSERT.format(day="date(coalesce(new.created_at, CURRENT_TIMESTAMP))")};
+        UPDATE user_totals SET {_totals_change('+', 'new')} WHERE id = 1;
+    END
+    """,
+    f"""
+    CREATE TRIGGER users_counts_update AFTER UPDATE OF is_active, is_admin ON users BEGIN
+        UPDATE user_totals SET {FLAGS_CHANGE} WHERE id = 1;
+    END
+    """,
+    f"""
+    CREATE TRIGGER users_counts_delete AFTER DELETE ON users BEGIN
+        UPDATE user_totals SET {_totals_change('-', 'old')} WHERE id = 1;
+    END
+    """,
+]
+
+PG_TRIGGER_FUNCTION = f"""
+CREATE FUNCTION users_counts_update() RETURNS trigger AS $$ BEGIN
+    IF TG_OP = 'INSERT' THEN
+        {SIGNUP_UPSERT.format(day="(coalesce(NEW.created_at, now()) AT TIME ZONE 'UTC')::date")};
+        UPDATE user_totals SET {_totals_change('+', 'NEW')} WHERE id = 1;
+    ELSIF TG_OP = 'UPDATE' THEN
+        UPDATE user_totals SET {FLAGS_CHANGE.replace('new.', 'NEW.').replace('old.', 'OLD.')} WHERE id = 1;
+    ELSE
+        UPDATE user_totals SET {_totals_change('-', 'OLD')} WHERE id = 1;
+    END IF;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql
+"""
+
+
+def _traded_orders(table: str):
+    orders = sa.table(table, sa.column('user_id'), sa.column('filled_quantity'))
+    return (
+        sa.select(sa.func.count())
+        .select_from(orders)
+        .where(orders.c.user_id == sa.literal_column('users.id'), orders.c.filled_quantity > 0)
+        .scalar_subquery()
+    )
+
+
+def upgrade() -> None:
+    is_postgresql = op.get_bind().dialect.name == "postgresql"
+
+    # Constant defaults: metadata-only changes, no table rewrite
+    op.add_column('users', sa.Column('equity', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('users', sa.Column('trade_count', sa.Integer(), server_default='0', nullable=False))
+
+    op.create_table('user_signup_days',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('signups', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+    op.create_table('user_totals',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('users', sa.Integer(), nullable=False),
+    sa.Column('active', sa.Integer(), nullable=False),
+    sa.Column('admins', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    # Triggers first: on PostgreSQL creating one blocks writes to users until this
+    # transaction commits, so the counts below miss no concurrent signup
+    if is_postgresql:
+        op.execute(PG_TRIGGER_FUNCTION)
+        op.execute(
+            "CREATE TRIGGER users_counts AFTER INSERT OR DELETE OR UPDATE OF is_active, is_admin "
+            "ON users FOR EACH ROW EXECUTE FUNCTION users_counts_update()"
+        )
+        day = "(created_at AT TIME ZONE 'UTC')::date"
+    else:
+        for trigger in SQLITE_TRIGGERS:
+            op.execute(trigger)
+        day = "date(created_at)"
+    op.execute(
+        "INSERT INTO user_totals (id, users, active, admins) "
+        f"SELECT 1, count(*), coalesce(sum({_flag('is_active')}), 0), coalesce(sum({_flag('is_admin')}), 0) FROM users"
+    )
+    op.execute(
+        f"INSERT INTO user_signup_days (day, signups) "
+        f"SELECT {day}, count(*) FROM users WHERE created_at IS NOT NULL GROUP BY {day}"
+    )
+
+    # Runs before the app that counts trades starts, so counts only need filling in once
+    traded = _traded_orders('orders') + _traded_orders('orders_archive')
+    backfill_in_batches('users', {'trade_count': traded}, where=sa.and_(sa.column('trade_count') == 0, traded > 0))
+
+    for name, columns in SORT_INDEXES:
+        create_index_concurrently(name, 'users', columns)
+    for name, column in PREFIX_COLUMNS:
+        # Byte-wise ordering, so LIKE 'prefix%' is an index range scan whatever the collation
+        expression = f"lower({column}) text_pattern_ops" if is_postgresql else f"lower({column})"
+        create_index_concurrently(name, 'users', [sa.text(expression)])
+
+
+def downgrade() -> None:
+    for name, _ in reversed(PREFIX_COLUMNS):
+        drop_index_concurrently(name, 'users')
+    for name, _ in reversed(SORT_INDEXES):
+        drop_index_concurrently(name, 'users')
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP TRIGGER IF EXISTS users_counts ON users")
+        op.execute("DROP FUNCTION IF EXISTS users_counts_update()")
+    else:
+        for name in ('insert', 'update', 'delete'):
+            op.execute(f"DROP TRIGGER IF EXISTS users_counts_{name}")
+    op.drop_table('user_totals')
+    op.drop_table('user_signup_days')
+    op.drop_column('users', 'trade_count')
+    op.drop_column('users', 'equity')
@@ -0,0 +1,21 @@
+"""recent trades: index on orders by market and creation time
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 12:00:00.000000
+"""
+from migrations.helpers import create_index_concurrently, drop_index_concurrently
+
+
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    create_index_concurrently('idx_order_market_created', 'orders', ['market_id', 'created_at'])
+
+
+def downgrade() -> None:
+    drop_index_concurrently('idx_order_market_created', 'orders')